@@ -0,0 +1,117 @@
+# claim_state.py — diff-friendly claim history format for CS Rewards Bot
+"""
+Line-oriented encoding of the claim history dict used by master_claimer.py.
+
+One line per player and reward slot, sorted by player ID with a fixed slot
+order, timestamps as integer epoch seconds (IST wall-clock is converted to
+UTC epoch and back). A claim therefore changes exactly one line in the
+auto-commit diff instead of rewriting the whole file.
+
+    <player_id> daily       <status>     <last_claim> <next_available>
+    <player_id> store1..3   <status>     <last_claim> <next_available>
+    <player_id> progression <last_count> <last_claim> <last_visit>
+    <player_id> loyalty     <status>     <last_claim> <next_available>
+
+Missing values are written as "-". Sub-second precision is dropped.
+
+CLI (no selenium needed):
+    python claim_state.py to-json   claim_state.txt     claim_history.json
+    python claim_state.py from-json claim_history.json  claim_state.txt
+"""
+import calendar
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+HEADER  = "# cs-rewards claim state v1 — pid slot status|count last_claim next|visit"
+_IST    = timedelta(hours=5, minutes=30)
+_SLOTS  = ("daily", "store1", "store2", "store3", "progression", "loyalty")
+
+
+def to_epoch(iso):
+    if not iso:
+        return "-"
+    return str(calendar.timegm((datetime.fromisoformat(iso) - _IST).timetuple()))
+
+
+def from_epoch(tok):
+    if tok == "-":
+        return None
+    return (datetime.utcfromtimestamp(int(tok)) + _IST).isoformat()
+
+
+def _slot_dict(ph, slot):
+    if slot.startswith("store"):
+        return ph.get("store", {}).get(f"reward_{slot[5:]}", {})
+    return ph.get(slot, {})
+
+
+def dumps_state(history):
+    lines = [HEADER]
+    for pid in sorted(history):
+        ph = history[pid]
+        for slot in _SLOTS:
+            d = _slot_dict(ph, slot)
+            if slot == "progression":
+                lines.append(f"{pid} {slot} {int(d.get('last_count') or 0)} "
+                             f"{to_epoch(d.get('last_claim'))} {to_epoch(d.get('last_visit'))}")
+            else:
+                lines.append(f"{pid} {slot} {d.get('status') or 'unknown'} "
+                             f"{to_epoch(d.get('last_claim'))} {to_epoch(d.get('next_available'))}")
+    return "\n".join(lines) + "\n"
+
+
+def loads_state(text):
+    history = {}
+    for ln in text.splitlines():
+        ln = ln.strip()
+        if not ln or ln.startswith("#"):
+            continue
+        pid, slot, a, b, c = ln.split()
+        ph = history.setdefault(pid, {"store": {}})
+        if slot == "progression":
+            ph["progression"] = {"last_claim": from_epoch(b), "last_count": int(a),
+                                 "last_visit": from_epoch(c)}
+            continue
+        entry = {"last_claim": from_epoch(b), "next_available": from_epoch(c), "status": a}
+        if slot.startswith("store"):
+            ph["store"][f"reward_{slot[5:]}"] = entry
+        else:
+            ph[slot] = entry
+    return history
+
+
+def write_if_changed(path, text):
+    """Writes text to path only when it differs from what is on disk. Returns True if written."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+    return True
+
+
+def _main(argv):
+    if len(argv) != 4 or argv[1] not in ("to-json", "from-json"):
+        print(__doc__.split("CLI (no selenium needed):")[1].rstrip())
+        return 2
+    mode, src, dst = argv[1:]
+    with open(src, "r", encoding="utf-8") as f:
+        raw = f.read()
+    if mode == "to-json":
+        out = json.dumps(loads_state(raw), indent=2) + "\n"
+    else:
+        out = dumps_state(json.loads(raw))
+    write_if_changed(dst, out)
+    print(f"{src} → {dst}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv))
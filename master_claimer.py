@@ -2,13 +2,27 @@
 import csv
 import time
 import os
+import argparse
+import atexit
+import base64
+import hashlib
 import json
+import linecache
 import smtplib
+import queue
 import re
+import shutil
 import subprocess
-from datetime import datetime, timedelta
+import sys
+import tempfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from email.utils import formatdate, make_msgid
+from html import escape as html_escape
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -18,6 +32,11 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
     TimeoutException, NoSuchElementException, StaleElementReferenceException
 )
+from claim_state import dumps_state, loads_state, write_if_changed
+from schedule_config import (
+    DAILY_RESET_HOUR_IST, DAILY_RESET_MINUTE_IST, LOYALTY_COOLDOWN_HOURS,
+    PROGRESSION_CHECK_WINDOW_HOURS, RUN_SLOTS,
+)
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # SECTION 1 — CONSTANTS & CONFIG
@@ -25,13 +44,11 @@ from selenium.common.exceptions import (
 
 VERSION        = "v3.0.0"
 PLAYER_ID_FILE = "players.csv"
-HISTORY_FILE   = "claim_history.json"
+HISTORY_FILE   = "claim_state.txt"      # line-per-slot format, see claim_state.py
+LEGACY_HISTORY_FILE = "claim_history.json"
 BOT_META_FILE  = "bot_meta.json"
 HEADLESS       = True
-
-DAILY_RESET_HOUR_IST   = 5
-DAILY_RESET_MINUTE_IST = 30
-LOYALTY_COOLDOWN_HOURS = 24
+SCRIPT_TIMEOUT_S = 30                   # execute_(async_)script limit per driver
 
 SMTP_SERVER   = os.getenv("SMTP_SERVER",   "smtp.gmail.com")
 SMTP_PORT     = int(os.getenv("SMTP_PORT", "465"))
@@ -41,15 +58,158 @@ SMTP_FROM     = os.getenv("SENDER_EMAIL",  os.getenv("SMTP_FROM", ""))
 SMTP_TO       = os.getenv("RECIPIENT_EMAIL", os.getenv("SMTP_TO", ""))
 
 
-def log(msg):
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] {msg}", flush=True)
+# Per-run counters (reset at process start — one process per scheduled run)
+RUN_STATS = {"cloudflare_seen": 0, "cloudflare_solved": 0, "cloudflare_avoided": 0,
+             "state_reads": 0, "dom_scans": 0,
+             "limiter_acquires": 0, "limiter_waits": 0, "limiter_wait_s": 0.0,
+             "limiter_backoffs": 0, "driver_launches": 0, "driver_launch_failures": 0,
+             "driver_recycles": 0}
+_stats_lock = threading.Lock()   # worker lanes bump the counters concurrently
+
+
+def bump_stat(key, n=1):
+    with _stats_lock:
+        RUN_STATS[key] += n
+
+
+# ── Logging ────────────────────────────────────────────────────────────────────
+# log() hands records to one background writer thread, which batches them to
+# the console (concise, human) and LOG_FILE (JSON lines with level and the
+# bound player/phase/worker context). Nothing on the hot path flushes. The
+# file holds one run: the previous run's log is kept as LOG_FILE + ".1".
+# Player IDs go into it masked (mask_pid), like everywhere else.
+
+LOG_FILE      = os.getenv("LOG_FILE", "run_log.jsonl")
+LOG_LEVEL     = os.getenv("LOG_LEVEL", "INFO").upper()
+_LEVELS       = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40}
+_EMOJI_LEVELS = (("❌", "ERROR"), ("⚠️", "WARN"))
+_log_ctx      = threading.local()
+
+
+def mask_pid(pid):
+    return f"…{pid[-4:]}" if pid and len(pid) >= 4 else "…"
+
+
+class _LogWriter:
+    def __init__(self, path):
+        self.path   = path
+        self._q     = queue.SimpleQueue()
+        self._lock  = threading.Lock()
+        self._t     = None
+        self._file  = None
+
+    def put(self, rec):
+        if self._t is None:
+            with self._lock:
+                if self._t is None:
+                    self._t = threading.Thread(target=self._loop, name="log-writer", daemon=True)
+                    self._t.start()
+                    atexit.register(self.close)
+        self._q.put(rec)
+
+    def _write(self, batch):
+        con, rows = [], []
+        for console, rec in batch:
+            if console is not None:
+                con.append(console)
+            rows.append(json.dumps(rec, ensure_ascii=False, default=str))
+        if con:
+            sys.stdout.write("\n".join(con) + "\n")
+            sys.stdout.flush()
+        if self.path:
+            try:
+                if self._file is None:
+                    if os.path.exists(self.path):
+                        os.replace(self.path, self.path + ".1")
+                    self._file = open(self.path, "w", encoding="utf-8")
+                self._file.write("\n".join(rows) + "\n")
+                self._file.flush()
+            except OSError:
+                self.path = None   # read-only checkout etc. — console only
+
+    def _loop(self):
+        while True:
+            batch = [self._q.get()]
+            while len(batch) < 500:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            batch = [b for b in batch if b is not None]
+            if batch:
+                self._write(batch)
+            if stop:
+                return
+            time.sleep(0.05)   # let a burst accumulate into one write
+
+    def close(self):
+        if self._t is not None and self._t.is_alive():
+            self._q.put(None)
+            self._t.join(timeout=5)
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+_LOG_WRITER = _LogWriter(LOG_FILE)
+
+
+def log(msg, level=None, **fields):
+    """
+    Logs one line. Level defaults from the leading emoji (❌ error, ⚠️ warn,
+    else info); keyword fields are added to the JSON record only.
+    """
+    text = str(msg)
+    body = text.strip()
+    if level is None:
+        level = next((lv for e, lv in _EMOJI_LEVELS if body.startswith(e)), "INFO")
+    th  = threading.current_thread()
+    rec = {"ts": time.time(), "level": level, "worker": th.name,
+           **getattr(_log_ctx, "fields", {}), **fields, "msg": body}
+    console = None
+    if _LEVELS.get(level, 20) >= _LEVELS.get(LOG_LEVEL, 20):
+        lead = text[:len(text) - len(text.lstrip("\n"))]
+        tag  = "" if th is threading.main_thread() else f"[{th.name}] "
+        console = f"{lead}[{datetime.now().strftime('%H:%M:%S')}] {tag}{text.lstrip(chr(10))}"
+    _LOG_WRITER.put((console, rec))
+
+
+@contextmanager
+def log_context(**fields):
+    """Binds fields (player, phase, ...) to every log() on this thread inside the block."""
+    prev = getattr(_log_ctx, "fields", {})
+    _log_ctx.fields = {**prev, **fields}
+    try:
+        yield
+    finally:
+        _log_ctx.fields = prev
+
+
+def bind_log(**fields):
+    """Updates the innermost context in place — e.g. the current phase of a player."""
+    _log_ctx.fields = {**getattr(_log_ctx, "fields", {}), **fields}
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # SECTION 2 — TIME HELPERS & RUN CLASSIFICATION
 # ═══════════════════════════════════════════════════════════════════════════════
 
+_clock = None   # injectable IST clock — see set_clock()
+
+
+def set_clock(fn):
+    """
+    Replaces the wall clock behind get_ist_time() with fn() → naive IST
+    datetime (e.g. schedule_sim.SimClock). set_clock(None) restores it.
+    """
+    global _clock
+    _clock = fn
+
+
 def get_ist_time():
+    if _clock is not None:
+        return _clock()
     return datetime.utcnow() + timedelta(hours=5, minutes=30)
 
 
@@ -97,7 +257,7 @@ def parse_timer_text(text):
 
 
 # 8 run slots — Primary at 05:35 IST (00:05 UTC), then every 3h
-_RUN_SLOTS = [(5,35),(8,35),(11,35),(14,35),(17,35),(20,35),(23,35),(2,35)]
+_RUN_SLOTS = RUN_SLOTS   # see schedule_config.py
 
 
 def determine_run_context():
@@ -132,7 +292,8 @@ _META_DEFAULT = {
         "last_checked_date": None
     },
     "last_run": None,
-    "new_ids_seen": []
+    "first_seen": {},
+    "profiles": {}      # execution profile name → recent throughput records
 }
 
 
@@ -149,8 +310,10 @@ def load_bot_meta():
                     "last_success_date": None,
                     "last_checked_date": None
                 }
-            if "new_ids_seen" not in data:
-                data["new_ids_seen"] = data.pop("known_ids", [])
+            # Migrate seen-ID list → {pid: first_seen_date}; dates before this are unknown
+            if "first_seen" not in data:
+                seen = data.pop("new_ids_seen", None) or data.pop("known_ids", [])
+                data["first_seen"] = {pid: None for pid in seen}
             if "last_run" not in data:
                 data["last_run"] = None
             return data
@@ -162,19 +325,115 @@ def load_bot_meta():
 
 def save_bot_meta(meta):
     try:
-        with open(BOT_META_FILE, 'w') as f:
-            json.dump(meta, f, indent=2)
+        write_if_changed(BOT_META_FILE, json.dumps(meta, indent=2, sort_keys=True) + "\n")
     except Exception as e:
         log(f"⚠️ Could not save {BOT_META_FILE}: {e}")
 
 
-def is_new_id(pid, meta):
-    return pid not in meta.get("new_ids_seen", [])
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 3A — ROSTER REGISTRY
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_TRUTHY = ("true", "yes", "1")
+
+
+def _int_col(row, col, pid):
+    """Optional integer CSV column; a bad value is logged and read as 0."""
+    raw = (row.get(col) or "").strip()
+    try:
+        return int(raw or 0)
+    except ValueError:
+        log(f"⚠️ players.csv: bad {col} {raw!r} for …{pid[-4:]} — using 0")
+        return 0
+
+
+class Player:
+    """One roster entry. Optional CSV columns: priority, disabled."""
+    __slots__ = ("pid", "has_loyalty", "priority", "disabled", "first_seen")
+
+    def __init__(self, pid, has_loyalty=False, priority=0, disabled=False, first_seen=None):
+        self.pid         = pid
+        self.has_loyalty = has_loyalty
+        self.priority    = priority
+        self.disabled    = disabled
+        self.first_seen  = first_seen
 
+    def __repr__(self):
+        return f"Player(…{self.pid[-4:]}, loyalty={self.has_loyalty}, priority={self.priority})"
 
-def mark_id_seen(pid, meta):
-    if pid not in meta.get("new_ids_seen", []):
-        meta["new_ids_seen"].append(pid)
+
+class Roster:
+    """
+    Dict-backed registry of players.csv + first-seen dates from bot_meta.
+    Loaded once per run; membership and lookup are O(1). Iteration yields
+    enabled players in schedule order (priority desc, then CSV order).
+    """
+
+    def __init__(self, players=(), first_seen=None):
+        self._by_id     = {}
+        self._order     = []
+        self.first_seen = dict(first_seen or {})
+        for p in players:
+            if p.pid in self._by_id:
+                log(f"⚠️ Duplicate player ID in roster ignored: …{p.pid[-4:]}")
+                continue
+            p.first_seen = self.first_seen.get(p.pid)
+            self._by_id[p.pid] = p
+            self._order.append(p)
+        self._order.sort(key=lambda p: -p.priority)   # stable → CSV order within a priority
+        self._active = [p for p in self._order if not p.disabled]
+
+    @classmethod
+    def load(cls, path, meta):
+        players = []
+        with open(path, 'r') as f:
+            for row in csv.DictReader(f):
+                pid = (row.get("player_id") or "").strip()
+                if not pid:
+                    continue
+                players.append(Player(
+                    pid,
+                    has_loyalty=(row.get("has_loyalty") or "").strip().lower() in _TRUTHY,
+                    priority=_int_col(row, "priority", pid),
+                    disabled=(row.get("disabled") or "").strip().lower() in _TRUTHY,
+                ))
+        return cls(players, meta.get("first_seen"))
+
+    def __contains__(self, pid):
+        return pid in self._by_id
+
+    def __len__(self):
+        return len(self.active())
+
+    def __iter__(self):
+        return iter(self.active())
+
+    def get(self, pid):
+        return self._by_id.get(pid)
+
+    def active(self):
+        return self._active
+
+    def disabled_count(self):
+        return sum(1 for p in self._order if p.disabled)
+
+    def loyalty_count(self):
+        return sum(1 for p in self._active if p.has_loyalty)
+
+    def is_new(self, pid):
+        return pid not in self.first_seen
+
+    def mark_seen(self, pid, date_str):
+        """Records first sighting; returns True if the ID was new this run."""
+        if pid in self.first_seen:
+            return False
+        self.first_seen[pid] = date_str
+        if pid in self._by_id:
+            self._by_id[pid].first_seen = date_str
+        return True
+
+    def save_to_meta(self, meta):
+        meta["first_seen"] = dict(sorted(self.first_seen.items()))
 
 
 def update_streak_day_level(meta, all_ok_today):
@@ -212,32 +471,87 @@ def update_streak_day_level(meta, all_ok_today):
     meta["streak"] = streak
 
 
-def compute_all_ok_today(players):
-    """
-    Returns True if daily + store have been claimed for ALL players today.
-    Loyalty is NOT required — LP-locked players would permanently block the
-    streak otherwise. Loyalty is a bonus metric, not a streak blocker.
-    """
-    h  = load_claim_history()
-    lr = get_last_daily_reset()
+# Per-day completion bitmask: daily + the three store cards.
+# Loyalty is NOT required — LP-locked players would permanently block the
+# streak otherwise. Loyalty is a bonus metric, not a streak blocker.
+_DAY_BIT_DAILY = 1
+_DAY_ALL       = 0b1111
 
-    for pid, has_loyalty in players:
-        if pid not in h:
-            return False
-        ph = h[pid]
+_day_progress = None   # bound to meta["today"] by bind_day_progress()
+_day_active   = set()  # enabled roster IDs — only these count towards "complete"
+
+
+def _day_key():
+    return get_last_daily_reset().strftime("%Y-%m-%d")
 
-        # Daily — claimed since last 05:30 IST reset
-        lc = ph.get("daily", {}).get("last_claim")
-        if not lc or datetime.fromisoformat(lc) < lr:
-            return False
 
-        # Store — all 3 cards claimed since last reset
+def _roll_day(day):
+    """Resets the counters when the 05:30 IST boundary has passed."""
+    key = _day_key()
+    if day.get("date") != key:
+        day.update({"date": key, "done": {}, "complete": 0})
+
+
+def _seed_day_progress(roster):
+    """One-time rescan of claim history when bot_meta has no counters yet."""
+    h    = load_claim_history()
+    lr   = get_last_daily_reset()
+    done = {}
+    for p in roster:
+        ph   = h.get(p.pid, {})
+        mask = 0
+        lc   = ph.get("daily", {}).get("last_claim")
+        if lc and datetime.fromisoformat(lc) >= lr:
+            mask |= _DAY_BIT_DAILY
         for i in range(1, 4):
             lc = ph.get("store", {}).get(f"reward_{i}", {}).get("last_claim")
-            if not lc or datetime.fromisoformat(lc) < lr:
-                return False
+            if lc and datetime.fromisoformat(lc) >= lr:
+                mask |= 1 << i
+        if mask:
+            done[p.pid] = mask
+    return {"date": _day_key(), "done": done}
+
+
+def bind_day_progress(meta, roster):
+    """
+    Attaches meta["today"] as the live completion tracker for this run.
+    update_claim_history() then records daily/store claims into it.
+    """
+    global _day_progress, _day_active
+    day = meta.get("today")
+    if not day:
+        day = _seed_day_progress(roster)
+    _roll_day(day)
+    done = day.setdefault("done", {})
+    for pid in [pid for pid in done if pid not in roster]:
+        del done[pid]
+    # Disabled IDs keep their bits (re-enabling mid-day loses nothing) but never count
+    _day_active     = {p.pid for p in roster.active()}
+    day["complete"] = sum(1 for pid, m in done.items() if m == _DAY_ALL and pid in _day_active)
+    meta["today"]   = day
+    _day_progress   = day
+    return day
+
+
+def record_day_progress(pid, bit):
+    day = _day_progress
+    if day is None:
+        return
+    _roll_day(day)
+    old = day["done"].get(pid, 0)
+    new = old | bit
+    if new != old:
+        day["done"][pid] = new
+        if new == _DAY_ALL and pid in _day_active:
+            day["complete"] += 1
+
 
-    return True
+def day_progress_counts(meta, roster):
+    """(complete, total) for today — O(1), no history rescan."""
+    day = meta.get("today") or {}
+    if day.get("date") != _day_key():
+        return 0, len(roster)
+    return day.get("complete", 0), len(roster)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -247,21 +561,41 @@ def compute_all_ok_today(players):
 def load_claim_history():
     if os.path.exists(HISTORY_FILE):
         try:
-            with open(HISTORY_FILE, 'r') as f:
-                return json.load(f)
+            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+                return loads_state(f.read())
         except Exception as e:
             log(f"⚠️ Error reading {HISTORY_FILE}: {e}")
+    elif os.path.exists(LEGACY_HISTORY_FILE):
+        # One-time migration — next save writes the compact format
+        try:
+            with open(LEGACY_HISTORY_FILE, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            log(f"⚠️ Error reading {LEGACY_HISTORY_FILE}: {e}")
     return {}
 
 
 def save_claim_history(h):
+    # Unchanged content is never rewritten, so no-op runs leave no diff
     try:
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(h, f, indent=2)
+        write_if_changed(HISTORY_FILE, dumps_state(h))
     except Exception as e:
         log(f"⚠️ Error saving {HISTORY_FILE}: {e}")
 
 
+# Workers share claim_state.txt — every load-modify-save goes through this lock
+_history_lock = threading.RLock()
+
+
+def _history_locked(fn):
+    def wrapper(*a, **kw):
+        with _history_lock:
+            return fn(*a, **kw)
+    wrapper.__name__, wrapper.__doc__ = fn.__name__, fn.__doc__
+    return wrapper
+
+
+@_history_locked
 def init_player_history(pid):
     h = load_claim_history()
     if pid not in h:
@@ -292,22 +626,32 @@ def init_player_history(pid):
     return h
 
 
+@_history_locked
 def update_claim_history(pid, reward_type, claimed_count=0,
-                         reward_index=None, detected_cooldown=None, attempted=False):
+                         reward_index=None, detected_cooldown=None, attempted=False,
+                         exact=False):
+    """
+    exact=True marks detected_cooldown as read from structured page state —
+    daily/store are then anchored to now + cooldown instead of the next
+    05:30 reset guess.
+    """
     h       = init_player_history(pid)
     ist_now = get_ist_time()
     nr      = get_next_daily_reset()
+    na_cd   = (ist_now + detected_cooldown).replace(microsecond=0) \
+              if (exact and detected_cooldown is not None) else nr
 
     if reward_type == "daily":
         if claimed_count > 0:
             h[pid]["daily"]["last_claim"]     = ist_now.isoformat()
             h[pid]["daily"]["next_available"] = nr.isoformat()
             h[pid]["daily"]["status"]         = "claimed"
+            record_day_progress(pid, _DAY_BIT_DAILY)
             log(f"📝 Daily claimed → next reset {nr.strftime('%I:%M %p IST')}")
         elif detected_cooldown is not None:
-            h[pid]["daily"]["next_available"] = nr.isoformat()
+            h[pid]["daily"]["next_available"] = na_cd.isoformat()
             h[pid]["daily"]["status"]         = "cooldown_detected"
-            log(f"📝 Daily cooldown anchored → {nr.strftime('%I:%M %p IST')}")
+            log(f"📝 Daily cooldown anchored → {na_cd.strftime('%I:%M %p IST')}")
         elif attempted:
             lc = h[pid]["daily"].get("last_claim")
             if lc and datetime.fromisoformat(lc) >= get_last_daily_reset():
@@ -322,11 +666,13 @@ def update_claim_history(pid, reward_type, claimed_count=0,
             h[pid]["store"][rk]["last_claim"]     = ist_now.isoformat()
             h[pid]["store"][rk]["next_available"] = nr.isoformat()
             h[pid]["store"][rk]["status"]         = "claimed"
+            record_day_progress(pid, 1 << reward_index)
             log(f"📝 Store {reward_index} claimed → next reset {nr.strftime('%I:%M %p IST')}")
         elif detected_cooldown is not None:
-            h[pid]["store"][rk]["next_available"] = nr.isoformat()
+            h[pid]["store"][rk]["next_available"] = na_cd.isoformat()
             h[pid]["store"][rk]["status"]         = "cooldown_detected"
-            log(f"📝 Store {reward_index} cooldown anchored → daily reset")
+            log(f"📝 Store {reward_index} cooldown anchored → "
+                f"{na_cd.strftime('%I:%M %p IST') if exact else 'daily reset'}")
         elif attempted:
             lc = h[pid]["store"][rk].get("last_claim")
             if lc and datetime.fromisoformat(lc) >= get_last_daily_reset():
@@ -434,14 +780,12 @@ def get_reward_status(pid):
     }
 
 
-def all_claimable_on_cooldown(pid, has_loyalty):
+def all_claimable_on_cooldown(pid, has_loyalty, verbose=True):
     """
     Returns True only when every claimable reward is on cooldown AND
     progression was visited within the last 4 hours.
     Loyalty uses only last_claim — never next_available alone (can be poisoned).
     """
-    PROGRESSION_CHECK_WINDOW_HOURS = 4
-
     s = get_reward_status(pid)
     if not s["daily_available"] and not any(s["store_available"]):
         h   = load_claim_history()
@@ -453,7 +797,8 @@ def all_claimable_on_cooldown(pid, has_loyalty):
         if last_visit:
             age_h = (ist - datetime.fromisoformat(last_visit)).total_seconds() / 3600
             if age_h >= PROGRESSION_CHECK_WINDOW_HOURS:
-                log(f"🔄 {pid}: progression not checked in {age_h:.1f}h — opening browser")
+                if verbose:
+                    log(f"🔄 {mask_pid(pid)}: progression not checked in {age_h:.1f}h — opening browser")
                 return False
         else:
             return False  # never visited — must open browser
@@ -471,27 +816,771 @@ def all_claimable_on_cooldown(pid, has_loyalty):
     return False
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 4A — RUN ARCHIVE (rolling trend analytics)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+RUN_ARCHIVE_FILE      = "run_archive.json"
+RUN_ARCHIVE_MAX_RUNS  = 240          # 30 days × 8 slots
+RUN_ARCHIVE_MAX_BYTES = 512 * 1024   # hard cap on file size after rotation
+RUN_ARCHIVE_DAYS      = 7            # rolling window for aggregates
+
+_REWARD_TYPES = ("daily", "store", "progression", "loyalty")
+
+# One-letter status codes keep per-player records small
+_STATUS_CODES = {
+    "Success": "S", "Partial": "P", "All Skipped (Cooldown)": "K",
+    "No Rewards": "N", "Login Failed": "L", "Error": "E", "Failed": "F",
+    "Deferred — hub unavailable": "D", "Deferred — run budget": "B",
+}
+_STATUS_NAMES = {v: k for k, v in _STATUS_CODES.items()}
+
+
+def load_run_archive():
+    if os.path.exists(RUN_ARCHIVE_FILE):
+        try:
+            with open(RUN_ARCHIVE_FILE, 'r') as f:
+                data = json.load(f)
+            data.setdefault("runs", [])
+            data.setdefault("days", {})
+            data.setdefault("agg", {})
+            return data
+        except Exception as e:
+            log(f"⚠️ Could not load {RUN_ARCHIVE_FILE}: {e}")
+    return {"runs": [], "days": {}, "agg": {}}
+
+
+def save_run_archive(archive):
+    try:
+        write_if_changed(RUN_ARCHIVE_FILE, _archive_dumps(archive))
+    except Exception as e:
+        log(f"⚠️ Could not save {RUN_ARCHIVE_FILE}: {e}")
+
+
+def _archive_dumps(archive):
+    # One run per line — compact, yet appends only touch the tail of the diff
+    head = json.dumps({k: v for k, v in archive.items() if k != "runs"},
+                      separators=(",", ":"), sort_keys=True)
+    runs = ",\n".join(json.dumps(r, separators=(",", ":")) for r in archive["runs"])
+    sep  = "," if head != "{}" else ""
+    return head[:-1] + sep + '"runs":[\n' + runs + "\n]}\n"
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    s = sorted(values)
+    k = (len(s) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(s) - 1)
+    return round(s[lo] + (s[hi] - s[lo]) * (k - lo), 1)
+
+
+def _compact_run_record(results, run_label, run_index, job_end, dur_s, eff):
+    return {
+        "ts":   job_end.strftime("%Y-%m-%dT%H:%M"),
+        "slot": run_index,
+        "lbl":  run_label,
+        "dur":  dur_s,
+        "eff":  eff,
+        "c":    [sum(r.get(t, 0) for r in results) for t in _REWARD_TYPES],
+        "p":    [
+            [r["pid"], _STATUS_CODES.get(r["status"], "?"), r.get("duration_s", 0),
+             [r.get(t, 0) for t in _REWARD_TYPES], r.get("possible", 0)]
+            for r in results
+        ],
+    }
+
+
+def _rotate_run_archive(archive):
+    runs = archive["runs"]
+    if len(runs) > RUN_ARCHIVE_MAX_RUNS:
+        del runs[:len(runs) - RUN_ARCHIVE_MAX_RUNS]
+    while len(runs) > 1 and len(_archive_dumps(archive).encode("utf-8")) > RUN_ARCHIVE_MAX_BYTES:
+        del runs[0]
+
+
+def _refresh_archive_aggregates(archive, ist_now):
+    """
+    Rebuilds the rolling aggregates over the last RUN_ARCHIVE_DAYS.
+    The daily claim counters are maintained incrementally by
+    update_run_archive(); only the window trim and percentiles run here.
+    """
+    cutoff = (ist_now - timedelta(days=RUN_ARCHIVE_DAYS - 1)).strftime("%Y-%m-%d")
+    for day in [d for d in archive["days"] if d < cutoff]:
+        del archive["days"][day]
+
+    recent = [r for r in archive["runs"] if r["ts"][:10] >= cutoff]
+    durs   = [r["dur"] for r in recent]
+    effs   = [r["eff"] for r in recent]
+    n_days = max(len(archive["days"]), 1)
+    totals = [sum(day["c"][i] for day in archive["days"].values())
+              for i in range(len(_REWARD_TYPES))]
+    cf_hits = sum(day.get("cf", 0) for day in archive["days"].values())
+
+    archive["agg"] = {
+        "window_days":  RUN_ARCHIVE_DAYS,
+        "runs":         len(recent),
+        "dur_p50":      _percentile(durs, 50),
+        "dur_p95":      _percentile(durs, 95),
+        "eff_avg":      round(sum(effs) / len(effs), 1) if effs else None,
+        "claims_per_day": {
+            t: round(totals[i] / n_days, 1) for i, t in enumerate(_REWARD_TYPES)
+        },
+        "cloudflare_per_day": round(cf_hits / n_days, 1),
+    }
+
+
+def update_run_archive(results, run_label, run_index, job_end, dur_s, eff,
+                       cloudflare_hits=0):
+    """
+    Appends this run to the rolling archive, bumps the per-day counters,
+    rotates by run count and byte size, and refreshes the aggregates.
+    Returns the aggregate dict for the email trend strip.
+    """
+    archive = load_run_archive()
+    record  = _compact_run_record(results, run_label, run_index, job_end, dur_s, eff)
+    archive["runs"].append(record)
+
+    day = archive["days"].setdefault(
+        job_end.strftime("%Y-%m-%d"), {"runs": 0, "c": [0, 0, 0, 0], "cf": 0})
+    day["runs"] += 1
+    day["c"]     = [a + b for a, b in zip(day["c"], record["c"])]
+    day["cf"]   += cloudflare_hits
+
+    _refresh_archive_aggregates(archive, job_end)
+    _rotate_run_archive(archive)
+    save_run_archive(archive)
+    return archive["agg"]
+
+
+def rerun_base(runs, started):
+    """The newest archived run if it is from the re-run's IST day, else None."""
+    if runs and runs[-1]["ts"][:10] == started.strftime("%Y-%m-%d"):
+        return runs[-1]
+    return None
+
+
+def merge_rerun_into_archive(results, started, job_end, dur_s, eff, cloudflare_hits=0):
+    """
+    Folds a targeted re-run into the newest archived run instead of adding a
+    run: the merged rows replace the old per-player entries, the run totals
+    are recounted and the day counters grow by what the re-run claimed.
+    A re-run on a later IST day than the newest run is appended as its own
+    run instead, so it never rewrites another day's record.
+    Returns the aggregate dict for the email trend strip.
+    """
+    archive = load_run_archive()
+    last    = rerun_base(archive["runs"], started)
+    if last is None:
+        log("ℹ️  Newest archived run is from another day — re-run archived as a new run")
+        return update_run_archive(results, "Targeted Re-run", -1, job_end, dur_s, eff,
+                                  cloudflare_hits=cloudflare_hits)
+    fresh = {rec[0]: rec for rec in _compact_run_record(results, "", 0, job_end, 0, eff)["p"]}
+    old_c = list(last["c"])
+    last["p"]  = [fresh.get(rec[0], rec) for rec in last["p"]]
+    last["c"]  = [sum(rec[3][i] for rec in last["p"]) for i in range(len(_REWARD_TYPES))]
+    last["eff"] = eff
+    last["rr"]  = last.get("rr", 0) + 1
+
+    day = archive["days"].setdefault(
+        job_end.strftime("%Y-%m-%d"), {"runs": 0, "c": [0, 0, 0, 0], "cf": 0})
+    day["c"]   = [a + max(0, n - o) for a, n, o in zip(day["c"], last["c"], old_c)]
+    day["cf"] += cloudflare_hits
+
+    _refresh_archive_aggregates(archive, job_end)
+    save_run_archive(archive)
+    return archive["agg"]
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # SECTION 5 — CHROME DRIVER
 # ═══════════════════════════════════════════════════════════════════════════════
 
+_chrome_major = []   # memo: [version] once detected
+
+
 def get_chrome_major_version():
+    if _chrome_major:
+        return _chrome_major[0]
     for binary in ["google-chrome", "google-chrome-stable", "chromium-browser", "chromium"]:
         try:
             res = subprocess.run([binary, "--version"], capture_output=True, text=True, timeout=5)
             if res.stdout.strip():
                 v = int(res.stdout.strip().split()[-1].split(".")[0])
                 log(f"🔍 Chrome v{v} detected via {binary}")
+                _chrome_major.append(v)
                 return v
         except:
             continue
     log("⚠️ Chrome version detection failed — using uc auto-detect")
+    _chrome_major.append(None)
+    return None
+
+
+# ── Profile template & driver cache ─────────────────────────────────────────────
+# A prepared user-data-dir (prefs, blocked content settings, first-run flags,
+# cookie consent) is cloned per launch into tmpfs, and the uc-patched
+# chromedriver is cached per Chrome major version so it is patched once.
+
+USE_PROFILE_TEMPLATE = os.getenv("CHROME_PROFILE_TEMPLATE", "1") != "0"
+BOT_CACHE_DIR        = os.path.expanduser(os.getenv("BOT_CACHE_DIR", "~/.cache/cs-rewards-bot"))
+PROFILE_TEMPLATE_DIR = os.path.join(BOT_CACHE_DIR, "profile-template")
+PROFILE_TMP_ROOT     = "/dev/shm" if os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+
+_CONTENT_SETTINGS = {"images": 2, "notifications": 2, "popups": 2}
+
+
+def ensure_profile_template():
+    prefs_path = os.path.join(PROFILE_TEMPLATE_DIR, "Default", "Preferences")
+    if os.path.exists(prefs_path):
+        return PROFILE_TEMPLATE_DIR
+    os.makedirs(os.path.dirname(prefs_path), exist_ok=True)
+    with open(prefs_path, "w") as f:
+        json.dump({
+            "profile": {"default_content_setting_values": _CONTENT_SETTINGS,
+                        "exit_type": "Normal", "exited_cleanly": True,
+                        "password_manager_enabled": False},
+            "credentials_enable_service": False,
+            "browser": {"has_seen_welcome_page": True, "check_default_browser": False},
+            "translate": {"enabled": False},
+        }, f)
+    with open(os.path.join(PROFILE_TEMPLATE_DIR, "Local State"), "w") as f:
+        json.dump({"browser": {"enabled_labs_experiments": []}}, f)
+    open(os.path.join(PROFILE_TEMPLATE_DIR, "First Run"), "w").close()
+    log(f"🧩 Chrome profile template prepared at {PROFILE_TEMPLATE_DIR}")
+    return PROFILE_TEMPLATE_DIR
+
+
+def save_consent_to_template(cookies):
+    try:
+        with open(os.path.join(ensure_profile_template(), "consent_cookies.json"), "w") as f:
+            json.dump(cookies, f)
+    except Exception:
+        pass
+
+
+def load_consent_from_template():
+    try:
+        with open(os.path.join(PROFILE_TEMPLATE_DIR, "consent_cookies.json")) as f:
+            # Filter again: a cached template may predate the allow-list
+            CONSENT.load([c for c in json.load(f) if CONSENT.matches(c.get("name", ""))])
+    except Exception:
+        pass
+
+
+def clone_profile():
+    """
+    Fresh copy of the template on tmpfs. A real copy, not hardlinks —
+    Chrome rewrites SQLite files in place and would corrupt the template.
+    """
+    dst = tempfile.mkdtemp(prefix="cs-prof-", dir=PROFILE_TMP_ROOT)
+    shutil.copytree(ensure_profile_template(), dst, dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns("consent_cookies.json"))
+    return dst
+
+
+def cached_chromedriver(chrome_v):
+    path = os.path.join(BOT_CACHE_DIR, f"chromedriver-{chrome_v}")
+    return path if chrome_v and os.path.exists(path) else None
+
+
+def _cache_chromedriver(driver, chrome_v):
+    if not chrome_v or cached_chromedriver(chrome_v):
+        return
+    src = getattr(getattr(driver, "patcher", None), "executable_path", None)
+    if not src or not os.path.exists(src):
+        return
+    try:
+        os.makedirs(BOT_CACHE_DIR, exist_ok=True)
+        dst = os.path.join(BOT_CACHE_DIR, f"chromedriver-{chrome_v}")
+        shutil.copy2(src, dst + ".tmp")
+        os.replace(dst + ".tmp", dst)
+        log(f"🧩 Patched chromedriver cached for Chrome v{chrome_v}")
+    except Exception as e:
+        log(f"⚠️ chromedriver cache failed: {str(e)[:80]}")
+
+
+# ── Resource accounting ─────────────────────────────────────────────────────────
+# Each driver gets a sampler thread summing RSS and CPU time over the
+# chromedriver + Chrome process trees (psutil when installed, else /proc).
+# process_player folds the samples into its stats and recycles a driver
+# whose tree grows past DRIVER_RSS_LIMIT_MB between phases.
+
+DRIVER_RSS_LIMIT_MB = int(os.getenv("DRIVER_RSS_LIMIT_MB", "1500"))
+RES_SAMPLE_S        = 1.0
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_CLK_TCK   = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _proc_tree_usage(roots):
+    """Returns {pid: (rss_bytes, cpu_seconds)} for roots and all descendants."""
+    out = {}
+    if psutil is not None:
+        for r in roots:
+            try:
+                proc = psutil.Process(r)
+                for pr in [proc] + proc.children(recursive=True):
+                    try:
+                        ct = pr.cpu_times()
+                        out[pr.pid] = (pr.memory_info().rss, ct.user + ct.system)
+                    except psutil.Error:
+                        pass
+            except psutil.Error:
+                pass
+        return out
+    kids, stat = {}, {}
+    for d in os.listdir("/proc"):
+        if not d.isdigit():
+            continue
+        try:
+            with open(f"/proc/{d}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            kids.setdefault(int(fields[1]), []).append(int(d))
+            stat[int(d)] = (int(fields[11]) + int(fields[12])) / _CLK_TCK
+        except (OSError, IndexError, ValueError):
+            pass
+    todo = [r for r in roots if r in stat]
+    while todo:
+        pid = todo.pop()
+        if pid in out:
+            continue
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                rss = int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+        out[pid] = (rss, stat[pid])
+        todo += kids.get(pid, [])
+    return out
+
+
+class ResourceSampler:
+    def __init__(self, driver):
+        roots = [getattr(getattr(driver, "service", None), "process", None),
+                 getattr(driver, "browser_pid", None)]
+        self.roots = [r.pid if hasattr(r, "pid") else r for r in roots if r]
+        self.peak_mb = self.last_mb = 0.0
+        self._sum_mb, self.samples = 0.0, 0
+        self._cpu    = {}          # pid → last cumulative CPU s (exited processes keep theirs)
+        self._stop   = threading.Event()
+
+    def _sample(self):
+        usage = _proc_tree_usage(self.roots)
+        if not usage:
+            return
+        mb = sum(r for r, _ in usage.values()) / 1048576
+        for pid, (_, cpu) in usage.items():
+            self._cpu[pid] = max(cpu, self._cpu.get(pid, 0.0))
+        self.last_mb  = mb
+        self.peak_mb  = max(self.peak_mb, mb)
+        self._sum_mb += mb
+        self.samples += 1
+
+    def _loop(self):
+        while True:
+            try:
+                self._sample()
+            except Exception:
+                pass
+            if self._stop.wait(RES_SAMPLE_S):
+                return
+
+    def start(self):
+        if self.roots:
+            threading.Thread(target=self._loop, name="res-sampler", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        return self.summary()
+
+    def summary(self):
+        return {"peak_mb": round(self.peak_mb), "samples": self.samples,
+                "avg_mb": round(self._sum_mb / self.samples) if self.samples else 0,
+                "cpu_s": round(sum(self._cpu.values()), 1)}
+
+
+def available_memory_mb():
+    """MemAvailable in MB (psutil or /proc/meminfo), or None if unknown."""
+    if psutil is not None:
+        return psutil.virtual_memory().available // (1024 * 1024)
+    try:
+        with open("/proc/meminfo") as f:
+            for ln in f:
+                if ln.startswith("MemAvailable:"):
+                    return int(ln.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
     return None
 
 
-def create_driver():
-    chrome_v = get_chrome_major_version()
+def merge_resources(stats, summary):
+    """Folds one driver's sampler summary into a player's stats (several if recycled)."""
+    if not summary or not summary["samples"]:
+        return
+    n0 = stats.get("res_samples", 0)
+    n  = n0 + summary["samples"]
+    stats["rss_avg_mb"]  = round((stats.get("rss_avg_mb", 0) * n0
+                                  + summary["avg_mb"] * summary["samples"]) / n)
+    stats["rss_peak_mb"] = max(stats.get("rss_peak_mb", 0), summary["peak_mb"])
+    stats["cpu_s"]       = round(stats.get("cpu_s", 0) + summary["cpu_s"], 1)
+    stats["res_samples"] = n
+
+
+def worker_memory(results):
+    """{worker: {"peak_mb", "avg_mb", "cpu_s", "players"}} over the players that opened Chrome."""
+    out = {}
+    for r in results:
+        if not r.get("res_samples"):
+            continue
+        w = out.setdefault(r.get("worker", "main"),
+                           {"peak_mb": 0, "avg_mb": 0, "cpu_s": 0.0, "players": 0, "_n": 0})
+        n = w["_n"] + r["res_samples"]
+        w["avg_mb"]  = round((w["avg_mb"] * w["_n"] + r["rss_avg_mb"] * r["res_samples"]) / n)
+        w["peak_mb"] = max(w["peak_mb"], r["rss_peak_mb"])
+        w["cpu_s"]   = round(w["cpu_s"] + r["cpu_s"], 1)
+        w["players"] += 1
+        w["_n"] = n
+    for w in out.values():
+        del w["_n"]
+    return out
+
+
+# ── Failure diagnostics ─────────────────────────────────────────────────────────
+# Only failure paths call DIAG.capture(): a JPEG screenshot, the page HTML with
+# scripts/styles/SVG stripped and the last DIAG_EVENTS console and network
+# events. Captures go into one zip next to debug_email.html, capped per run by
+# count and archive bytes — successful players never pay for any of it.
+
+DIAG_ARCHIVE      = "diagnostics.zip"
+DIAG_MAX_CAPTURES = int(os.getenv("DIAG_MAX_CAPTURES", "12"))
+DIAG_MAX_BYTES    = int(os.getenv("DIAG_MAX_MB", "8")) * 1024 * 1024
+DIAG_HTML_MAX     = 256 * 1024
+DIAG_EVENTS       = 40
+DIAG_JPEG_QUALITY = 55
+
+_NAME_SELECTOR = ('[class*="username"],[class*="display-name"],[class*="player-name"],'
+                  '[class*="user-name"],[class*="nickname"],[data-testid="username"],'
+                  '[data-testid="display-name"]')
+
+# Blanks the player's display name in a cloned `root` (shared with _JS_SNAPSHOT)
+_JS_BLANK_NAME = """
+root.querySelectorAll('""" + _NAME_SELECTOR + """')
+    .forEach(function(n){ n.textContent = 'Player'; });
+"""
+
+# The screenshot is of the live page: its name and ID text nodes are swapped
+# out for the capture and put back by _JS_UNMASK_LIVE, leaving elements intact.
+_JS_MASK_LIVE = """
+var pid = arguments[0], saved = [];
+function swap(t, v) { saved.push([t, t.nodeValue]); t.nodeValue = v; }
+document.querySelectorAll('""" + _NAME_SELECTOR + """').forEach(function(n){
+    var w = document.createTreeWalker(n, NodeFilter.SHOW_TEXT), t, first = true;
+    while ((t = w.nextNode())) { swap(t, first ? 'Player' : ''); first = false; }
+});
+if (pid && pid.length > 3 && document.body) {
+    var w = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT), t;
+    while ((t = w.nextNode()))
+        if (t.nodeValue.indexOf(pid) !== -1) swap(t, t.nodeValue.split(pid).join('PLAYER'));
+}
+window.__csUnmask = saved;
+return saved.length;
+"""
+
+_JS_UNMASK_LIVE = """
+var saved = window.__csUnmask || [];
+for (var i = saved.length - 1; i >= 0; i--) saved[i][0].nodeValue = saved[i][1];
+delete window.__csUnmask;
+"""
+
+_JS_TRIMMED_HTML = """
+var root = document.documentElement.cloneNode(true);
+root.querySelectorAll('script,style,noscript,svg,link,iframe,template')
+    .forEach(function(n){ n.remove(); });
+root.querySelectorAll('img,source').forEach(function(n){
+    if ((n.getAttribute('src') || '').indexOf('data:') === 0) n.setAttribute('src', 'data:,');
+    n.removeAttribute('srcset');
+});
+""" + _JS_BLANK_NAME + """
+return root.outerHTML;
+"""
+
+# Fallback network view when the performance log was already drained
+_JS_RESOURCE_TIMING = """
+return performance.getEntriesByType('resource').slice(-arguments[0]).map(function(e){
+    return {url: e.name.slice(0, 200), type: e.initiatorType, ms: Math.round(e.duration),
+            bytes: e.transferSize || 0, status: e.responseStatus || null};
+});
+"""
+
+
+def _diag_screenshot(driver, pid):
+    """Screenshot with the display name and ID masked; None if masking fails."""
+    try:
+        driver.execute_script(_JS_MASK_LIVE, pid)
+    except Exception:
+        return None, None    # never upload an unmasked page
+    try:
+        try:
+            shot = driver.execute_cdp_cmd("Page.captureScreenshot",
+                                          {"format": "jpeg", "quality": DIAG_JPEG_QUALITY})
+            return base64.b64decode(shot["data"]), "jpg"
+        except Exception:
+            pass
+        try:
+            return driver.get_screenshot_as_png(), "png"
+        except Exception:
+            return None, None
+    finally:
+        try:
+            driver.execute_script(_JS_UNMASK_LIVE)
+        except Exception:
+            pass
+
+
+def _unlink_pid(text, pid):
+    return text.replace(pid, "PLAYER") if pid and len(pid) > 3 else text
+
+
+def _diag_html(driver, pid):
+    try:
+        html = driver.execute_script(_JS_TRIMMED_HTML) or ""
+    except Exception:
+        try:
+            html = driver.page_source or ""
+        except Exception:
+            return ""
+    html = _unlink_pid(html, pid)
+    if len(html) > DIAG_HTML_MAX:
+        html = html[:DIAG_HTML_MAX] + "\n<!-- trimmed -->"
+    return html
+
+
+def _diag_console(driver):
+    try:
+        entries = driver.get_log("browser")
+    except Exception:
+        return []
+    return [{"t": e.get("timestamp"), "level": e.get("level"),
+             "msg": str(e.get("message", ""))[:300]} for e in entries[-DIAG_EVENTS:]]
+
+
+def _diag_network(driver):
+    out = []
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        entries = []
+    for e in entries:
+        try:
+            msg = json.loads(e["message"])["message"]
+        except Exception:
+            continue
+        m, p = msg.get("method"), msg.get("params", {})
+        if m == "Network.responseReceived":
+            r = p.get("response", {})
+            out.append({"t": e.get("timestamp"), "url": r.get("url", "")[:200],
+                        "status": r.get("status"), "mime": r.get("mimeType")})
+        elif m == "Network.loadingFailed":
+            out.append({"t": e.get("timestamp"), "error": p.get("errorText"),
+                        "type": p.get("type"), "canceled": p.get("canceled")})
+    if out:
+        return out[-DIAG_EVENTS:]
+    try:
+        return driver.execute_script(_JS_RESOURCE_TIMING, DIAG_EVENTS) or []
+    except Exception:
+        return []
+
+
+class FailureDiagnostics:
+    """Per-run failure capture into a single bounded zip; thread-safe across worker lanes."""
+
+    __slots__ = ("path", "max_captures", "max_bytes", "_lock", "_zip", "_seen",
+                 "manifest", "dropped", "bytes")
+
+    def __init__(self, path=DIAG_ARCHIVE, max_captures=DIAG_MAX_CAPTURES,
+                 max_bytes=DIAG_MAX_BYTES):
+        self.path         = path
+        self.max_captures = max_captures
+        self.max_bytes    = max_bytes
+        self._lock        = threading.Lock()
+        self._zip         = None
+        self._seen        = set()
+        self.manifest     = []
+        self.dropped      = 0
+        self.bytes        = 0
+
+    def has(self, pid):
+        with self._lock:
+            return any(p == pid for p, _ in self._seen)
+
+    def capture(self, driver, pid, tag, reason=""):
+        """Saves one capture for (pid, tag); returns False if capped, duplicate or no driver."""
+        if driver is None:
+            return False
+        with self._lock:
+            if (pid, tag) in self._seen:
+                return False
+            if len(self._seen) >= self.max_captures or self.bytes >= self.max_bytes:
+                self.dropped += 1
+                return False
+            self._seen.add((pid, tag))
+            n = len(self._seen)
+
+        # Driver round-trips happen outside the lock — other lanes keep capturing
+        t0 = time.time()
+        shot, ext = _diag_screenshot(driver, pid)
+        html      = _diag_html(driver, pid)
+        try:
+            url, title = _unlink_pid(driver.current_url, pid), _unlink_pid(driver.title, pid)
+        except Exception:
+            url, title = None, None
+        label  = mask_pid(pid)
+        events = {"pid": label, "tag": tag, "reason": _unlink_pid(str(reason), pid)[:300],
+                  "at": get_ist_time().isoformat(timespec="seconds"),
+                  "url": url, "title": title,
+                  "console": _diag_console(driver), "network": _diag_network(driver)}
+
+        base = f"{n:02d}_{pid[-4:]}_{tag}/"
+        with self._lock:
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.path, "w", zipfile.ZIP_DEFLATED)
+            files = []
+            if shot and self.bytes + len(shot) <= self.max_bytes:
+                # JPEG/PNG are already compressed — store as is
+                self._zip.writestr(base + "screenshot." + ext, shot, zipfile.ZIP_STORED)
+                files.append("screenshot." + ext)
+            elif shot:
+                events["screenshot"] = "dropped — archive byte cap"
+            if html:
+                self._zip.writestr(base + "page.html", html)
+                files.append("page.html")
+            self._zip.writestr(base + "events.json", _unlink_pid(
+                json.dumps(events, indent=1, default=str), pid))
+            files.append("events.json")
+            self.bytes = sum(i.compress_size for i in self._zip.infolist())
+            self.manifest.append({"dir": base, "pid": label, "tag": tag,
+                                  "reason": events["reason"], "url": url, "files": files})
+        log(f"🩺 Diagnostics [{tag}] for {label}: {events['reason'][:80]} "
+            f"({time.time() - t0:.1f}s)")
+        return True
+
+    def discard_stale(self):
+        """Removes a previous run's archive so it is not uploaded with this run."""
+        with self._lock:
+            if self._zip is None and os.path.exists(self.path):
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+
+    def close(self):
+        """Finalises the archive if anything was captured. Idempotent."""
+        with self._lock:
+            if self._zip is not None:
+                self._zip.writestr("manifest.json", json.dumps(
+                    {"captures": self.manifest, "dropped": self.dropped}, indent=1))
+                self._zip.close()
+                self._zip = None
+                self.bytes = os.path.getsize(self.path)
+                log(f"🩺 {len(self.manifest)} failure capture(s) → {self.path} "
+                    f"({self.bytes / 1024:.0f} KB)"
+                    + (f", {self.dropped} dropped over cap" if self.dropped else ""))
+        return {"captures": len(self.manifest), "dropped": self.dropped, "bytes": self.bytes}
+
+
+DIAG = FailureDiagnostics()
+atexit.register(DIAG.close)
+
+
+# ── Animation-free pages ───────────────────────────────────────────────────────
+# Injected at document start on every navigation (CDP): CSS transitions and
+# animations finish instantly, smooth scrolling becomes instant and
+# prefers-reduced-motion matches. Drivers where this took are tagged _cs_still;
+# settle() then skips waits that only existed for a scroll, modal or toast to
+# finish moving. ANIMATION_FREE=0 restores the animated pages and full waits.
+
+ANIMATION_FREE = os.getenv("ANIMATION_FREE", "1") != "0"
+
+_JS_NO_MOTION = """
+(function () {
+    var css = '*, *::before, *::after {'
+        + 'animation-duration: 0.01ms !important; animation-delay: 0s !important;'
+        + 'animation-iteration-count: 1 !important;'
+        + 'transition-duration: 0.01ms !important; transition-delay: 0s !important;'
+        + 'scroll-behavior: auto !important; }';
+    try {
+        var sheet = new CSSStyleSheet();
+        sheet.replaceSync(css);
+        document.adoptedStyleSheets = document.adoptedStyleSheets.concat([sheet]);
+    } catch (e) {
+        document.addEventListener('DOMContentLoaded', function () {
+            var st = document.createElement('style');
+            st.textContent = css;
+            (document.head || document.documentElement).appendChild(st);
+        });
+    }
+    function instant(fn) {
+        return function (arg) {
+            if (arg && typeof arg === 'object' && arg.behavior === 'smooth')
+                arguments[0] = Object.assign({}, arg, {behavior: 'auto'});
+            return fn.apply(this, arguments);
+        };
+    }
+    ['scrollIntoView', 'scroll', 'scrollTo', 'scrollBy'].forEach(function (m) {
+        if (Element.prototype[m]) Element.prototype[m] = instant(Element.prototype[m]);
+    });
+    ['scroll', 'scrollTo', 'scrollBy'].forEach(function (m) { window[m] = instant(window[m]); });
+})();
+"""
+
+
+def disable_animations(driver):
+    """Registers the no-motion script for every future document. Returns True if it took."""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": _JS_NO_MOTION})
+        driver.execute_cdp_cmd("Emulation.setEmulatedMedia", {
+            "features": [{"name": "prefers-reduced-motion", "value": "reduce"}]})
+        driver._cs_still = True
+    except Exception as e:
+        log(f"⚠️ Animation-free mode unavailable: {str(e)[:80]}")
+        driver._cs_still = False
+    return driver._cs_still
+
+
+def settle(driver, seconds, still=0.0):
+    """Waits for UI motion: `seconds` on animated pages, `still` on animation-free ones."""
+    time.sleep(still if getattr(driver, "_cs_still", False) else seconds)
+
+
+def quit_driver(driver, stats=None):
+    """driver.quit() plus removal of the cloned tmpfs profile; folds resource use into stats."""
+    sampler = getattr(driver, "_cs_res", None)
+    if sampler:
+        driver._cs_res = None      # quit twice (recycle + finally) must not count twice
+        summary = sampler.stop()
+        if stats is not None:
+            merge_resources(stats, summary)
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    prof = getattr(driver, "_cs_profile_dir", None)
+    if prof:
+        shutil.rmtree(prof, ignore_errors=True)
+
+
+def create_driver(templated=None):
+    chrome_v  = get_chrome_major_version()
+    templated = USE_PROFILE_TEMPLATE if templated is None else templated
     for attempt in range(3):
+        prof = None
         try:
             opts = uc.ChromeOptions()
             if HEADLESS:
@@ -505,34 +1594,377 @@ def create_driver():
             opts.add_argument("--disable-notifications")
             opts.add_argument("--disable-popup-blocking")
             opts.add_argument("--remote-debugging-port=0")
-            opts.add_experimental_option("prefs", {
-                "profile.default_content_setting_values": {
-                    "images": 2, "notifications": 2, "popups": 2
-                }
-            })
+            # Performance log → Network events, used to read the hub's JSON responses;
+            # browser log → console messages, only drained by failure diagnostics
+            opts.set_capability("goog:loggingPrefs", {"performance": "ALL", "browser": "ALL"})
             kwargs = {"version_main": chrome_v} if chrome_v else {}
+            if templated:
+                prof = clone_profile()
+                kwargs["user_data_dir"] = prof
+                drv_path = cached_chromedriver(chrome_v)
+                if drv_path:
+                    kwargs["driver_executable_path"] = drv_path
+            else:
+                opts.add_experimental_option("prefs", {
+                    "profile.default_content_setting_values": _CONTENT_SETTINGS
+                })
+            bump_stat("driver_launches")
             driver = uc.Chrome(options=opts, use_subprocess=True, **kwargs)
+            driver._cs_profile_dir = prof
+            driver._cs_res = ResourceSampler(driver).start()
             driver.set_page_load_timeout(30)
-            driver.set_script_timeout(30)
-            log(f"✅ Driver ready (Chrome v{chrome_v or 'auto'})")
+            driver.set_script_timeout(SCRIPT_TIMEOUT_S)
+            if ANIMATION_FREE:
+                disable_animations(driver)
+            if templated:
+                _cache_chromedriver(driver, chrome_v)
+            if CF_CLEARANCE.import_into(driver):
+                log("🍪 Shared Cloudflare clearance imported")
+            CONSENT.import_into(driver)
+            log(f"✅ Driver ready (Chrome v{chrome_v or 'auto'}"
+                f"{', templated profile' if templated else ''}"
+                f"{', animation-free' if getattr(driver, '_cs_still', False) else ''})")
             return driver
         except Exception as e:
+            if prof:
+                shutil.rmtree(prof, ignore_errors=True)
+            bump_stat("driver_launch_failures")
             log(f"⚠️ Driver init attempt {attempt+1} failed: {str(e)[:100]}")
             time.sleep(2)
             if attempt == 2:
                 raise
 
 
+def bench_startup(rounds=3):
+    """Cold vs templated launch micro-benchmark: python master_claimer.py --bench-startup"""
+    rows = []
+    for mode in ("cold", "templated"):
+        times = []
+        for _ in range(rounds):
+            t0 = time.time()
+            drv = create_driver(templated=(mode == "templated"))
+            drv.get("about:blank")
+            times.append(time.time() - t0)
+            quit_driver(drv)
+        rows.append((mode, min(times), sum(times) / len(times), max(times)))
+    log(f"{'mode':<10} {'min':>7} {'avg':>7} {'max':>7}  (seconds, {rounds} launches)")
+    for mode, lo, avg, hi in rows:
+        log(f"{mode:<10} {lo:7.2f} {avg:7.2f} {hi:7.2f}")
+    return rows
+
+
+PREFETCH_DRIVERS = os.getenv("PREFETCH_DRIVERS", "1") != "0"
+PREFETCH_WAIT_S  = 120    # launch + warm; a prefetch still running after this is dropped
+
+
+def warm_driver(driver):
+    """
+    Loads the hub, clears Cloudflare and accepts cookies ahead of login.
+    Only a driver past the challenge is marked warm; otherwise login runs
+    its own Cloudflare check and reports the failure as such.
+    """
+    hub_get(driver, "https://hub.vertigogames.co/daily-rewards")
+    if not bypass_cloudflare(driver):
+        log("⚠️ Prefetched browser still on the Cloudflare challenge — login will retry")
+        driver._cs_warm = False
+        return driver
+    accept_cookies(driver)
+    driver._cs_warm = True
+    return driver
+
+
+class DriverPrefetcher:
+    """
+    Double buffer: while one player claims, the next player's Chrome is
+    launched and warmed on a background thread. At most one driver is
+    buffered; take() hands it over if it was built for that player.
+    """
+
+    def __init__(self):
+        self._lock   = threading.Lock()
+        self._thread = None
+        self._pid    = None
+        self._driver = None
+        self._error  = None
+
+    def start(self, pid):
+        with self._lock:
+            if self._pid == pid:
+                return
+        self.discard()
+        with self._lock:
+            self._pid, self._driver, self._error = pid, None, None
+            self._thread = threading.Thread(target=self._build, args=(pid,),
+                                            name="prefetch", daemon=True)
+            self._thread.start()
+
+    def _build(self, pid):
+        bind_log(player=mask_pid(pid), phase="prefetch")
+        t0 = time.time()
+        try:
+            drv = warm_driver(create_driver())
+            log(f"⚡ Prefetched browser for …{pid[-4:]} in {time.time() - t0:.1f}s")
+        except Exception as e:
+            drv = None
+            self._error = e
+            log(f"⚠️ Prefetch failed for …{pid[-4:]}: {str(e)[:80]}")
+        with self._lock:
+            if self._pid == pid:
+                self._driver = drv
+                return
+        if drv:   # discarded while building
+            quit_driver(drv)
+
+    def take(self, pid):
+        """The warmed driver for pid (waits up to PREFETCH_WAIT_S for the launch), or None."""
+        with self._lock:
+            if self._pid != pid or self._thread is None:
+                return None
+            t = self._thread
+        t.join(timeout=PREFETCH_WAIT_S)
+        if t.is_alive():
+            log(f"⚠️ Prefetch for …{pid[-4:]} still running after {PREFETCH_WAIT_S}s — dropped")
+            with self._lock:   # _build() sees the pid changed and quits its own driver
+                self._pid, self._driver, self._thread = None, None, None
+            return None
+        with self._lock:
+            drv, self._driver, self._pid, self._thread = self._driver, None, None, None
+        return drv
+
+    def discard(self):
+        with self._lock:
+            t, drv = self._thread, self._driver
+            self._pid, self._driver, self._thread = None, None, None
+        if t is not None and drv is None:
+            t.join(timeout=PREFETCH_WAIT_S)   # _build() sees the pid changed and quits its driver
+        if drv:
+            quit_driver(drv)
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # SECTION 6 — BROWSER HELPERS
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def bypass_cloudflare(driver):
-    try:
+# ── Hub rate limiter ───────────────────────────────────────────────────────────
+# One token bucket shared by every driver and thread. Navigations and claim
+# clicks take a token; throttling signals (challenge page, HTTP 429, empty
+# body) halve the refill rate and a streak of clean pages restores it.
+
+HUB_RATE_PER_S   = float(os.getenv("HUB_RATE_PER_S", "1.0"))
+HUB_RATE_BURST   = int(os.getenv("HUB_RATE_BURST", "4"))
+HUB_RATE_MIN     = 0.1    # floor after repeated backoffs (1 request / 10 s)
+HUB_RECOVER_AFTER = 5     # clean responses before the rate is doubled back
+
+_JS_PAGE_HEALTH = """
+var nav = performance.getEntriesByType('navigation')[0] || {};
+var res = performance.getEntriesByType('resource');
+var n429 = 0;
+// Only the hub's own 429s — third-party analytics/CDN throttling is not ours to slow for
+for (var i = 0; i < res.length; i++)
+    if (res[i].responseStatus === 429 && res[i].name.indexOf(location.origin) === 0) n429++;
+return [nav.responseStatus || 0, n429,
+        document.body ? document.body.innerText.trim().length : 0,
+        document.title || ''];
+"""
+
+
+class HubRateLimiter:
+    def __init__(self, rate, burst):
+        self._lock   = threading.Lock()
+        self.base    = rate
+        self.rate    = rate
+        self.burst   = burst
+        self._tokens = float(burst)
+        self._stamp  = time.monotonic()
+        self._clean  = 0
+
+    def acquire(self, kind="nav"):
+        """Blocks until a token is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp  = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    bump_stat("limiter_acquires")
+                    if waited:
+                        bump_stat("limiter_waits")
+                        bump_stat("limiter_wait_s", waited)
+                    return waited
+                need = (1 - self._tokens) / self.rate
+            time.sleep(need)
+            waited += need
+
+    def penalize(self, reason):
+        with self._lock:
+            self.rate    = max(HUB_RATE_MIN, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)   # drain the burst
+            self._clean  = 0
+            bump_stat("limiter_backoffs")
+            rate = self.rate
+        log(f"🐢 Hub throttling signal ({reason}) — rate now {rate:.2f}/s")
+
+    def ok(self):
+        with self._lock:
+            if self.rate >= self.base:
+                return
+            self._clean += 1
+            if self._clean >= HUB_RECOVER_AFTER:
+                self.rate   = min(self.base, self.rate * 2)
+                self._clean = 0
+
+
+HUB_LIMITER = HubRateLimiter(HUB_RATE_PER_S, HUB_RATE_BURST)
+
+
+def hub_get(driver, url):
+    """driver.get() behind the shared limiter, feeding throttling signals back into it."""
+    HUB_LIMITER.acquire("nav")
+    driver.get(url)
+    try:
+        status, n429, body_len, title = driver.execute_script(_JS_PAGE_HEALTH)
+    except Exception:
+        return
+    title = title.lower()
+    if status == 429 or n429 or "too many requests" in title:
+        HUB_LIMITER.penalize("HTTP 429")
+    elif "just a moment" in title:
+        return   # bypass_cloudflare() reports the challenge
+    elif body_len == 0 and status >= 400:
+        HUB_LIMITER.penalize(f"empty HTTP {status} response")
+    elif body_len == 0:
+        return   # client-rendered page not hydrated yet — no signal either way
+    else:
+        HUB_LIMITER.ok()
+
+
+class SharedCookieJar:
+    """
+    Run-wide cookie set shared by every driver, imported over CDP before a
+    driver's first driver.get(). Thread-safe so parallel workers can share
+    one export. Subclasses pick which cookies to keep by exact name and/or
+    name prefix — anything else (sessions, auth) never crosses drivers.
+    """
+    label     = "cookies"
+    share_ua  = False
+    names     = frozenset()
+    prefixes  = ()
+
+    def __init__(self):
+        self._lock    = threading.Lock()
+        self._cookies = None
+        self._ua      = None
+
+    def matches(self, name):
+        return name in self.names or bool(self.prefixes) and name.startswith(self.prefixes)
+
+    def available(self):
+        with self._lock:
+            if not self._cookies:
+                return False
+            now = time.time()
+            return all(c.get("expiry", now + 1) > now for c in self._cookies)
+
+    def export_from(self, driver):
+        try:
+            cookies = [c for c in driver.get_cookies() if self.matches(c.get("name", ""))]
+            ua = driver.execute_script("return navigator.userAgent") if self.share_ua else None
+        except Exception as e:
+            log(f"⚠️ {self.label} export failed: {str(e)[:80]}")
+            return False
+        if not cookies:
+            return False
+        self.load(cookies, ua)
+        log(f"🍪 {self.label} exported ({len(cookies)} cookies) — shared with later drivers")
+        return True
+
+    def load(self, cookies, ua=None):
+        with self._lock:
+            self._cookies, self._ua = list(cookies), ua
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._cookies or [])
+
+    def import_into(self, driver):
+        if not self.available():
+            return False
+        with self._lock:
+            cookies, ua = list(self._cookies), self._ua
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            if ua:
+                driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": ua})
+            for c in cookies:
+                params = {
+                    "name": c["name"], "value": c["value"],
+                    "domain": c.get("domain", ".vertigogames.co"), "path": c.get("path", "/"),
+                    "secure": c.get("secure", True), "httpOnly": c.get("httpOnly", False),
+                }
+                if c.get("expiry"):
+                    params["expires"] = c["expiry"]
+                if c.get("sameSite"):
+                    params["sameSite"] = c["sameSite"]
+                driver.execute_cdp_cmd("Network.setCookie", params)
+            return True
+        except Exception as e:
+            log(f"⚠️ {self.label} import failed: {str(e)[:80]}")
+            return False
+
+    def invalidate(self):
+        with self._lock:
+            self._cookies = None
+
+
+class CloudflareClearance(SharedCookieJar):
+    """cf_* clearance cookies plus the user agent they are bound to."""
+    label    = "Cloudflare clearance"
+    share_ua = True
+    prefixes = ("cf_", "__cf")
+
+    def import_into(self, driver):
+        ok = super().import_into(driver)
+        if ok:
+            driver._cs_cf_imported = True
+        return ok
+
+
+class ConsentCookies(SharedCookieJar):
+    """The hub's cookie-banner consent, so later drivers never see the banner."""
+    label    = "Cookie consent"
+    # Known consent-manager cookies only (OneTrust, IAB TCF, Cookiebot, CookieYes,
+    # cookieconsent, Didomi, Complianz, iubenda)
+    names    = frozenset({
+        "OptanonConsent", "OptanonAlertBoxClosed", "euconsent-v2", "euconsent",
+        "addtl_consent", "CookieConsent", "CookieConsentBulkSetting", "cookieyes-consent",
+        "cc_cookie", "didomi_token", "usprivacy",
+    })
+    prefixes = ("cmplz_", "_iub_cs")
+
+
+CF_CLEARANCE = CloudflareClearance()
+CONSENT      = ConsentCookies()
+
+
+def bypass_cloudflare(driver):
+    """Returns False only when a challenge was seen and never cleared."""
+    try:
         title  = driver.title.lower()
         source = driver.page_source.lower()
+        imported = getattr(driver, "_cs_cf_imported", False)
         if "just a moment" not in title and "verifying" not in source:
-            return
+            if imported:
+                bump_stat("cloudflare_avoided")
+                driver._cs_cf_imported = False   # count once per driver
+            return True
+        bump_stat("cloudflare_seen")
+        HUB_LIMITER.penalize("challenge page")
+        if imported:
+            log("🛡️ Shared clearance rejected — solving again")
+            CF_CLEARANCE.invalidate()
+            driver._cs_cf_imported = False
         log("🛡️ Cloudflare detected — waiting...")
         time.sleep(5)
         try:
@@ -544,10 +1976,14 @@ def bypass_cloudflare(driver):
             if ("hub.vertigogames.co" in driver.current_url
                     and "verifying" not in driver.page_source.lower()):
                 log("✅ Cloudflare cleared")
-                return
+                bump_stat("cloudflare_solved")
+                CF_CLEARANCE.export_from(driver)
+                return True
             time.sleep(1)
+        driver._cs_infra = "Cloudflare never cleared"
+        return False
     except:
-        pass
+        return True
 
 
 def accept_cookies(driver):
@@ -559,6 +1995,8 @@ def accept_cookies(driver):
         ))).click()
         time.sleep(0.3)
         log("✅ Cookies accepted")
+        if not CONSENT.available() and CONSENT.export_from(driver):
+            save_consent_to_template(CONSENT.snapshot())
     except:
         pass
 
@@ -612,31 +2050,134 @@ def capture_display_name(driver):
     return None
 
 
+# ── Selector hit-rate cache ─────────────────────────────────────────────────────
+# Each lookup step has named XPath candidates. The one that matched most often
+# (persisted in bot_meta["selector_stats"]) is tried first, and all candidates
+# are resolved in ONE execute_script call returning the first visible match.
+# Catch-all candidates (FALLBACK_SELECTORS) always come after the specific
+# ones and never earn hits, and stored hits decay every run, so an outage of
+# one selector cannot fix the order for good.
+
+LOGIN_BUTTON_SELECTORS = [
+    ("login_text", "//button[contains(text(),'Login') or contains(text(),'Log in') "
+                   "or contains(text(),'Sign in')]"),
+    ("login_link", "//a[contains(text(),'Login') or contains(text(),'Log in')]"),
+    ("any_btn",    "//button[contains(@class,'btn') or contains(@class,'button')]"),
+]
+ID_FIELD_SELECTORS = [
+    ("player_id",  "//input[@placeholder='Player ID' or @name='playerId']"),
+    ("text_input", "//input[@type='text']"),
+    ("id_input",   "//input[contains(@placeholder,'ID')]"),
+]
+SUBMIT_SELECTORS = [
+    ("submit_text", "//button[contains(text(),'Login') or contains(text(),'Submit') "
+                    "or contains(text(),'Continue')]"),
+    ("submit_type", "//button[@type='submit']"),
+]
+POPUP_CLOSE_SELECTORS = [
+    ("close_text",  "//button[contains(text(),'Close') or contains(text(),'×') "
+                    "or contains(@class,'close')]"),
+    ("modal_btn",   "//div[contains(@class,'modal')]//button"),
+    ("aria_close",  "//*[@aria-label='Close' or @title='Close']"),
+]
+
+# Match far more than the intended element (any .btn, any modal button, any text input)
+FALLBACK_SELECTORS = frozenset({"any_btn", "text_input", "modal_btn"})
+SELECTOR_HIT_DECAY = 0.8   # per run
+
+SELECTOR_STATS = {}   # {step: {selector_name: hits}} — bound to bot_meta by bind_selector_stats()
+
+_JS_FIRST_VISIBLE = """
+var xps = arguments[0], needEnabled = arguments[1];
+for (var i = 0; i < xps.length; i++) {
+    var snap;
+    try {
+        snap = document.evaluate(xps[i], document, null,
+                                 XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    } catch (e) { continue; }
+    for (var j = 0; j < snap.snapshotLength; j++) {
+        var el = snap.snapshotItem(j);
+        if (!el.getClientRects().length) continue;
+        var cs = window.getComputedStyle(el);
+        if (cs.visibility === 'hidden' || cs.display === 'none') continue;
+        if (needEnabled && el.disabled) continue;
+        return [i, el];
+    }
+}
+return null;
+"""
+
+
+def bind_selector_stats(meta):
+    """Binds the persisted hit counts, decayed by one run; fallback entries are dropped."""
+    global SELECTOR_STATS
+    SELECTOR_STATS = meta.setdefault("selector_stats", {})
+    for step, hits in SELECTOR_STATS.items():
+        SELECTOR_STATS[step] = {
+            name: round(n * SELECTOR_HIT_DECAY, 2) for name, n in hits.items()
+            if name not in FALLBACK_SELECTORS and n * SELECTOR_HIT_DECAY >= 0.5}
+    return SELECTOR_STATS
+
+
+def _ordered_selectors(step, candidates):
+    # Hits only rank candidates within their tier — specific before fallback
+    hits = SELECTOR_STATS.get(step, {})
+    return sorted(candidates, key=lambda c: (c[0] in FALLBACK_SELECTORS,
+                                             -hits.get(c[0], 0)))   # stable for ties
+
+
+def find_first_visible(driver, step, candidates, require_enabled=True):
+    """
+    Returns the first visible (and enabled) element over all candidates,
+    best-performing selector first, and records the hit. None if no match.
+    """
+    ordered = _ordered_selectors(step, candidates)
+    found   = None
+    try:
+        res = driver.execute_script(_JS_FIRST_VISIBLE, [x for _, x in ordered], require_enabled)
+        if res:
+            found = (ordered[int(res[0])][0], res[1])
+    except Exception:
+        # Fallback: per-element WebDriver checks
+        for name, xp in ordered:
+            try:
+                for el in driver.find_elements(By.XPATH, xp):
+                    if el.is_displayed() and (not require_enabled or el.is_enabled()):
+                        found = (name, el)
+                        break
+            except Exception:
+                continue
+            if found:
+                break
+    if not found:
+        return None
+    if found[0] not in FALLBACK_SELECTORS:
+        step_hits = SELECTOR_STATS.setdefault(step, {})
+        step_hits[found[0]] = step_hits.get(found[0], 0) + 1
+    return found[1]
+
+
 def login_to_hub(driver, pid):
     log(f"🔐 Logging in...")
     try:
-        driver.get("https://hub.vertigogames.co/daily-rewards")
-        bypass_cloudflare(driver)
-        time.sleep(1)
-        accept_cookies(driver)
+        if getattr(driver, "_cs_warm", False):
+            driver._cs_warm = False    # prefetched: hub already loaded, CF + cookies done
+        else:
+            hub_get(driver, "https://hub.vertigogames.co/daily-rewards")
+            if not bypass_cloudflare(driver):
+                log("❌ Cloudflare challenge never cleared")
+                return False
+            time.sleep(1)
+            accept_cookies(driver)
 
         login_clicked = False
-        for sel in [
-            "//button[contains(text(),'Login') or contains(text(),'Log in') "
-            "or contains(text(),'Sign in')]",
-            "//a[contains(text(),'Login') or contains(text(),'Log in')]",
-            "//button[contains(@class,'btn') or contains(@class,'button')]",
-        ]:
+        el = find_first_visible(driver, "login_button", LOGIN_BUTTON_SELECTORS)
+        if el is not None:
             try:
-                for el in driver.find_elements(By.XPATH, sel):
-                    if el.is_displayed() and el.is_enabled():
-                        el.click()
-                        login_clicked = True
-                        break
-                if login_clicked:
-                    break
+                el.click()
+                login_clicked = True
             except:
-                continue
+                pass
 
         if not login_clicked:
             log("❌ Login button not found")
@@ -652,21 +2193,15 @@ def login_to_hub(driver, pid):
             time.sleep(1)
 
         id_field = None
-        for sel in [
-            "//input[@placeholder='Player ID' or @name='playerId']",
-            "//input[@type='text']",
-            "//input[contains(@placeholder,'ID')]"
-        ]:
+        f = find_first_visible(driver, "id_field", ID_FIELD_SELECTORS, require_enabled=False)
+        if f is not None:
             try:
-                f = driver.find_element(By.XPATH, sel)
-                if f.is_displayed():
-                    f.clear()
-                    f.send_keys(pid)
-                    id_field = f
-                    log(f"✅ ID entered")   # raw ID not logged — privacy
-                    break
+                f.clear()
+                f.send_keys(pid)
+                id_field = f
+                log(f"✅ ID entered")   # raw ID not logged — privacy
             except:
-                continue
+                pass
 
         if not id_field:
             log("❌ ID input not found")
@@ -674,19 +2209,13 @@ def login_to_hub(driver, pid):
 
         time.sleep(1)
         submitted = False
-        for sel in [
-            "//button[contains(text(),'Login') or contains(text(),'Submit') "
-            "or contains(text(),'Continue')]",
-            "//button[@type='submit']"
-        ]:
+        btn = find_first_visible(driver, "submit", SUBMIT_SELECTORS)
+        if btn is not None:
             try:
-                btn = driver.find_element(By.XPATH, sel)
-                if btn.is_displayed() and btn.is_enabled():
-                    btn.click()
-                    submitted = True
-                    break
+                btn.click()
+                submitted = True
             except:
-                continue
+                pass
         if not submitted:
             try:
                 id_field.send_keys(Keys.RETURN)
@@ -714,20 +2243,15 @@ def login_to_hub(driver, pid):
 
 def close_popup(driver):
     try:
-        for sel in [
-            "//button[contains(text(),'Close') or contains(text(),'×') "
-            "or contains(@class,'close')]",
-            "//div[contains(@class,'modal')]//button",
-            "//*[@aria-label='Close' or @title='Close']",
-        ]:
+        btn = find_first_visible(driver, "popup_close", POPUP_CLOSE_SELECTORS,
+                                 require_enabled=False)
+        if btn is not None:
             try:
-                for btn in driver.find_elements(By.XPATH, sel):
-                    if btn.is_displayed():
-                        btn.click()
-                        time.sleep(0.3)
-                        return
+                btn.click()
+                settle(driver, 0.3)
+                return
             except:
-                continue
+                pass
         driver.execute_script(
             "document.querySelectorAll('[class*=\"modal\"],[class*=\"overlay\"]')"
             ".forEach(m=>{ if(m.offsetParent!==null) m.click(); });"
@@ -737,10 +2261,11 @@ def close_popup(driver):
 
 
 def physical_click(driver, el):
+    HUB_LIMITER.acquire("claim")
     try:
         driver.execute_script(
             "arguments[0].scrollIntoView({behavior:'smooth',block:'center'});", el)
-        time.sleep(0.5)
+        settle(driver, 0.5)
         el.click()
         return True
     except:
@@ -757,30 +2282,33 @@ def physical_click(driver, el):
 # SECTION 7 — TIMER DETECTION (JS DOM)
 # ═══════════════════════════════════════════════════════════════════════════════
 
+_JS_DAILY_TIMER = """
+function getNum(el){return parseInt((el.innerText||el.textContent||'').trim())||0;}
+let leafs=Array.from(document.querySelectorAll('*')).filter(e=>e.children.length===0);
+for(let el of leafs){
+    let t=(el.innerText||'').trim().toLowerCase();
+    if(t==='next reward in'||t==='next in'||t==='next reward'){
+        let c=el.parentElement;
+        for(let d=0;d<6&&c;d++){
+            let nums=Array.from(c.querySelectorAll('*')).filter(e=>{
+                let tx=(e.innerText||'').trim();
+                return /^\\d+$/.test(tx)&&e.children.length===0;
+            });
+            if(nums.length>=2){
+                let h=getNum(nums[0]),m=getNum(nums[1]);
+                if(h>0||m>0) return h+'h '+m+'m';
+            }
+            c=c.parentElement;
+        }
+    }
+}
+return null;
+"""
+
+
 def detect_daily_timer_js(driver):
     try:
-        res = driver.execute_script("""
-            function getNum(el){return parseInt((el.innerText||el.textContent||'').trim())||0;}
-            let leafs=Array.from(document.querySelectorAll('*')).filter(e=>e.children.length===0);
-            for(let el of leafs){
-                let t=(el.innerText||'').trim().toLowerCase();
-                if(t==='next reward in'||t==='next in'||t==='next reward'){
-                    let c=el.parentElement;
-                    for(let d=0;d<6&&c;d++){
-                        let nums=Array.from(c.querySelectorAll('*')).filter(e=>{
-                            let tx=(e.innerText||'').trim();
-                            return /^\\d+$/.test(tx)&&e.children.length===0;
-                        });
-                        if(nums.length>=2){
-                            let h=getNum(nums[0]),m=getNum(nums[1]);
-                            if(h>0||m>0) return h+'h '+m+'m';
-                        }
-                        c=c.parentElement;
-                    }
-                }
-            }
-            return null;
-        """)
+        res = driver.execute_script(_JS_DAILY_TIMER)
         if res:
             d = parse_timer_text(res)
             if d and d.total_seconds() > 60:
@@ -791,50 +2319,53 @@ def detect_daily_timer_js(driver):
     return None
 
 
+_JS_STORE_TIMERS = """
+var anchors={
+    1:['gold (daily)','gold(daily)','5 gold','gold daily'],
+    2:['cash (daily)','cash(daily)','500 cash','cash daily'],
+    3:['luckyloon (daily)','luckyloon(daily)','10 luckyloon','luckyloon daily']
+};
+function findCard(kws){
+    var els=Array.from(document.querySelectorAll('*'));
+    var lbl=null;
+    for(var i=0;i<els.length;i++){
+        var own=Array.from(els[i].childNodes)
+            .filter(n=>n.nodeType===3).map(n=>n.textContent).join('').trim().toLowerCase();
+        if(kws.some(k=>own.includes(k))&&own.length<35){lbl=els[i];break;}
+    }
+    if(!lbl)return 'not_found';
+    var node=lbl;
+    for(var d=0;d<15;d++){
+        node=node.parentElement;
+        if(!node||node===document.body)break;
+        if((node.innerText||'').toLowerCase().includes('next in')){
+            var ch=Array.from(node.querySelectorAll('*'));
+            for(var j=0;j<ch.length;j++){
+                var own2=Array.from(ch[j].childNodes)
+                    .filter(n=>n.nodeType===3).map(n=>n.textContent).join('').trim();
+                if(own2.toLowerCase().includes('next in')&&own2.length<50)
+                    return 'timer:'+(ch[j].innerText||ch[j].textContent||'').trim();
+            }
+            return 'timer:unknown';
+        }
+        if(d>=4){
+            var btns=node.querySelectorAll('button');
+            for(var b=0;b<btns.length;b++)
+                if((btns[b].innerText||'').trim().toLowerCase()==='free')return 'free';
+        }
+    }
+    return 'free';
+}
+var r={};
+for(var k in anchors)r[k]=findCard(anchors[k]);
+return r;
+"""
+
+
 def detect_store_timers_js(driver):
     result = {}
     try:
-        res = driver.execute_script("""
-            var anchors={
-                1:['gold (daily)','gold(daily)','5 gold','gold daily'],
-                2:['cash (daily)','cash(daily)','500 cash','cash daily'],
-                3:['luckyloon (daily)','luckyloon(daily)','10 luckyloon','luckyloon daily']
-            };
-            function findCard(kws){
-                var els=Array.from(document.querySelectorAll('*'));
-                var lbl=null;
-                for(var i=0;i<els.length;i++){
-                    var own=Array.from(els[i].childNodes)
-                        .filter(n=>n.nodeType===3).map(n=>n.textContent).join('').trim().toLowerCase();
-                    if(kws.some(k=>own.includes(k))&&own.length<35){lbl=els[i];break;}
-                }
-                if(!lbl)return 'not_found';
-                var node=lbl;
-                for(var d=0;d<15;d++){
-                    node=node.parentElement;
-                    if(!node||node===document.body)break;
-                    if((node.innerText||'').toLowerCase().includes('next in')){
-                        var ch=Array.from(node.querySelectorAll('*'));
-                        for(var j=0;j<ch.length;j++){
-                            var own2=Array.from(ch[j].childNodes)
-                                .filter(n=>n.nodeType===3).map(n=>n.textContent).join('').trim();
-                            if(own2.toLowerCase().includes('next in')&&own2.length<50)
-                                return 'timer:'+(ch[j].innerText||ch[j].textContent||'').trim();
-                        }
-                        return 'timer:unknown';
-                    }
-                    if(d>=4){
-                        var btns=node.querySelectorAll('button');
-                        for(var b=0;b<btns.length;b++)
-                            if((btns[b].innerText||'').trim().toLowerCase()==='free')return 'free';
-                    }
-                }
-                return 'free';
-            }
-            var r={};
-            for(var k in anchors)r[k]=findCard(anchors[k]);
-            return r;
-        """)
+        res = driver.execute_script(_JS_STORE_TIMERS)
         if res:
             NAMES = {1:"Gold", 2:"Cash", 3:"Luckyloon"}
             for k, status in res.items():
@@ -853,6 +2384,43 @@ def detect_store_timers_js(driver):
     return result
 
 
+_JS_LOYALTY_TIMER = """
+// First pass: tier card containers only
+var cards = Array.from(document.querySelectorAll('[data-slider-item-id]'));
+for(var i=0; i<cards.length; i++){
+    var cardText = (cards[i].innerText||'').toLowerCase();
+    if(cardText.includes('next in') && !cardText.includes('claim')){
+        var spans = Array.from(cards[i].querySelectorAll('*'));
+        for(var j=0; j<spans.length; j++){
+            var own = Array.from(spans[j].childNodes)
+                .filter(function(n){return n.nodeType===3;})
+                .map(function(n){return n.textContent;}).join('').trim();
+            if(own.toLowerCase().includes('next in') && own.length < 60)
+                return own;
+        }
+    }
+}
+// Second pass: page-wide, skip Store Bonus context
+var els = Array.from(document.querySelectorAll('*'));
+for(var k=0; k<els.length; k++){
+    var ownText = Array.from(els[k].childNodes)
+        .filter(function(n){return n.nodeType===3;})
+        .map(function(n){return n.textContent;}).join('').trim();
+    if(ownText.toLowerCase().includes('next in') && ownText.length < 60){
+        var node = els[k].parentElement, isStore = false;
+        for(var d=0; d<6&&node; d++){
+            if((node.innerText||'').toLowerCase().includes('store bonus')){
+                isStore=true; break;
+            }
+            node = node.parentElement;
+        }
+        if(!isStore) return ownText;
+    }
+}
+return null;
+"""
+
+
 def detect_loyalty_timer_js(driver):
     """
     Detects a real loyalty TIER cooldown timer.
@@ -860,41 +2428,7 @@ def detect_loyalty_timer_js(driver):
     picking up Store Bonus 'Next in' timers from the page bottom.
     """
     try:
-        res = driver.execute_script("""
-            // First pass: tier card containers only
-            var cards = Array.from(document.querySelectorAll('[data-slider-item-id]'));
-            for(var i=0; i<cards.length; i++){
-                var cardText = (cards[i].innerText||'').toLowerCase();
-                if(cardText.includes('next in') && !cardText.includes('claim')){
-                    var spans = Array.from(cards[i].querySelectorAll('*'));
-                    for(var j=0; j<spans.length; j++){
-                        var own = Array.from(spans[j].childNodes)
-                            .filter(function(n){return n.nodeType===3;})
-                            .map(function(n){return n.textContent;}).join('').trim();
-                        if(own.toLowerCase().includes('next in') && own.length < 60)
-                            return own;
-                    }
-                }
-            }
-            // Second pass: page-wide, skip Store Bonus context
-            var els = Array.from(document.querySelectorAll('*'));
-            for(var k=0; k<els.length; k++){
-                var ownText = Array.from(els[k].childNodes)
-                    .filter(function(n){return n.nodeType===3;})
-                    .map(function(n){return n.textContent;}).join('').trim();
-                if(ownText.toLowerCase().includes('next in') && ownText.length < 60){
-                    var node = els[k].parentElement, isStore = false;
-                    for(var d=0; d<6&&node; d++){
-                        if((node.innerText||'').toLowerCase().includes('store bonus')){
-                            isStore=true; break;
-                        }
-                        node = node.parentElement;
-                    }
-                    if(!isStore) return ownText;
-                }
-            }
-            return null;
-        """)
+        res = driver.execute_script(_JS_LOYALTY_TIMER)
         if res:
             d = parse_timer_text(res)
             if d and d.total_seconds() > 60:
@@ -905,7 +2439,187 @@ def detect_loyalty_timer_js(driver):
     return None
 
 
+# ── Structured page state ────────────────────────────────────────────────────
+# The hub is a client-rendered app: reward availability already exists as JSON
+# in its hydration globals and in the API responses the page fetched. Reading
+# those gives exact timestamps; the DOM text heuristics above are the fallback.
+
+_HYDRATION_JS = """
+var keys = ['__NEXT_DATA__', '__NUXT__', '__APOLLO_STATE__', '__INITIAL_STATE__',
+            '__PRELOADED_STATE__', '__REDUX_STATE__'];
+var out = [];
+for (var i = 0; i < keys.length; i++) {
+    try {
+        var v = window[keys[i]];
+        if (v) out.push(JSON.parse(JSON.stringify(v)));
+    } catch (e) {}
+}
+var el = document.getElementById('__NEXT_DATA__');
+if (el && !window.__NEXT_DATA__) { try { out.push(JSON.parse(el.textContent)); } catch (e) {} }
+return out;
+"""
+
+STATE_MAX_RESPONSES = 25
+STATE_MAX_BYTES     = 512 * 1024
+
+_TS_KEY   = re.compile(r"(next|available|claimable|cooldown|reset|unlock)\w*"
+                       r"(at|time|date|on|until)$", re.I)
+_PAST_KEY = re.compile(r"last|claimed|created|updated|started", re.I)   # history, not cooldown
+_LEFT_KEY = re.compile(r"(seconds?|secs?|time)_?(left|remaining|until)|cooldown_?(seconds?|secs?)$"
+                       r"|remaining_?seconds?$", re.I)
+_STORE_KW = {1: "gold", 2: "cash", 3: "luckyloon"}
+_PAGE_KW  = {"daily": ("daily",), "loyalty": ("loyalty", "tier")}   # label must name the page
+
+
+def _hub_json_responses(driver):
+    """Bodies of JSON responses from the hub since the last call (CDP)."""
+    docs = []
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return docs
+    seen = 0
+    for e in entries:
+        try:
+            msg = json.loads(e["message"])["message"]
+            if msg.get("method") != "Network.responseReceived":
+                continue
+            resp = msg["params"]["response"]
+            if "json" not in resp.get("mimeType", "") or "vertigogames" not in resp.get("url", ""):
+                continue
+            body = driver.execute_cdp_cmd("Network.getResponseBody",
+                                          {"requestId": msg["params"]["requestId"]})
+            raw = body.get("body", "")
+            if body.get("base64Encoded") or len(raw) > STATE_MAX_BYTES:
+                continue
+            docs.append(json.loads(raw))
+            seen += 1
+            if seen >= STATE_MAX_RESPONSES:
+                break
+        except Exception:
+            continue
+    return docs
+
+
+def _to_ist(v):
+    """ISO string / epoch s / epoch ms → naive IST datetime, else None."""
+    try:
+        if isinstance(v, bool):
+            return None
+        if isinstance(v, (int, float)):
+            if v > 1e12:
+                v = v / 1000.0
+            if v < 1e9:
+                return None
+            return datetime.utcfromtimestamp(v) + timedelta(hours=5, minutes=30)
+        if isinstance(v, str) and re.match(r"\d{4}-\d{2}-\d{2}T", v):
+            dt = datetime.fromisoformat(v.replace("Z", "+00:00"))
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(timezone.utc).replace(tzinfo=None) + timedelta(hours=5, minutes=30)
+            return dt
+    except Exception:
+        pass
+    return None
+
+
+def _walk_reward_objects(node, out, depth=0):
+    """Collects (label_text, remaining_timedelta, claimed_flag) from any reward-like dict."""
+    if depth > 12:
+        return
+    if isinstance(node, list):
+        for x in node:
+            _walk_reward_objects(x, out, depth + 1)
+        return
+    if not isinstance(node, dict):
+        return
+    now       = get_ist_time()
+    remaining = None
+    claimed   = None
+    for k, v in node.items():
+        if _LEFT_KEY.search(k) and isinstance(v, (int, float)) and not isinstance(v, bool):
+            remaining = timedelta(seconds=max(0, v))
+        elif _TS_KEY.search(k) and not _PAST_KEY.search(k):
+            dt = _to_ist(v)
+            if dt is not None and remaining is None:
+                remaining = max(dt - now, timedelta(0))
+        elif k.lower() in ("claimed", "isclaimed", "is_claimed", "delivered") and isinstance(v, bool):
+            claimed = v
+    if remaining is not None or claimed is not None:
+        label = " ".join(str(node.get(k, "")) for k in
+                         ("name", "title", "label", "type", "slug", "currency") if node.get(k))
+        out.append((label.lower(), remaining, claimed))
+    for v in node.values():
+        if isinstance(v, (dict, list)):
+            _walk_reward_objects(v, out, depth + 1)
+
+
+def read_page_state(driver, page_type):
+    """
+    Structured reward availability for one page, or None when the page
+    exposes nothing usable. Shape:
+      daily/loyalty → {"cooldown": timedelta|None}
+      store         → {"cooldown": {1: td, 2: td, 3: td}}  (only known cards)
+    A timedelta of 0 means available now.
+    """
+    docs = []
+    try:
+        docs = driver.execute_script(_HYDRATION_JS) or []
+    except Exception:
+        pass
+    docs += _hub_json_responses(driver)
+    if not docs:
+        return None
+
+    objs = []
+    for d in docs:
+        _walk_reward_objects(d, objs)
+    if not objs:
+        return None
+
+    if page_type == "store":
+        cds = {}
+        for n, kw in _STORE_KW.items():
+            for label, rem, claimed in objs:
+                if kw in label and rem is not None:
+                    cds[n] = rem
+                    break
+        return {"cooldown": cds} if cds else None
+
+    # Other rewards on the same page (progression, tiers on the daily page, ...) must not leak in
+    kws   = _PAGE_KW.get(page_type, ())
+    timed = [rem for label, rem, _ in objs
+             if rem is not None and any(k in label for k in kws)
+             and "store" not in label and "bonus" not in label]
+    if not timed:
+        return None
+    # Anything claimable now wins; otherwise the soonest unlock is the cooldown
+    if any(t.total_seconds() <= 0 for t in timed):
+        return {"cooldown": timedelta(0)}
+    return {"cooldown": min(timed)}
+
+
 def detect_page_cooldowns(driver, pid, page_type):
+    if RECORD_PAGES:
+        record_page(driver, pid, page_type)
+    st = read_page_state(driver, page_type)
+    if st is not None:
+        bump_stat("state_reads")
+        if page_type == "store":
+            for card_n, d in st["cooldown"].items():
+                if d.total_seconds() > 60:
+                    log(f"🔍 Store {card_n}: cooldown {d} (page state)")
+                    update_claim_history(pid, "store", reward_index=card_n,
+                                         detected_cooldown=d, exact=True)
+            if len(st["cooldown"]) == 3:
+                return          # a card missing from the state → DOM scan below
+        else:
+            d = st["cooldown"]
+            if d is not None and d.total_seconds() > 60:
+                log(f"🔍 {page_type.capitalize()}: cooldown {d} (page state)")
+                update_claim_history(pid, page_type, detected_cooldown=d, exact=True)
+            return
+
+    bump_stat("dom_scans")
     if page_type == "daily":
         d = detect_daily_timer_js(driver)
         if d and d.total_seconds() > 60:
@@ -921,6 +2635,110 @@ def detect_page_cooldowns(driver, pid, page_type):
             update_claim_history(pid, "loyalty", detected_cooldown=d)
 
 
+# ── Page recorder ──────────────────────────────────────────────────────────────
+# Opt-in (RECORD_PAGES=1 or --record): every daily/store/loyalty visit saves a
+# sanitised DOM snapshot plus the timer detector's live output into
+# RECORD_DIR/<page>/. replay_timers.py loads the corpus via file:// in headless
+# Chrome and checks that the detectors still return the recorded values.
+
+RECORD_PAGES        = os.getenv("RECORD_PAGES", "0") == "1"
+RECORD_DIR          = "replay_corpus"
+RECORD_MAX_PER_PAGE = 40
+_RECORD_LOCK        = threading.Lock()   # lanes share the per-page count and files
+
+# Countdown text ("Next in 3h 12m", "04:59:58") changes every second; it is
+# blanked before hashing so one layout is recorded once, not once per second.
+_TIMER_TEXT = re.compile(
+    r"(?<!\d)\d+\s*(?:days?|d|hours?|hrs?|h|minutes?|mins?|m|seconds?|secs?|s)(?![a-z])"
+    r"|\b\d{1,2}:\d{2}(?::\d{2})?\b", re.I)
+
+TIMER_DETECTORS = {"daily": _JS_DAILY_TIMER, "store": _JS_STORE_TIMERS,
+                   "loyalty": _JS_LOYALTY_TIMER}
+
+# Clone without scripts, frames, handlers, links, form values or the player's
+# ID/name; same-origin stylesheets are inlined so innerText lays out as live.
+_JS_SNAPSHOT = """
+var pid = arguments[0], root = document.documentElement.cloneNode(true);
+root.querySelectorAll('script,noscript,iframe,object,embed,meta,base,link,template')
+    .forEach(function(n){ n.remove(); });
+var css = [];
+for (var i = 0; i < document.styleSheets.length; i++) {
+    try {
+        var rules = document.styleSheets[i].cssRules;
+        for (var j = 0; j < rules.length; j++) css.push(rules[j].cssText);
+    } catch (e) {}
+}
+var head = root.querySelector('head') || root;
+root.querySelectorAll('style').forEach(function(n){ n.remove(); });
+var st = document.createElement('style');
+st.textContent = css.join('\\n');
+head.appendChild(st);
+""" + _JS_BLANK_NAME + """
+root.querySelectorAll('*').forEach(function(n){
+    for (var k = n.attributes.length - 1; k >= 0; k--) {
+        var a = n.attributes[k].name;
+        if (a.indexOf('on') === 0 || a === 'value' || a === 'srcset' || a === 'data-cs-free')
+            n.removeAttribute(a);
+    }
+    if (n.hasAttribute('src')) n.setAttribute('src', 'data:,');
+    if (n.hasAttribute('href')) n.setAttribute('href', '#');
+});
+var html = '<!DOCTYPE html>\\n' + root.outerHTML;
+return pid && pid.length > 3 ? html.split(pid).join('PLAYER') : html;
+"""
+
+
+def _same_output(a, b):
+    # Store results come back with int or str keys depending on the path
+    return json.dumps(a, sort_keys=True) == json.dumps(b, sort_keys=True)
+
+
+def record_page(driver, pid, page_type):
+    """
+    Saves one snapshot + expected detector output; identical snapshots are kept
+    once. The detector runs before and after the snapshot, and the snapshot is
+    only kept if both agree, so a countdown tick cannot split the two.
+    """
+    js = TIMER_DETECTORS.get(page_type)
+    if js is None:
+        return None
+    try:
+        for _ in range(2):
+            t0   = time.perf_counter()
+            expected = driver.execute_script(js)
+            live_ms  = (time.perf_counter() - t0) * 1000
+            html = driver.execute_script(_JS_SNAPSHOT, pid)
+            if _same_output(driver.execute_script(js), expected):
+                break
+        else:
+            log(f"ℹ️  {page_type} timers changed during the snapshot — not recorded")
+            return None
+        url = driver.current_url.split("?")[0]
+    except Exception as e:
+        log(f"⚠️ Page recorder failed on {page_type}: {str(e)[:80]}")
+        return None
+    if not html:
+        return None
+    folder = os.path.join(RECORD_DIR, page_type)
+    name = hashlib.sha1(_TIMER_TEXT.sub("#", html).encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(folder, name + ".html")
+    with _RECORD_LOCK:
+        os.makedirs(folder, exist_ok=True)
+        if os.path.exists(path):
+            return path
+        if sum(1 for f in os.listdir(folder) if f.endswith(".html")) >= RECORD_MAX_PER_PAGE:
+            return None
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html)
+        with open(os.path.join(folder, name + ".json"), "w", encoding="utf-8") as f:
+            json.dump({"page": page_type, "url": url,
+                       "recorded_at": get_ist_time().isoformat(timespec="seconds"),
+                       "expected": expected, "live_ms": round(live_ms, 1)}, f, indent=2)
+            f.write("\n")
+    log(f"📼 Recorded {page_type} snapshot {name} ({len(html) / 1024:.0f} KB)")
+    return path
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # SECTION 8 — CLAIMING FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -935,7 +2753,7 @@ def claim_daily_rewards(driver, pid):
     log("🎁 Claiming Daily Rewards...")
     claimed = 0
     try:
-        driver.get("https://hub.vertigogames.co/daily-rewards")
+        hub_get(driver, "https://hub.vertigogames.co/daily-rewards")
         bypass_cloudflare(driver)
         time.sleep(2)
         close_popup(driver)
@@ -956,7 +2774,7 @@ def claim_daily_rewards(driver, pid):
             if ok:
                 log("✅ Daily Claimed")
                 claimed = 1
-                time.sleep(2)
+                settle(driver, 2, 1)
                 close_popup(driver)
                 update_claim_history(pid, "daily", claimed_count=1)
                 break
@@ -968,13 +2786,99 @@ def claim_daily_rewards(driver, pid):
             s2 = get_reward_status(pid)
             if s2["daily_available"] and s2["daily_status"] not in ("cooldown_detected","claimed"):
                 update_claim_history(pid, "daily", attempted=True)
-
-        driver.save_screenshot(f"daily_{pid}.png")
+                DIAG.capture(driver, pid, "daily", "no claimable daily button")
     except Exception as e:
         log(f"❌ Daily error: {e}")
+        DIAG.capture(driver, pid, "daily", f"error: {e}")
     return claimed, False
 
 
+_STORE_LABEL_INDEX = {"Gold": 1, "Cash": 2, "Luckyloon": 3}
+
+# Every unclaimed Free button with its card label and visibility in ONE call.
+# Each button is tagged with a stable data-cs-free handle so the same element
+# can be re-targeted after React re-renders without another DOM walk.
+_JS_STORE_FREE_BUTTONS = """
+var out = [], btns = document.querySelectorAll('button');
+for (var i = 0; i < btns.length; i++) {
+    var b = btns[i];
+    if ((b.innerText || b.textContent || '').trim().toLowerCase() !== 'free') continue;
+    var par = b.parentElement;
+    if (par && (par.innerText || '').toLowerCase().indexOf('next in') !== -1) continue;
+    var label = null, node = b;
+    for (var d = 0; d < 10 && node && node !== document.body; d++) {
+        node = node.parentElement;
+        if (!node) break;
+        var t = (node.innerText || '').toLowerCase();
+        var hits = ['gold', 'cash', 'luckyloon'].filter(function(k){ return t.indexOf(k) !== -1; });
+        if (hits.length === 1) { label = hits[0]; break; }
+        if (hits.length > 1) break;   // climbed past the card — ambiguous
+    }
+    var vis = b.getClientRects().length > 0 && !b.disabled
+              && window.getComputedStyle(b).visibility !== 'hidden';
+    var h = b.getAttribute('data-cs-free');
+    if (!h) { h = 'free-' + i; b.setAttribute('data-cs-free', h); }
+    out.push([h, label, vis, b]);
+}
+return out;
+"""
+
+
+def store_free_buttons(driver):
+    """
+    Batched store lookup: one execute_script round-trip regardless of how
+    many buttons are on the page. Returns [{handle, label, visible, el}].
+    """
+    try:
+        rows = driver.execute_script(_JS_STORE_FREE_BUTTONS) or []
+    except Exception as e:
+        log(f"⚠️ Store button lookup failed: {str(e)[:80]}")
+        return []
+    return [
+        {"handle": h, "label": lbl.capitalize() if lbl else None, "visible": bool(v), "el": el}
+        for h, lbl, v, el in rows
+    ]
+
+
+# The clicked button is gone, disabled, hidden or no longer reads "free"
+_JS_STORE_BTN_SETTLED = """
+var b = document.querySelector('[data-cs-free="' + arguments[0] + '"]');
+if (!b || b.disabled || b.getClientRects().length === 0) return true;
+return (b.innerText || b.textContent || '').trim().toLowerCase() !== 'free';
+"""
+
+
+def settle_store_claim(driver, handle, seconds=4):
+    """
+    Waits out a store claim's server round-trip. Animation-free pages return
+    as soon as the clicked card's button changes state (at most `seconds`);
+    animated pages wait the full `seconds`.
+    """
+    if not getattr(driver, "_cs_still", False):
+        time.sleep(seconds)
+        return
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            if driver.execute_script(_JS_STORE_BTN_SETTLED, handle):
+                return
+        except Exception:
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            return
+        time.sleep(0.25)
+
+
+def click_by_handle(driver, handle):
+    """JS click on a button previously tagged by store_free_buttons()."""
+    HUB_LIMITER.acquire("claim")
+    try:
+        return bool(driver.execute_script(
+            "var b=document.querySelector('[data-cs-free=\"'+arguments[0]+'\"]');"
+            "if(!b||b.disabled)return false;b.click();return true;", handle))
+    except Exception:
+        return False
+
+
 def claim_store_rewards(driver, pid):
     """Returns (count_claimed, skip_flags[3])."""
     s = get_reward_status(pid)
@@ -987,7 +2891,7 @@ def claim_store_rewards(driver, pid):
     log("🏪 Claiming Store Rewards...")
     claimed = 0
     try:
-        driver.get("https://hub.vertigogames.co/store")
+        hub_get(driver, "https://hub.vertigogames.co/store")
         bypass_cloudflare(driver)
         time.sleep(2)
         close_popup(driver)
@@ -1001,40 +2905,43 @@ def claim_store_rewards(driver, pid):
 
         log(f"🎯 {sum(s2['store_available'])}/3 store rewards available")
 
+        claimed_idx = set()
+
         def _find_free_btn():
-            try:
-                for btn in driver.find_elements(By.TAG_NAME, "button"):
-                    try:
-                        if (btn.text.strip().lower() == "free"
-                                and btn.is_displayed() and btn.is_enabled()):
-                            par = btn.find_element(By.XPATH, "./..")
-                            if "next in" in par.text.lower():
-                                continue
-                            return btn
-                    except:
-                        continue
-            except:
-                pass
+            for c in store_free_buttons(driver):
+                if c["visible"]:
+                    return c
             return None
 
+        def _record(label=None):
+            # Map the clicked card to its reward slot; unknown label → next open slot
+            idx = _STORE_LABEL_INDEX.get(label)
+            if idx is None or idx in claimed_idx:
+                open_ = [i for i in range(1, 4)
+                         if i not in claimed_idx and s2["store_available"][i-1]]
+                open_ = open_ or [i for i in range(1, 4) if i not in claimed_idx]
+                idx = open_[0] if open_ else len(claimed_idx) + 1
+            claimed_idx.add(idx)
+            update_claim_history(pid, "store", claimed_count=1, reward_index=idx)
+
         # Phase 1: physical clicks (claims 1-2)
         for attempt in range(3):
             if claimed >= 2:
                 break
             if "store" not in driver.current_url:
-                driver.get("https://hub.vertigogames.co/store")
+                hub_get(driver, "https://hub.vertigogames.co/store")
                 bypass_cloudflare(driver)
                 time.sleep(2)
             time.sleep(1)
             btn = _find_free_btn()
             if btn:
-                if physical_click(driver, btn):
-                    time.sleep(4)
+                if physical_click(driver, btn["el"]):
+                    settle_store_claim(driver, btn["handle"])
                     close_popup(driver)
                     claimed += 1
-                    log(f"✅ Store Claim #{claimed}")
-                    update_claim_history(pid, "store", claimed_count=1, reward_index=claimed)
-                    time.sleep(1)
+                    log(f"✅ Store Claim #{claimed} ({btn['label'] or 'card ?'})")
+                    _record(btn["label"])
+                    settle(driver, 1)
             elif attempt >= 1:
                 break
             else:
@@ -1046,18 +2953,19 @@ def claim_store_rewards(driver, pid):
                 if claimed >= 3:
                     break
                 if "store" not in driver.current_url:
-                    driver.get("https://hub.vertigogames.co/store")
+                    hub_get(driver, "https://hub.vertigogames.co/store")
                     bypass_cloudflare(driver)
                     time.sleep(2)
                 time.sleep(1.5)
                 btn = _find_free_btn()
                 if btn:
-                    if physical_click(driver, btn):
-                        time.sleep(4)
+                    if (physical_click(driver, btn["el"])
+                            or click_by_handle(driver, btn["handle"])):
+                        settle_store_claim(driver, btn["handle"])
                         close_popup(driver)
                         claimed += 1
-                        log(f"✅ Store Claim #{claimed}")
-                        update_claim_history(pid, "store", claimed_count=1, reward_index=claimed)
+                        log(f"✅ Store Claim #{claimed} ({btn['label'] or 'card ?'})")
+                        _record(btn["label"])
                         break
                 ok = driver.execute_script("""
                     let cards=document.querySelectorAll('[class*="StoreBonus"]');
@@ -1078,69 +2986,278 @@ def claim_store_rewards(driver, pid):
                 if ok:
                     claimed += 1
                     log(f"✅ Store Claim #{claimed} (JS)")
-                    time.sleep(4)
+                    settle(driver, 4)
                     close_popup(driver)
-                    update_claim_history(pid, "store", claimed_count=1, reward_index=claimed)
+                    _record()
                     break
                 elif attempt < 3:
                     log(f"ℹ️  Both methods failed, retry {attempt+1}/4")
                     time.sleep(2)
 
         s3 = get_reward_status(pid)
-        for i in range(claimed + 1, 4):
+        for i in range(1, 4):
+            if i in claimed_idx:
+                continue
             if (s3["store_available"][i-1]
                     and s3["store_status"][i-1] not in ("cooldown_detected","claimed")):
                 update_claim_history(pid, "store", reward_index=i, attempted=True)
 
         log(f"📊 Store: {claimed}/3")
-        driver.save_screenshot(f"store_{pid}.png")
+        if claimed < sum(s2["store_available"]):
+            DIAG.capture(driver, pid, "store",
+                         f"{claimed}/{sum(s2['store_available'])} available claimed")
     except Exception as e:
         log(f"❌ Store error: {e}")
+        DIAG.capture(driver, pid, "store", f"error: {e}")
 
     return claimed, skip_flags
 
 
+PROGRESSION_MAX_CLAIMS = 12
+LOYALTY_MAX_CLAIMS     = 5
+
+# In-page claim runner (execute_async_script). Clicks every claimable tier,
+# waiting for each claim to settle — DOM quiet per MutationObserver AND no
+# fetch/XHR in flight — instead of fixed sleeps. A click counts only if its
+# button then disappears, disables or changes text; a button that stays as it
+# was is not clicked again. Returns the claim count plus any remaining
+# "Next in" timers in a single round-trip.
+ASYNC_SETTLE_MAX_S = 5
+# One iteration past the deadline can still settle twice (click + popup close)
+ASYNC_BUDGET_S     = SCRIPT_TIMEOUT_S - 2 * ASYNC_SETTLE_MAX_S - 2
+
+_JS_ASYNC_CLAIM_RUNNER = """
+var mode = arguments[0], maxClaims = arguments[1], budgetMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var QUIET = 400, MAX_WAIT = arguments[3], DEADLINE = Date.now() + budgetMs;
+var tried = new WeakSet();
+
+if (!window.__csNetHook) {
+    window.__csNetHook = true; window.__csInflight = 0;
+    var dec = function(){ window.__csInflight = Math.max(0, window.__csInflight - 1); };
+    if (window.fetch) {
+        var of = window.fetch;
+        window.fetch = function(){
+            window.__csInflight++;
+            return of.apply(this, arguments).finally(dec);
+        };
+    }
+    var os = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function(){
+        window.__csInflight++;
+        this.addEventListener('loadend', dec);
+        return os.apply(this, arguments);
+    };
+}
+
+function settle(){
+    return new Promise(function(resolve){
+        var start = Date.now(), last = start;
+        var mo = new MutationObserver(function(){ last = Date.now(); });
+        mo.observe(document.body, {subtree:true, childList:true, attributes:true, characterData:true});
+        (function tick(){
+            var now = Date.now();
+            if ((now - last >= QUIET && !window.__csInflight) || now - start >= MAX_WAIT) {
+                mo.disconnect(); resolve();
+            } else { setTimeout(tick, 100); }
+        })();
+    });
+}
+function txt(el){ return (el.innerText || el.textContent || '').trim().toLowerCase(); }
+function ownText(el){
+    return Array.from(el.childNodes).filter(function(n){ return n.nodeType === 3; })
+        .map(function(n){ return n.textContent; }).join('').trim();
+}
+
+function findProgression(){
+    var btns = document.querySelectorAll('button');
+    for (var i = 0; i < btns.length; i++) {
+        var b = btns[i], t = txt(b);
+        if (t !== 'claim' && t !== 'claim all') continue;
+        if (b.disabled || tried.has(b)) continue;
+        // offsetParent check skipped for 'claim all' (carousel may not be visible)
+        if (t === 'claim' && b.offsetParent === null) continue;
+        var pt = (b.parentElement.innerText || b.parentElement.textContent) || '';
+        if (pt.indexOf('Delivered') !== -1) continue;
+        return [b, t];
+    }
+    return null;
+}
+
+function findLoyalty(){
+    // Primary: tier card containers [data-slider-item-id]
+    var cards = document.querySelectorAll('[data-slider-item-id]');
+    for (var i = 0; i < cards.length; i++) {
+        var ct = txt(cards[i]);
+        if (ct.indexOf('delivered') !== -1 || ct.indexOf('next in') !== -1) continue;
+        var bs = cards[i].querySelectorAll('button');
+        for (var j = 0; j < bs.length; j++) {
+            var t = txt(bs[j]);
+            if (!bs[j].disabled && !tried.has(bs[j]) && (t === 'claim' || t === 'free'))
+                return [bs[j], 'card'];
+        }
+    }
+    // Fallback: page-wide, exclude Store Bonus
+    var all = document.querySelectorAll('button');
+    for (var k = 0; k < all.length; k++) {
+        var b = all[k], t2 = txt(b);
+        if (b.disabled || tried.has(b) || (t2 !== 'claim' && t2 !== 'free')) continue;
+        var node = b.parentElement, cd = false;
+        for (var d = 0; d < 3 && node; d++) {
+            var nt = txt(node);
+            if (nt.indexOf('next in') !== -1 || nt.indexOf('delivered') !== -1
+                || nt.indexOf('store bonus') !== -1) { cd = true; break; }
+            node = node.parentElement;
+        }
+        if (!cd) return [b, 'fallback'];
+    }
+    return null;
+}
+
+function closePopups(){
+    var sel = document.querySelectorAll('button,[aria-label="Close"],[title="Close"]');
+    for (var i = 0; i < sel.length; i++) {
+        var el = sel[i], t = txt(el);
+        var isClose = t === 'close' || t === '×' || (el.className + '').indexOf('close') !== -1
+                      || el.getAttribute('aria-label') === 'Close' || el.getAttribute('title') === 'Close';
+        if (isClose && el.getClientRects().length) { el.click(); return true; }
+    }
+    return false;
+}
+
+function timers(){
+    var scope = mode === 'loyalty'
+        ? Array.from(document.querySelectorAll('[data-slider-item-id] *'))
+        : Array.from(document.querySelectorAll('*'));
+    var out = [];
+    for (var i = 0; i < scope.length && out.length < 10; i++) {
+        var own = ownText(scope[i]);
+        if (own.toLowerCase().indexOf('next in') !== -1 && own.length < 60) out.push(own);
+    }
+    return out;
+}
+
+var find = mode === 'loyalty' ? findLoyalty : findProgression;
+var claimed = 0, via = [], scrolls = 0, unconfirmed = 0;
+function changed(b, before){ return !document.contains(b) || b.disabled || txt(b) !== before; }
+(async function(){
+    try {
+        while (claimed < maxClaims && Date.now() < DEADLINE) {
+            var hit = find();
+            if (!hit) {
+                if (mode === 'progression' && scrolls < 3) {
+                    document.querySelectorAll('div').forEach(function(d){
+                        if (d.scrollWidth > d.clientWidth) d.scrollLeft += 400;
+                    });
+                    scrolls++;
+                    await settle();
+                    continue;
+                }
+                break;
+            }
+            var b = hit[0], before = txt(b);
+            b.scrollIntoView({block:'center', inline:'center'});
+            b.click();
+            await settle();
+            var ok = changed(b, before);
+            if (closePopups()) await settle();
+            if (ok || changed(b, before)) { claimed++; via.push(hit[1]); }
+            else { tried.add(b); unconfirmed++; }
+        }
+        done({claimed: claimed, via: via, timers: timers(), unconfirmed: unconfirmed,
+              more: claimed < maxClaims && Date.now() >= DEADLINE});
+    } catch (e) {
+        done({claimed: claimed, via: via, timers: [], more: false, unconfirmed: unconfirmed,
+              error: String(e)});
+    }
+})();
+"""
+
+
+def run_async_claims(driver, mode, max_claims, budget_s=ASYNC_BUDGET_S):
+    """
+    Runs _JS_ASYNC_CLAIM_RUNNER for "progression" or "loyalty".
+    Returns {"claimed", "via", "timers"} or None if the runner itself failed
+    (caller then falls back to the polling loop). Re-invoked only when the
+    in-page time budget ran out mid-way.
+    """
+    total = {"claimed": 0, "via": [], "timers": []}
+    for _ in range(3):
+        HUB_LIMITER.acquire("claim")
+        try:
+            res = driver.execute_async_script(
+                _JS_ASYNC_CLAIM_RUNNER, mode, max_claims - total["claimed"],
+                int(budget_s * 1000), ASYNC_SETTLE_MAX_S * 1000)
+        except Exception as e:
+            log(f"⚠️ Async {mode} runner failed: {str(e)[:100]}")
+            return None if total["claimed"] == 0 else total
+        if res.get("error"):
+            log(f"⚠️ Async {mode} runner error after {res.get('claimed', 0)}: {res['error'][:100]}")
+        if res.get("unconfirmed"):
+            log(f"ℹ️  {res['unconfirmed']} {mode} click(s) left the button unchanged — not counted")
+        total["claimed"] += res.get("claimed", 0)
+        total["via"]     += res.get("via", [])
+        total["timers"]   = res.get("timers", [])
+        if not res.get("more") or total["claimed"] >= max_claims:
+            break
+    return total
+
+
+def _claim_progression_polling(driver):
+    """Legacy click-and-sleep loop — fallback when the async runner fails."""
+    claimed = 0
+    for _ in range(6):
+        ok = driver.execute_script("""
+            // Detects both 'Claim' (single reward) and 'Claim all' (multi-reward card)
+            for(let btn of document.querySelectorAll('button')){
+                let t=(btn.innerText||btn.textContent).trim().toLowerCase();
+                let isClaimBtn = (t==='claim' || t==='claim all');
+                if(!isClaimBtn) continue;
+                if(btn.disabled) continue;
+                // offsetParent check skipped for 'claim all' (carousel may not be visible)
+                if(t==='claim' && btn.offsetParent===null) continue;
+                let pt=(btn.parentElement.innerText||btn.parentElement.textContent)||'';
+                if(pt.includes('Delivered')) continue;
+                btn.scrollIntoView({behavior:'smooth',block:'center',inline:'center'});
+                setTimeout(()=>btn.click(),300);
+                return t;
+            }
+            return false;
+        """)
+        if ok:
+            log(f"✅ Progression: '{ok}' clicked")
+            claimed += 1
+            settle(driver, 2, 1)
+            close_popup(driver)
+        else:
+            driver.execute_script(
+                "for(let i of document.querySelectorAll('div'))"
+                "{if(i.scrollWidth>i.clientWidth)i.scrollLeft+=400;}"
+            )
+            time.sleep(1)
+    return claimed
+
+
 def claim_progression_program_rewards(driver, pid):
     log("🎯 Claiming Progression Program...")
     claimed = 0
     try:
-        driver.get("https://hub.vertigogames.co/progression-program")
+        hub_get(driver, "https://hub.vertigogames.co/progression-program")
         bypass_cloudflare(driver)
         time.sleep(2)
         close_popup(driver)
-        for _ in range(6):
-            ok = driver.execute_script("""
-                // Detects both 'Claim' (single reward) and 'Claim all' (multi-reward card)
-                for(let btn of document.querySelectorAll('button')){
-                    let t=(btn.innerText||btn.textContent).trim().toLowerCase();
-                    let isClaimBtn = (t==='claim' || t==='claim all');
-                    if(!isClaimBtn) continue;
-                    if(btn.disabled) continue;
-                    // offsetParent check skipped for 'claim all' (carousel may not be visible)
-                    if(t==='claim' && btn.offsetParent===null) continue;
-                    let pt=(btn.parentElement.innerText||btn.parentElement.textContent)||'';
-                    if(pt.includes('Delivered')) continue;
-                    btn.scrollIntoView({behavior:'smooth',block:'center',inline:'center'});
-                    setTimeout(()=>btn.click(),300);
-                    return t;
-                }
-                return false;
-            """)
-            if ok:
-                log(f"✅ Progression: '{ok}' clicked")
-                claimed += 1
-                time.sleep(2.0)
-                close_popup(driver)
-            else:
-                driver.execute_script(
-                    "for(let i of document.querySelectorAll('div'))"
-                    "{if(i.scrollWidth>i.clientWidth)i.scrollLeft+=400;}"
-                )
-                time.sleep(1)
+        res = run_async_claims(driver, "progression", PROGRESSION_MAX_CLAIMS)
+        if res is not None:
+            claimed = res["claimed"]
+            for how in res["via"]:
+                log(f"✅ Progression: '{how}' clicked")
+        else:
+            claimed = _claim_progression_polling(driver)
 
         # Always record last_visit so smart-skip knows the page was checked
         update_claim_history(pid, "progression", claimed_count=claimed)
-    except:
+    except Exception as e:
+        DIAG.capture(driver, pid, "progression", f"error: {e}")
         # Still try to record visit even on exception
         try:
             update_claim_history(pid, "progression", claimed_count=0)
@@ -1149,6 +3266,63 @@ def claim_progression_program_rewards(driver, pid):
     return claimed
 
 
+def _claim_loyalty_polling(driver):
+    """Legacy click-and-sleep loop — fallback when the async runner fails."""
+    claimed = 0
+    for attempt in range(5):
+        ok = driver.execute_script("""
+            // Primary: tier card containers [data-slider-item-id]
+            var cards = Array.from(document.querySelectorAll('[data-slider-item-id]'));
+            for(var i=0; i<cards.length; i++){
+                var card = cards[i];
+                var cardText = (card.innerText||'').toLowerCase();
+                if(cardText.includes('delivered')) continue;
+                if(cardText.includes('next in')) continue;
+                var btns = card.querySelectorAll('button');
+                for(var j=0; j<btns.length; j++){
+                    var btn = btns[j];
+                    if(btn.disabled) continue;
+                    var t=(btn.innerText||btn.textContent||'').trim().toLowerCase();
+                    if(t!=='claim'&&t!=='free') continue;
+                    btn.scrollIntoView({behavior:'smooth',block:'center',inline:'center'});
+                    btn.click();
+                    return 'card';
+                }
+            }
+            // Fallback: page-wide, exclude Store Bonus
+            var allBtns = Array.from(document.querySelectorAll('button'));
+            for(var k=0; k<allBtns.length; k++){
+                var btn2 = allBtns[k];
+                if(btn2.disabled) continue;
+                var t2=(btn2.innerText||btn2.textContent||'').trim().toLowerCase();
+                if(t2!=='claim'&&t2!=='free') continue;
+                var node=btn2.parentElement, cd=false;
+                for(var d=0; d<3&&node; d++){
+                    var nt=(node.innerText||'').toLowerCase();
+                    if(nt.includes('next in')||nt.includes('delivered')
+                       ||nt.includes('store bonus')){cd=true;break;}
+                    node=node.parentElement;
+                }
+                if(!cd){
+                    btn2.scrollIntoView({behavior:'smooth',block:'center',inline:'center'});
+                    btn2.click();
+                    return 'fallback';
+                }
+            }
+            return false;
+        """)
+        if ok:
+            log(f"✅ Loyalty Claimed (via {ok})")
+            claimed += 1
+            settle(driver, 2, 1)
+            close_popup(driver)
+            settle(driver, 1)
+        else:
+            log(f"ℹ️  No claimable loyalty (attempt {attempt+1})")
+            break
+    return claimed
+
+
 def claim_loyalty_program(driver, pid):
     """Returns (count_claimed, was_skipped)."""
     h    = load_claim_history()
@@ -1164,7 +3338,7 @@ def claim_loyalty_program(driver, pid):
 
     # Self-heal: corrupt next_available (set without real claim) → clear it
     if ld.get("next_available") and not lc_l:
-        log(f"🔧 Healing corrupt loyalty cooldown for {pid}")
+        log(f"🔧 Healing corrupt loyalty cooldown for {mask_pid(pid)}")
         history = load_claim_history()
         if pid in history and "loyalty" in history[pid]:
             history[pid]["loyalty"]["next_available"] = None
@@ -1174,79 +3348,40 @@ def claim_loyalty_program(driver, pid):
     log("🏆 Claiming Loyalty Program...")
     claimed = 0
     try:
-        driver.get("https://hub.vertigogames.co/loyalty-program")
+        hub_get(driver, "https://hub.vertigogames.co/loyalty-program")
         bypass_cloudflare(driver)
         time.sleep(2)
         close_popup(driver)
         detect_page_cooldowns(driver, pid, "loyalty")
 
-        for attempt in range(5):
-            ok = driver.execute_script("""
-                // Primary: tier card containers [data-slider-item-id]
-                var cards = Array.from(document.querySelectorAll('[data-slider-item-id]'));
-                for(var i=0; i<cards.length; i++){
-                    var card = cards[i];
-                    var cardText = (card.innerText||'').toLowerCase();
-                    if(cardText.includes('delivered')) continue;
-                    if(cardText.includes('next in')) continue;
-                    var btns = card.querySelectorAll('button');
-                    for(var j=0; j<btns.length; j++){
-                        var btn = btns[j];
-                        if(btn.disabled) continue;
-                        var t=(btn.innerText||btn.textContent||'').trim().toLowerCase();
-                        if(t!=='claim'&&t!=='free') continue;
-                        btn.scrollIntoView({behavior:'smooth',block:'center',inline:'center'});
-                        btn.click();
-                        return 'card';
-                    }
-                }
-                // Fallback: page-wide, exclude Store Bonus
-                var allBtns = Array.from(document.querySelectorAll('button'));
-                for(var k=0; k<allBtns.length; k++){
-                    var btn2 = allBtns[k];
-                    if(btn2.disabled) continue;
-                    var t2=(btn2.innerText||btn2.textContent||'').trim().toLowerCase();
-                    if(t2!=='claim'&&t2!=='free') continue;
-                    var node=btn2.parentElement, cd=false;
-                    for(var d=0; d<3&&node; d++){
-                        var nt=(node.innerText||'').toLowerCase();
-                        if(nt.includes('next in')||nt.includes('delivered')
-                           ||nt.includes('store bonus')){cd=true;break;}
-                        node=node.parentElement;
-                    }
-                    if(!cd){
-                        btn2.scrollIntoView({behavior:'smooth',block:'center',inline:'center'});
-                        btn2.click();
-                        return 'fallback';
-                    }
-                }
-                return false;
-            """)
-            if ok:
-                log(f"✅ Loyalty Claimed (via {ok})")
-                claimed += 1
-                time.sleep(2)
-                close_popup(driver)
-                time.sleep(1)
-            else:
-                log(f"ℹ️  No claimable loyalty (attempt {attempt+1})")
-                break
+        res = run_async_claims(driver, "loyalty", LOYALTY_MAX_CLAIMS)
+        if res is not None:
+            claimed = res["claimed"]
+            for how in res["via"]:
+                log(f"✅ Loyalty Claimed (via {how})")
+        else:
+            claimed = _claim_loyalty_polling(driver)
 
         if claimed > 0:
             update_claim_history(pid, "loyalty", claimed_count=claimed)
-            time.sleep(1)
-            detect_page_cooldowns(driver, pid, "loyalty")
+            # Runner already read the tier timers after the last claim settled
+            d = parse_timer_text(res["timers"][0]) if res and res["timers"] else None
+            if d and d.total_seconds() > 60:
+                log(f"🔍 Loyalty timer (tier): {res['timers'][0]}")
+                update_claim_history(pid, "loyalty", detected_cooldown=d)
+            else:
+                time.sleep(1)
+                detect_page_cooldowns(driver, pid, "loyalty")
         else:
             update_claim_history(pid, "loyalty", attempted=True)
             # LP-locked: no claimable tier — don't count in possible, no "Partial" alert
             log("🔒 Loyalty: no claimable tier — LP-locked (not counted in possible)")
-            driver.save_screenshot(f"loyalty_{pid}.png")
             return 0, True
 
-        driver.save_screenshot(f"loyalty_{pid}.png")
         log(f"📊 Loyalty: {claimed}")
     except Exception as e:
         log(f"❌ Loyalty error: {e}")
+        DIAG.capture(driver, pid, "loyalty", f"error: {e}")
         return claimed, False
 
     return claimed, False
@@ -1256,9 +3391,121 @@ def claim_loyalty_program(driver, pid):
 # SECTION 9 — PLAYER PROCESSING
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def process_player(pid, has_loyalty, is_new, run_label):
-    start = get_ist_time()
-    stats = {
+DEFERRED_STATUS        = "Deferred — hub unavailable"
+DEFERRED_BUDGET_STATUS = "Deferred — run budget"
+
+
+# ── Execution profiles ─────────────────────────────────────────────────────────
+# How a run executes depends on its slot: the Primary run has nearly every ID
+# due and gets parallel workers; backups mostly smart-skip and stay serial.
+#   workers      parallel browsers (each with its own prefetcher)
+#   budget_s     wall-clock budget; IDs not started in time are deferred (0 = none)
+#   rewards      reward types attempted at all
+#   page_policy  "all" opens every page, "due" only pages the history says are due
+# Overrides: exec_profiles.json {"primary": {...}, "backup": {...}, "slot_3": {...}}
+# or EXEC_WORKERS for a one-off worker count.
+
+EXEC_PROFILES_FILE = "exec_profiles.json"
+PROFILE_HISTORY    = 24   # throughput records kept per profile in bot_meta.json
+
+EXEC_PROFILES = {
+    "primary": {"workers": 3, "budget_s": 45 * 60, "rewards": list(_REWARD_TYPES), "page_policy": "all"},
+    "backup":  {"workers": 1, "budget_s": 25 * 60, "rewards": list(_REWARD_TYPES), "page_policy": "due"},
+    "manual":  {"workers": 1, "budget_s": 0,       "rewards": list(_REWARD_TYPES), "page_policy": "all"},
+}
+
+
+class ExecProfile:
+    __slots__ = ("name", "workers", "budget_s", "rewards", "page_policy")
+
+    def __init__(self, name, workers=1, budget_s=0, rewards=_REWARD_TYPES, page_policy="all"):
+        self.name        = name
+        self.workers     = max(1, int(workers))
+        self.budget_s    = int(budget_s)
+        self.rewards     = tuple(r for r in rewards if r in _REWARD_TYPES)
+        self.page_policy = page_policy if page_policy in ("all", "due") else "all"
+
+    def __repr__(self):
+        budget = f"{self.budget_s // 60}m" if self.budget_s else "none"
+        return (f"{self.name} (workers={self.workers}, budget={budget}, "
+                f"rewards={'+'.join(self.rewards)}, pages={self.page_policy})")
+
+
+def exec_profile_for(run_index):
+    name = "primary" if run_index == 0 else "manual" if run_index == -1 else "backup"
+    cfg  = dict(EXEC_PROFILES[name])
+    if os.path.exists(EXEC_PROFILES_FILE):
+        try:
+            with open(EXEC_PROFILES_FILE) as f:
+                over = json.load(f)
+            cfg.update(over.get(name, {}))
+            cfg.update(over.get(f"slot_{run_index}", {}))
+        except Exception as e:
+            log(f"⚠️ Ignoring {EXEC_PROFILES_FILE}: {e}")
+    if os.getenv("EXEC_WORKERS"):
+        cfg["workers"] = int(os.getenv("EXEC_WORKERS"))
+    return ExecProfile(name, **cfg)
+
+
+def page_plan(pid, has_loyalty, profile):
+    """
+    Reward pages to open for this ID. Under the "due" policy a page is skipped
+    only on the same evidence all_claimable_on_cooldown() trusts — loyalty by
+    last_claim, progression by last_visit.
+    """
+    want = {t: t in profile.rewards for t in _REWARD_TYPES}
+    want["loyalty"] = want["loyalty"] and has_loyalty
+    if profile.page_policy != "due":
+        return want
+    s   = get_reward_status(pid)
+    ph  = load_claim_history().get(pid, {})
+    ist = get_ist_time()
+    lv  = ph.get("progression", {}).get("last_visit")
+    lc  = ph.get("loyalty", {}).get("last_claim")
+    return {
+        "daily":       want["daily"] and s["daily_available"],
+        "store":       want["store"] and any(s["store_available"]),
+        "progression": want["progression"] and (
+            not lv or ist - datetime.fromisoformat(lv)
+            >= timedelta(hours=PROGRESSION_CHECK_WINDOW_HOURS)),
+        "loyalty":     want["loyalty"] and not (
+            lc and ist < datetime.fromisoformat(lc) + timedelta(hours=LOYALTY_COOLDOWN_HOURS)),
+    }
+
+
+def record_profile_throughput(meta, profile, results, run_index, dur_s):
+    """Appends this run's throughput to meta["profiles"][name] and returns the record."""
+    browsers = [r for r in results if not r.get("skipped_all") and not r.get("deferred")]
+    claims   = sum(r["daily"] + r["store"] + r["progression"] + r.get("loyalty", 0)
+                   for r in results)
+    mins     = max(dur_s, 1) / 60
+    rec = {
+        "ts":             get_ist_time().strftime("%Y-%m-%dT%H:%M"),
+        "slot":           run_index,
+        "workers":        profile.workers,
+        "page_policy":    profile.page_policy,
+        "ids":            len(results),
+        "browsers":       len(browsers),
+        "deferred":       sum(1 for r in results if r.get("deferred")),
+        "claims":         claims,
+        "dur_s":          dur_s,
+        "ids_per_min":    round(len(results) / mins, 2),
+        "claims_per_min": round(claims / mins, 2),
+        "browser_s_avg":  round(sum(r.get("duration_s", 0) for r in browsers) / len(browsers), 1)
+                          if browsers else 0,
+    }
+    hist = meta.setdefault("profiles", {}).setdefault(profile.name, [])
+    hist.append(rec)
+    del hist[:-PROFILE_HISTORY]
+    avg = sum(h["claims_per_min"] for h in hist) / len(hist)
+    log(f"  Profile {profile.name}: {rec['claims_per_min']} claims/min, "
+        f"{rec['ids_per_min']} IDs/min with {profile.workers} worker(s) "
+        f"(avg {avg:.2f} claims/min over {len(hist)} runs)")
+    return rec
+
+
+def new_player_stats(pid, has_loyalty, is_new):
+    return {
         "pid":             pid,
         "display_name":    None,   # captured after login; replaces raw ID in email
         "is_new":          is_new,
@@ -1275,13 +3522,67 @@ def process_player(pid, has_loyalty, is_new, run_label):
         "fail_reason":     None,
         "duration_s":      0,
         "possible":        0,
+        "infra_failure":   None,   # set for hub-side failures — feeds the circuit breaker
+        "phase_s":         {},     # phase → seconds, see enter_phase()
+        "worker":          threading.current_thread().name,
     }
 
+
+def enter_phase(stats, name):
+    """Closes the running phase into stats["phase_s"] and binds the log context to the next."""
+    now = time.monotonic()
+    cur = stats.pop("_phase", None)
+    if cur:
+        stats["phase_s"][cur[0]] = round(stats["phase_s"].get(cur[0], 0) + now - cur[1], 2)
+    if name:
+        stats["_phase"] = (name, now)
+        bind_log(phase=name)
+
+
+def deferred_player_stats(pid, has_loyalty, is_new, status=DEFERRED_STATUS,
+                          reason="Hub unavailable — retried next slot"):
+    """Result row for an ID the circuit breaker or the run budget kept out of this run."""
+    stats = new_player_stats(pid, has_loyalty, is_new)
+    snap  = get_reward_status(pid)
+    stats.update({
+        "status":       status,
+        "deferred":     True,
+        "fail_reason":  reason,
+        "store_next":   snap["store_next"],
+        "daily_next":   snap["daily_next"],
+        "loyalty_next": snap.get("loyalty_next"),
+    })
+    return stats
+
+
+def recycle_if_bloated(driver, pid, stats):
+    """Swaps in a fresh, logged-in driver when the current one is over DRIVER_RSS_LIMIT_MB."""
+    sampler = getattr(driver, "_cs_res", None)
+    if not sampler or sampler.last_mb < DRIVER_RSS_LIMIT_MB:
+        return driver
+    log(f"♻️ Chrome at {sampler.last_mb:.0f} MB (limit {DRIVER_RSS_LIMIT_MB} MB) — recycling driver")
+    quit_driver(driver, stats)
+    bump_stat("driver_recycles")
+    stats["recycled"] = stats.get("recycled", 0) + 1
+    driver = create_driver()
+    if not login_to_hub(driver, pid):
+        quit_driver(driver, stats)
+        raise RuntimeError("login failed after driver recycle")
+    return driver
+
+
+def process_player(pid, has_loyalty, is_new, run_label, prefetch=None, next_pid=None,
+                   profile=None):
+    start   = get_ist_time()
+    stats   = new_player_stats(pid, has_loyalty, is_new)
+    profile = profile or ExecProfile("manual")
+
     init_player_history(pid)
+    plan = page_plan(pid, has_loyalty, profile)
 
     # Smart skip — no browser needed if all rewards on cooldown + progression checked
-    if all_claimable_on_cooldown(pid, has_loyalty):
-        log(f"\n⏩ {pid} — all on cooldown, smart-skipping")
+    if all_claimable_on_cooldown(pid, has_loyalty) or not any(plan.values()):
+        log(f"\n⏩ {mask_pid(pid)} — all on cooldown, smart-skipping")
         stats.update({
             "skipped_all":     True,
             "daily_skipped":   True,
@@ -1299,26 +3600,45 @@ def process_player(pid, has_loyalty, is_new, run_label):
 
     driver = None
     try:
-        log(f"\n🚀 {pid}" + (" 🆕 NEW ID" if is_new else "") + f"  [{run_label}]")
-        driver = create_driver()
+        log(f"\n🚀 {mask_pid(pid)}" + (" 🆕 NEW ID" if is_new else "") + f"  [{run_label}]")
+        enter_phase(stats, "launch")
+        driver = prefetch.take(pid) if prefetch else None
+        if driver is None:
+            try:
+                driver = create_driver()
+            except Exception:
+                stats["infra_failure"] = "driver launch failed"
+                raise
+        if prefetch and next_pid:
+            prefetch.start(next_pid)   # next Chrome warms while this player claims
 
+        enter_phase(stats, "login")
         if not login_to_hub(driver, pid):
-            stats["status"]      = "Login Failed"
-            stats["fail_reason"] = "Could not authenticate"
+            stats["status"]        = "Login Failed"
+            stats["fail_reason"]   = "Could not authenticate"
+            stats["infra_failure"] = getattr(driver, "_cs_infra", None) or "login failed"
+            DIAG.capture(driver, pid, "login", stats["infra_failure"])
             return stats
 
         # Capture display name right after login — used in email instead of raw player ID
         stats["display_name"] = capture_display_name(driver)
 
         # Daily
-        d, d_skip = claim_daily_rewards(driver, pid)
-        stats["daily"]         = d
-        stats["daily_skipped"] = d_skip
-        if not d_skip:
-            stats["possible"] += 1
+        enter_phase(stats, "daily")
+        if plan["daily"]:
+            d, d_skip = claim_daily_rewards(driver, pid)
+            stats["daily"]         = d
+            stats["daily_skipped"] = d_skip
+            if not d_skip:
+                stats["possible"] += 1
+        else:
+            stats["daily_skipped"] = True
+            log("⏭️ Daily not due — page skipped")
 
         # Store
-        for retry in range(2):
+        driver = recycle_if_bloated(driver, pid, stats)
+        enter_phase(stats, "store")
+        for retry in range(2 if plan["store"] else 0):
             s, s_skips = claim_store_rewards(driver, pid)
             stats["store"]         = s
             stats["store_skipped"] = s_skips
@@ -1330,28 +3650,32 @@ def process_player(pid, has_loyalty, is_new, run_label):
             elif s == 0:
                 break
 
+        if not plan["store"]:
+            stats["store_skipped"] = [True, True, True]
+            log("⏭️ Store not due — page skipped")
         stats["possible"] += sum(1 for sk in stats["store_skipped"] if not sk)
 
         if stats["store"] > 0:
             log("⏳ Waiting for server to process store claims...")
             time.sleep(3)
 
-        # Progression
-        for retry in range(2):
-            p = claim_progression_program_rewards(driver, pid)
-            stats["progression"] += p
-            if p == 0 and retry < 1:
-                log("⚠️ No progression, retrying...")
-                time.sleep(2)
-            elif p == 0:
-                log("ℹ️  No progression available")
-                break
-            elif retry < 1:
-                log(f"✅ Got {p} progression, checking for more...")
-                time.sleep(1)
+        # Progression — the in-page runner already re-checks after each claim
+        driver = recycle_if_bloated(driver, pid, stats)
+        enter_phase(stats, "progression")
+        p = claim_progression_program_rewards(driver, pid) if plan["progression"] else 0
+        stats["progression"] += p
+        if not plan["progression"]:
+            log("⏭️ Progression checked recently — page skipped")
+        elif p == 0:
+            log("ℹ️  No progression available")
 
         # Loyalty
-        if has_loyalty:
+        enter_phase(stats, "loyalty")
+        if has_loyalty and not plan["loyalty"]:
+            stats["loyalty_skipped"] = True
+            log("⏭️ Loyalty not due — page skipped")
+        elif has_loyalty:
+            driver = recycle_if_bloated(driver, pid, stats)
             l, l_skip = claim_loyalty_program(driver, pid)
             stats["loyalty"]         = l
             stats["loyalty_skipped"] = l_skip
@@ -1372,9 +3696,12 @@ def process_player(pid, has_loyalty, is_new, run_label):
             stats["status"] = "Partial"
         else:
             stats["status"] = "No Rewards"
+        # The claim_* functions capture the page that failed; this covers the rest
+        if stats["status"] in ("Partial", "No Rewards") and not DIAG.has(pid):
+            DIAG.capture(driver, pid, "partial", f"{stats['status']}: {claimed_now}/{possible}")
 
         total_inc_prog = claimed_now + stats["progression"]
-        log(f"🎉 {pid}: {total_inc_prog} claimed "
+        log(f"🎉 {mask_pid(pid)}: {total_inc_prog} claimed "
             f"(D:{stats['daily']} S:{stats['store']} "
             f"P:{stats['progression']} L:{stats['loyalty']})")
 
@@ -1382,12 +3709,14 @@ def process_player(pid, has_loyalty, is_new, run_label):
         log(f"❌ Error: {e}")
         stats["status"]      = "Error"
         stats["fail_reason"] = str(e)[:120]
+        if isinstance(e, TimeoutException):
+            stats["infra_failure"] = "page load timeout"
+        DIAG.capture(driver, pid, "error", stats["fail_reason"])
     finally:
+        enter_phase(stats, "quit")
         if driver:
-            try:
-                driver.quit()
-            except:
-                pass
+            quit_driver(driver, stats)
+        enter_phase(stats, None)
 
     stats["duration_s"] = int((get_ist_time() - start).total_seconds())
 
@@ -1494,6 +3823,8 @@ tr.rs{background:#f0fdf4 !important;}
 tr.rp{background:#fff7ed !important;}
 tr.rf{background:#fef2f2 !important;}
 tr.rk{background:#fafafa !important;}
+.bl{border-left:1px solid #e5e7eb;}
+.tm{color:#6b7280 !important;}
 /* Hide mobile cards on desktop */
 .mob-cards{display:none;}
 
@@ -1605,6 +3936,8 @@ def _sb_html(status):
         "Login Failed":          ("sf", "🔐 Login Failed"),
         "Error":                 ("sf", "❌ Error"),
         "Failed":                ("sf", "❌ Failed"),
+        DEFERRED_STATUS:         ("sn", "🚧 Deferred"),
+        DEFERRED_BUDGET_STATUS:  ("sn", "⌛ Deferred"),
     }
     cls, lbl = m.get(status, ("sk", status))
     return f'<span class="sb {cls}">{lbl}</span>'
@@ -1630,104 +3963,290 @@ def _drow(lbl, val):
             f'<span class="dcv">{val}</span></div>')
 
 
-def build_mobile_cards(results, n):
+EMAIL_BYTE_BUDGET = 98 * 1024   # Gmail clips at ~102 KB; leave room for headers
+
+_FAIL_STATUSES   = ("Login Failed", "Error", "Failed")
+_DETAIL_STATUSES = ("Failed", "Partial", "Login Failed", "Error", "No Rewards")
+_STORE_NAMES     = ["🥇 Gold", "💵 Cash", "🍀 Luckyloon"]
+_SEP             = ' class="bl"'
+
+
+def _minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+
+_BLOCK_TAGS = (r"(?:html|head|body|meta|title|style|table|thead|tbody|tfoot|tr|td|th|div|p|"
+               r"ul|ol|li|br|hr|h[1-6]|center|caption|col|colgroup|section)")
+_WS_BEFORE_BLOCK = re.compile(r">\s+(?=</?" + _BLOCK_TAGS + r"\b)")
+_WS_AFTER_BLOCK  = re.compile(r"(</?" + _BLOCK_TAGS + r"\b[^>]*>)\s+<")
+_WS_INLINE       = re.compile(r">\s{2,}<")
+
+
+def _minify_html(html):
+    # Whitespace between inline elements renders as a space — keep one of it
+    html = _WS_BEFORE_BLOCK.sub(">", html)
+    html = _WS_AFTER_BLOCK.sub(r"\1<", html)
+    return _WS_INLINE.sub("> <", html)
+
+
+_CSS_MIN = _minify_css(_CSS)
+
+
+def _row_model(r):
     """
-    Builds the mobile stacked-card HTML block.
-    Hidden on desktop via CSS .mob-cards{display:none}.
-    Each player gets one card with icon rows — no horizontal scroll.
-    Uses _display_label() so raw IDs are never rendered.
+    Shared per-player view model — the desktop table row, the mobile card,
+    the detail card and the plain-text part are all rendered from this.
+    Cells are (icon, css_class, title) tuples.
     """
-    mob_html = ""
-    for r in results:
-        display_lbl = _display_label(r)   # privacy-safe
-        status      = r["status"]
-        rc          = _row_cls(status)
-        new_mark    = " 🆕" if r.get("is_new") else ""
-        d_s2        = r.get("duration_s", 0)
-        tm2         = f"{d_s2//60}m{d_s2%60}s" if d_s2 else "—"
-
-        sk2 = r.get("store_skipped", [False, False, False])
-        if not isinstance(sk2, list) or len(sk2) < 3:
-            sk2 = [False, False, False]
-        free_slots2 = [i for i in range(3) if not sk2[i]]
-        cc2         = [False, False, False]
-        for j2, idx2 in enumerate(free_slots2):
-            if j2 < r["store"]:
-                cc2[idx2] = True
-
-        is_fail2 = status in ("Login Failed", "Error", "Failed")
-
-        def _mi(val, skipped, fail):
-            if skipped: return "⏰"
-            if val > 0: return "✅"
-            if fail:    return "❌"
-            return "⏳"
-
-        d_ic  = _mi(r["daily"], r["daily_skipped"], is_fail2)
-        g_ic  = "⏰" if sk2[0] else ("✅" if cc2[0] else ("❌" if is_fail2 else "⏳"))
-        c_ic  = "⏰" if sk2[1] else ("✅" if cc2[1] else ("❌" if is_fail2 else "⏳"))
-        l_ic  = "⏰" if sk2[2] else ("✅" if cc2[2] else ("❌" if is_fail2 else "⏳"))
-        p_ic  = "✅" if r["progression"] > 0 else ("❌" if is_fail2 else "⏳")
-
-        if not r.get("has_loyalty"):
-            ly_ic = "—"
+    status = r["status"]
+    fail   = status in _FAIL_STATUSES
+    d_s    = r.get("duration_s", 0)
+
+    sk = r.get("store_skipped", [False, False, False])
+    if not isinstance(sk, list) or len(sk) < 3:
+        sk = [False, False, False]
+    free_slots    = [i for i in range(3) if not sk[i]]
+    claimed_cards = [False, False, False]
+    for j, idx in enumerate(free_slots):
+        if j < r["store"]:
+            claimed_cards[idx] = True
+    sn_list = r.get("store_next") or [None, None, None]
+
+    def _cell(claimed, skipped, nxt, pend_cls="ic-pd", pend_icon="⏳", pend_title=None):
+        if skipped:    return ("⏰", "ic-cd", f"Next: {nxt}")
+        if claimed:    return ("✅", "ic-ok", None)
+        if fail:       return ("❌", "ic-fl", None)
+        return (pend_icon, pend_cls, pend_title)
+
+    daily = _cell(r["daily"] > 0, r["daily_skipped"], r.get("daily_next") or "next reset")
+    store = [
+        _cell(claimed_cards[i], sk[i],
+              (sn_list[i] if len(sn_list) > i else None) or "next reset")
+        for i in range(3)
+    ]
+    prog = _cell(r["progression"] > 0, False, None,
+                 "ic-lk", "⏳", "Awaiting grenades/bullets")
+    if not r.get("has_loyalty"):
+        loyal = ("—", "ic-na", None)
+    else:
+        loyal = _cell(r.get("loyalty", 0) > 0, r.get("loyalty_skipped"),
+                      r.get("loyalty_next") or "24h",
+                      "ic-lk", "🔒", "Awaiting LP from purchases")
+
+    return {
+        "r":       r,
+        "label":   _display_label(r),   # privacy-safe — never raw pid
+        "new":     (" 🆕" if r.get("is_new") else "") + (" 🔁" if r.get("rerun") else ""),
+        "status":  status,
+        "rc":      _row_cls(status),
+        "fail":    fail,
+        "daily":   daily,
+        "store":   store,
+        "prog":    prog,
+        "loyal":   loyal,
+        "dur":     d_s,
+        "dur_str": f"{d_s//60}m{d_s%60}s" if d_s else "—",
+        "claimed_cards": claimed_cards,
+        "sk":      sk,
+        "sn_list": sn_list,
+        "skipped": bool(r.get("skipped_all")),
+        "detail":  status in _DETAIL_STATUSES,
+    }
+
+
+def _icon_html(cell):
+    icon, cls, title = cell
+    t = f' title="{title}"' if title else ""
+    return f'<span class="{cls}"{t}>{icon}</span>'
+
+
+def _table_row(m, out):
+    out.append(f'<tr class="{m["rc"]}"><td class="idc">{m["label"]}{m["new"]}</td>')
+    out.append(f'<td{_SEP}>{_icon_html(m["daily"])}</td>')
+    for i, cell in enumerate(m["store"]):
+        out.append(f'<td{_SEP if i == 0 else ""}>{_icon_html(cell)}</td>')
+    out.append(f'<td{_SEP}>{_icon_html(m["prog"])}</td>')
+    out.append(f'<td{_SEP}>{_icon_html(m["loyal"])}</td>')
+    tm = (f'<span class="tm">{m["dur_str"]}</span>'
+          if m["dur"] else '<span class="ic-na">—</span>')
+    out.append(f'<td{_SEP}>{tm}</td><td>{_sb_html(m["status"])}</td></tr>')
+
+
+def _mobile_card(m, out):
+    r  = m["r"]
+    st = m["store"]
+    out.append(
+        f'<div class="mpc {m["rc"]}">'
+        f'<div class="mpc-id">{m["label"]}{m["new"]}'
+        f'<span class="mpc-st">{_sb_html(m["status"])}</span></div>'
+        f'<div class="mpc-row">'
+        f'<span class="mpc-lbl">🎁 Daily &nbsp;🥇 Gold &nbsp;💵 Cash &nbsp;🍀 Lucky</span>'
+        f'<span class="mpc-val">{m["daily"][0]} &nbsp;{st[0][0]} &nbsp;{st[1][0]} &nbsp;{st[2][0]}</span></div>'
+        f'<div class="mpc-row"><span class="mpc-lbl">🎯 Progression</span>'
+        f'<span class="mpc-val">{m["prog"][0]}'
+        f'{" " + str(r["progression"]) if r["progression"] > 0 else ""}</span></div>'
+        f'<div class="mpc-row"><span class="mpc-lbl">🏆 Loyalty</span>'
+        f'<span class="mpc-val">{m["loyal"][0]}</span></div>'
+        f'<div class="mpc-row"><span class="mpc-lbl">⏱️ Time</span>'
+        f'<span class="mpc-val tm">{m["dur_str"]}</span></div>'
+        f'</div>'
+    )
+
+
+def _detail_card(m, out):
+    r      = m["r"]
+    status = m["status"]
+    dc_cls = "dcf" if status in ("Error", "Failed", "Login Failed") else "dcp"
+    out.append(f'<div class="dc {dc_cls}"><div class="dcid">{m["label"]}{m["new"]}</div>')
+    if r.get("fail_reason"):
+        out.append(f'<div class="dce">⚠️ {r["fail_reason"]}</div>')
+
+    out.append(_drow("🎁 Daily",
+                     "✅ Claimed" if r["daily"] > 0
+                     else f'⏰ {r.get("daily_next") or "On cooldown"}' if r["daily_skipped"]
+                     else "⏳ Not claimed"))
+    for i in range(3):
+        if m["claimed_cards"][i]:
+            sv = "✅ Claimed"
+        elif m["sk"][i]:
+            sn  = m["sn_list"]
+            sv  = f"⏰ {(sn[i] if len(sn) > i else None) or 'On cooldown'}"
+        else:
+            sv = "⏳ Not claimed"
+        out.append(_drow(_STORE_NAMES[i], sv))
+
+    out.append(_drow("🎯 Progression",
+                     f"✅ {r['progression']} claimed" if r["progression"] > 0
+                     else "⏳ Awaiting grenade/bullet threshold"))
+    if r.get("has_loyalty"):
+        if r.get("loyalty", 0) > 0:
+            lv = f"✅ {r['loyalty']} claimed"
         elif r.get("loyalty_skipped"):
-            ly_ic = "⏰"
-        elif r.get("loyalty", 0) > 0:
-            ly_ic = "✅"
-        elif is_fail2:
-            ly_ic = "❌"
+            lv = f"⏰ {r.get('loyalty_next') or 'On 24h cooldown'}"
         else:
-            ly_ic = "🔒"
-
-        mob_html += (
-            f'<div class="mpc {rc}">'
-            f'<div class="mpc-id">{display_lbl}{new_mark}'
-            f'<span class="mpc-st">{_sb_html(status)}</span></div>'
-            f'<div class="mpc-row">'
-            f'<span class="mpc-lbl">🎁 Daily &nbsp;🥇 Gold &nbsp;💵 Cash &nbsp;🍀 Lucky</span>'
-            f'<span class="mpc-val">{d_ic} &nbsp;{g_ic} &nbsp;{c_ic} &nbsp;{l_ic}</span></div>'
-            f'<div class="mpc-row">'
-            f'<span class="mpc-lbl">🎯 Progression</span>'
-            f'<span class="mpc-val">{p_ic}'
-            f'{" " + str(r["progression"]) if r["progression"] > 0 else ""}'
-            f'</span></div>'
-            f'<div class="mpc-row">'
-            f'<span class="mpc-lbl">🏆 Loyalty</span>'
-            f'<span class="mpc-val">{ly_ic}</span></div>'
-            f'<div class="mpc-row">'
-            f'<span class="mpc-lbl">⏱️ Time</span>'
-            f'<span class="mpc-val" style="color:#6b7280 !important;">{tm2}</span></div>'
-            f'</div>'
-        )
+            lv = "🔒 Awaiting LP threshold from purchases"
+    else:
+        lv = "— Not enrolled"
+    out.append(_drow("🏆 Loyalty", lv))
+    if m["dur"]:
+        out.append(_drow("⏱️ Time", f"{m['dur']}s"))
+    out.append('</div>')
 
-    return (
-        f"<div class='mob-cards'>"
-        f"<div class='mc-head'>"
+
+def _player_sections(models, n, collapse_skipped):
+    """
+    Renders desktop table, mobile cards and detail cards in one pass.
+    With collapse_skipped, all smart-skipped players become one summary
+    row/card — used only when the full render exceeds EMAIL_BYTE_BUDGET.
+    """
+    rows, cards, details = [], [], []
+    n_collapsed = 0
+    for m in models:
+        if collapse_skipped and m["skipped"]:
+            n_collapsed += 1
+            continue
+        _table_row(m, rows)
+        _mobile_card(m, cards)
+        if m["detail"]:
+            _detail_card(m, details)
+
+    if n_collapsed:
+        note = f"⏩ {n_collapsed} players smart-skipped — all rewards on cooldown"
+        rows.append(f'<tr class="rk"><td class="idc">{note}</td>'
+                    f'<td colspan="8"{_SEP}><span class="ic-cd">⏰</span></td></tr>')
+        cards.append(f'<div class="mpc rk"><div class="mpc-id">{note}</div></div>')
+
+    table = (
+        "<div class='tbx'>"
+        f"<div class='tbh'><span>👥 All {n} Players</span>"
+        "<small>⏩ = already claimed &nbsp;|&nbsp; 🆕 = new ID this run</small></div>"
+        "<div class='tsc'><table><tr>"
+        "<th class='idh'>Player</th>"
+        "<th class='bl'>🎁 Daily</th><th class='bl'>🥇 Gold</th>"
+        "<th>💵 Cash</th><th>🍀 Lucky</th>"
+        "<th class='bl'>🎯 Prog</th><th class='bl'>🏆 Loyal</th>"
+        "<th class='bl'>⏱️ Time</th>"
+        "<th>Status</th></tr>"
+        + "".join(rows) +
+        "</table></div></div>"
+    )
+    mobile = (
+        "<div class='mob-cards'><div class='mc-head'>"
         f"<span>👥 All {n} Players</span>"
-        f"<small>🆕 = new ID this run</small></div>"
-        f"{mob_html}"
+        "<small>🆕 = new ID this run</small></div>"
+        + "".join(cards) + "</div>"
+    )
+    detail = ""
+    if details:
+        detail = ('<div class="dcs">'
+                  '<div class="dct">⚠️ Requires Attention — Failed &amp; Partial IDs</div>'
+                  + "".join(details) + '</div>')
+    return table + mobile + detail
+
+
+def _trend_strip_html(trend):
+    """7-day rolling strip from the run archive aggregates; empty on first run."""
+    if not trend or not trend.get("runs"):
+        return ""
+    cpd = trend.get("claims_per_day", {})
+
+    def _mmss(v):
+        return "—" if v is None else f"{int(v)//60}m{int(v)%60}s"
+
+    return (
+        f"<div class='strip'>"
+        f"<span class='si'>📈 <strong>{trend.get('window_days', 7)}d trend</strong>"
+        f" ({trend['runs']} runs)</span>"
+        f"<span class='si'>⏱️ p50 <strong>{_mmss(trend.get('dur_p50'))}</strong>"
+        f" · p95 <strong>{_mmss(trend.get('dur_p95'))}</strong></span>"
+        f"<span class='si'>📊 Avg eff <strong>{trend.get('eff_avg') or 0:.1f}%</strong></span>"
+        f"<span class='si'>📦 Per day: 🎁 <strong>{cpd.get('daily', 0)}</strong>"
+        f" 🏪 <strong>{cpd.get('store', 0)}</strong>"
+        f" 🎯 <strong>{cpd.get('progression', 0)}</strong>"
+        f" 🏆 <strong>{cpd.get('loyalty', 0)}</strong></span>"
+        f"<span class='si'>🛡️ Cloudflare/day <strong>{trend.get('cloudflare_per_day', 0)}</strong></span>"
         f"</div>"
     )
 
 
-def build_email(results, run_label, run_index, job_start, meta):
+def _email_summary(results, job_start, meta, roster):
+    """Run-level numbers shared by the HTML and plain-text renderers."""
     ist_now = get_ist_time()
     dur_s   = int((ist_now - job_start).total_seconds())
-    dur_str = f"{dur_s // 60}m {dur_s % 60}s"
     n       = len(results)
-
     td   = sum(r["daily"]          for r in results)
     ts   = sum(r["store"]          for r in results)
     tp   = sum(r["progression"]    for r in results)
     tl   = sum(r.get("loyalty", 0) for r in results)
-    tall = td + ts + tp + tl
+    tp_all = sum(r.get("possible", 0) for r in results)
+    done_ct, total_ct = day_progress_counts(meta, roster) if roster is not None else (0, n)
+    return {
+        "ist_now": ist_now, "dur_s": dur_s, "dur_str": f"{dur_s // 60}m {dur_s % 60}s",
+        "n": n, "td": td, "ts": ts, "tp": tp, "tl": tl, "tall": td + ts + tp + tl,
+        "eff": 100.0 if tp_all == 0 else round((td + ts + tl) / tp_all * 100, 1),
+        "l_enrl":  sum(1 for r in results if r.get("has_loyalty")),
+        "skip_ct": sum(1 for r in results if r.get("skipped_all")),
+        "done_ct": done_ct, "total_ct": total_ct,
+        "memory":  worker_memory(results),
+    }
 
-    tp_all  = sum(r.get("possible", 0) for r in results)
-    eff     = 100.0 if tp_all == 0 else round((td + ts + tl) / tp_all * 100, 1)
-    l_enrl  = sum(1 for r in results if r.get("has_loyalty"))
-    skip_ct = sum(1 for r in results if r.get("skipped_all"))
+
+def build_email(results, run_label, run_index, job_start, meta, trend=None, roster=None):
+    sm      = _email_summary(results, job_start, meta, roster)
+    ist_now = sm["ist_now"]
+    dur_str = sm["dur_str"]
+    n       = sm["n"]
+    td, ts, tp, tl, tall = sm["td"], sm["ts"], sm["tp"], sm["tl"], sm["tall"]
+    eff     = sm["eff"]
+    l_enrl  = sm["l_enrl"]
+    skip_ct = sm["skip_ct"]
     act_ct  = n - skip_ct
+    dis_ct  = roster.disabled_count() if roster is not None else 0
+    dis_str = f" · {dis_ct} disabled" if dis_ct else ""
+    done_ct, total_ct = sm["done_ct"], sm["total_ct"]
 
     streak = meta.get("streak", {})
     s_cur  = streak.get("current", 0)
@@ -1739,7 +4258,8 @@ def build_email(results, run_label, run_index, job_start, meta):
     lr_tot = lr.get("total_claimed")
     lr_eff = lr.get("efficiency")
 
-    timed   = [(r["pid"], r.get("duration_s", 0)) for r in results if not r.get("skipped_all")]
+    timed   = [(r["pid"], r.get("duration_s", 0)) for r in results
+               if not r.get("skipped_all") and not r.get("deferred")]
     avg_t   = round(sum(t for _, t in timed) / len(timed), 1) if timed else 0
     slowest = max(timed, key=lambda x: x[1]) if timed else None
 
@@ -1759,204 +4279,48 @@ def build_email(results, run_label, run_index, job_start, meta):
         round(lr_eff, 1) if lr_eff is not None else None, "%"
     )
 
-    # ── Build table rows ──────────────────────────────────────────────────────
-    table_rows   = ""
-    detail_cards = ""
-    has_details  = False
-
-    for r in results:
-        pid         = r["pid"]
-        display_lbl = _display_label(r)   # privacy-safe — never raw pid
-        status      = r["status"]
-        rc          = _row_cls(status)
-        new_mark    = " 🆕" if r.get("is_new") else ""
-
-        # Daily cell
-        if r["daily_skipped"]:
-            dn = r.get("daily_next") or "next reset"
-            dc = f'<span class="ic-cd" title="Next: {dn}">⏰</span>'
-        elif r["daily"] > 0:
-            dc = '<span class="ic-ok">✅</span>'
-        elif status in ("Login Failed", "Error", "Failed"):
-            dc = '<span class="ic-fl">❌</span>'
-        else:
-            dc = '<span class="ic-pd">⏳</span>'
-
-        # Store cells
-        sk = r.get("store_skipped", [False, False, False])
-        if not isinstance(sk, list) or len(sk) < 3:
-            sk = [False, False, False]
-        free_slots    = [i for i in range(3) if not sk[i]]
-        claimed_cards = [False, False, False]
-        for j, idx in enumerate(free_slots):
-            if j < r["store"]:
-                claimed_cards[idx] = True
-
-        sn_list = r.get("store_next") or [None, None, None]
-        sc_html = ""
-        for i in range(3):
-            sep = ' style="border-left:1px solid #e5e7eb;"' if i == 0 else ''
-            if sk[i]:
-                nxt  = (sn_list[i] if sn_list and len(sn_list) > i else None) or "next reset"
-                cell = f'<span class="ic-cd" title="Next: {nxt}">⏰</span>'
-            elif claimed_cards[i]:
-                cell = '<span class="ic-ok">✅</span>'
-            elif status in ("Login Failed", "Error", "Failed"):
-                cell = '<span class="ic-fl">❌</span>'
-            else:
-                cell = '<span class="ic-pd">⏳</span>'
-            sc_html += f'<td{sep}>{cell}</td>'
-
-        # Progression cell
-        pc = ('<span class="ic-ok">✅</span>' if r["progression"] > 0
-              else '<span class="ic-fl">❌</span>'
-              if status in ("Login Failed", "Error", "Failed")
-              else '<span class="ic-lk" title="Awaiting grenades/bullets">⏳</span>')
-
-        # Loyalty cell
-        if not r.get("has_loyalty"):
-            lc = '<span class="ic-na">—</span>'
-        elif r.get("loyalty_skipped"):
-            ln = r.get("loyalty_next") or "24h"
-            lc = f'<span class="ic-cd" title="Next: {ln}">⏰</span>'
-        elif r.get("loyalty", 0) > 0:
-            lc = '<span class="ic-ok">✅</span>'
-        elif status in ("Login Failed", "Error", "Failed"):
-            lc = '<span class="ic-fl">❌</span>'
-        else:
-            lc = '<span class="ic-lk" title="Awaiting LP from purchases">🔒</span>'
-
-        # Time cell — always shows duration (even smart-skipped)
-        d_s = r.get("duration_s", 0)
-        tm  = (f'<span style="color:#6b7280;">{d_s//60}m{d_s%60}s</span>'
-               if d_s else '<span class="ic-na">—</span>')
-
-        table_rows += (
-            f'<tr class="{rc}">'
-            f'<td class="idc">{display_lbl}{new_mark}</td>'
-            f'<td style="border-left:1px solid #e5e7eb;">{dc}</td>'
-            f'{sc_html}'
-            f'<td style="border-left:1px solid #e5e7eb;">{pc}</td>'
-            f'<td style="border-left:1px solid #e5e7eb;">{lc}</td>'
-            f'<td style="border-left:1px solid #e5e7eb;">{tm}</td>'
-            f'<td>{_sb_html(status)}</td>'
-            f'</tr>'
-        )
-
-        # Detail cards (failed/partial only)
-        if status in ("Failed", "Partial", "Login Failed", "Error", "No Rewards"):
-            has_details = True
-            dc_cls   = "dcf" if status in ("Error", "Failed", "Login Failed") else "dcp"
-            err_html = (f'<div class="dce">⚠️ {r["fail_reason"]}</div>'
-                        if r.get("fail_reason") else "")
-
-            d_val = ("✅ Claimed" if r["daily"] > 0
-                     else f'⏰ {r.get("daily_next") or "On cooldown"}' if r["daily_skipped"]
-                     else "⏳ Not claimed")
-
-            SNAMES = ["🥇 Gold", "💵 Cash", "🍀 Luckyloon"]
-            s_rows = ""
-            for i in range(3):
-                if claimed_cards[i]:
-                    sv = "✅ Claimed"
-                elif sk[i]:
-                    nxt = (sn_list[i] if sn_list and len(sn_list) > i else None) or "On cooldown"
-                    sv  = f"⏰ {nxt}"
-                else:
-                    sv = "⏳ Not claimed"
-                s_rows += _drow(SNAMES[i], sv)
-
-            pg = (f"✅ {r['progression']} claimed" if r["progression"] > 0
-                  else "⏳ Awaiting grenade/bullet threshold")
-
-            if r.get("has_loyalty"):
-                if r.get("loyalty", 0) > 0:
-                    lv = f"✅ {r['loyalty']} claimed"
-                elif r.get("loyalty_skipped"):
-                    lv = f"⏰ {r.get('loyalty_next') or 'On 24h cooldown'}"
-                else:
-                    lv = "🔒 Awaiting LP threshold from purchases"
-            else:
-                lv = "— Not enrolled"
-
-            detail_cards += (
-                f'<div class="dc {dc_cls}">'
-                f'<div class="dcid">{display_lbl}{new_mark}</div>'
-                f'{err_html}'
-                f'{_drow("🎁 Daily", d_val)}'
-                f'{s_rows}'
-                f'{_drow("🎯 Progression", pg)}'
-                f'{_drow("🏆 Loyalty", lv)}'
-                f'{_drow("⏱️ Time", str(d_s) + "s") if d_s else ""}'
-                f'</div>'
-            )
-
-    detail_sec = ""
-    if has_details:
-        detail_sec = (
-            f'<div class="dcs">'
-            f'<div class="dct">⚠️ Requires Attention — Failed &amp; Partial IDs</div>'
-            f'{detail_cards}'
-            f'</div>'
-        )
-
-    # Schedule footer
-    sched   = next_scheduled_runs_ist()
-    nr_html = ""
-    for i, (lbl, t) in enumerate(sched):
-        cls      = ' class="nr nrp"' if i == 0 else ' class="nr"'
-        nr_html += f'<div{cls}><div class="nrl">{lbl}</div><div class="nrt">{t}</div></div>'
-
     slowest_str = f"{slowest[0][:8]}… ({slowest[1]}s)" if slowest else "—"
 
-    # Mobile stacked cards
-    mob_section = build_mobile_cards(results, n)
-
-    html = (
+    head = [
         "<!DOCTYPE html><html lang='en'>"
         "<head><meta charset='UTF-8'>"
         "<meta name='viewport' content='width=device-width,initial-scale=1.0'>"
-        f"<style>{_CSS}</style></head>"
-        "<body><div class='wrap'>"
+        f"<style>{_CSS_MIN}</style></head>"
+        "<body><div class='wrap'>",
 
         # Hero
         f"<div class='hero'>"
         f"<span class='badge {bc}'>{bi} {run_label}</span>"
-        f"<div class='hero-grid'>"
-        f"<div class='hero-left'>"
+        f"<div class='hero-grid'><div class='hero-left'>"
         f"<h1>CS Hub Rewards Dashboard</h1>"
         f"<p>📅 {ist_now.strftime('%d %b %Y, %I:%M %p IST')}"
         f" &nbsp;·&nbsp; ⏱️ {dur_str}"
-        f" &nbsp;·&nbsp; 👥 {act_ct} active / {skip_ct} smart-skipped</p>"
-        f"</div>"
-        f"<div class='hero-nums'>"
+        f" &nbsp;·&nbsp; 👥 {act_ct} active / {skip_ct} smart-skipped{dis_str}</p>"
+        f"</div><div class='hero-nums'>"
         f"<div class='hnum'><span class='hv g'>{tall}</span>"
         f"<span class='hl'>Total Claimed</span></div>"
         f"<div class='hnum'><span class='hv b'>{eff:.1f}%</span>"
         f"<span class='hl'>Efficiency</span></div>"
         f"<div class='hnum'><span class='hv a'>🔥 {s_cur}</span>"
         f"<span class='hl'>Day Streak</span></div>"
-        f"</div></div></div>"
+        f"</div></div></div>",
 
         # KPI Row
         f"<div class='kpi-row'>"
         f"<div class='kpi'><div class='kl'>🎁 Daily</div>"
         f"<div class='kv'>{td}<span>/{n}</span></div>"
         f"<div class='ks'>{dlt_d}</div>{_pbar(d_pct,'pg')}</div>"
-
         f"<div class='kpi'><div class='kl'>🏪 Store</div>"
         f"<div class='kv'>{ts}<span>/{n*3}</span></div>"
         f"<div class='ks'>{dlt_s}</div>{_pbar(s_pct,'pb2')}</div>"
-
         f"<div class='kpi'><div class='kl'>🎯 Progression</div>"
         f"<div class='kv'>{tp}<span> items</span></div>"
         f"<div class='ks'>Variable — grenade dependent</div>"
         f"{_pbar(min(tp*10,100),'pp')}</div>"
-
         f"<div class='kpi'><div class='kl'>🏆 Loyalty</div>"
         f"<div class='kv'>{tl}<span>/{l_enrl}</span></div>"
         f"<div class='ks'>{dlt_l}</div>{_pbar(l_pct,'pa')}</div>"
-        f"</div>"
+        f"</div>",
 
         # Strip
         f"<div class='strip'>"
@@ -1964,35 +4328,26 @@ def build_email(results, run_label, run_index, job_start, meta):
         f"<span class='si'>👤 Avg <strong>{avg_t}s</strong>/ID</span>"
         f"<span class='si'>🐢 Slowest: <strong>{slowest_str}</strong></span>"
         f"<span class='si'>🔥 Best streak: <strong>{s_best} days</strong></span>"
+        f"<span class='si'>✅ <strong>{done_ct} of {total_ct}</strong> IDs complete today</span>"
         f"<span class='si'>📊 Efficiency: <strong>{eff:.1f}%</strong> {dlt_eff}</span>"
         f"<span class='si'>📦 This run: <strong>{tall}</strong> claimed {dlt_tot}</span>"
-        f"</div>"
+        + "".join(
+            f"<span class='si'>🧠 Chrome{'' if len(sm['memory']) == 1 else ' ' + w}: "
+            f"peak <strong>{m['peak_mb']} MB</strong>, avg {m['avg_mb']} MB</span>"
+            for w, m in sm["memory"].items())
+        + f"</div>",
+
+        # Trend strip (rolling run archive)
+        _trend_strip_html(trend),
+    ]
 
-        # Desktop table
-        f"<div class='tbx'>"
-        f"<div class='tbh'><span>👥 All {n} Players</span>"
-        f"<small>⏩ = already claimed &nbsp;|&nbsp; 🆕 = new ID this run</small></div>"
-        f"<div class='tsc'><table>"
-        f"<tr>"
-        f"<th class='idh'>Player</th>"
-        f"<th style='border-left:1px solid #e5e7eb;'>🎁 Daily</th>"
-        f"<th style='border-left:1px solid #e5e7eb;'>🥇 Gold</th>"
-        f"<th>💵 Cash</th><th>🍀 Lucky</th>"
-        f"<th style='border-left:1px solid #e5e7eb;'>🎯 Prog</th>"
-        f"<th style='border-left:1px solid #e5e7eb;'>🏆 Loyal</th>"
-        f"<th style='border-left:1px solid #e5e7eb;'>⏱️ Time</th>"
-        f"<th>Status</th>"
-        f"</tr>"
-        f"{table_rows}"
-        f"</table></div></div>"
-
-        # Mobile stacked cards (hidden on desktop)
-        f"{mob_section}"
-
-        # Detail cards
-        f"{detail_sec}"
-
-        # Footer
+    # Schedule footer
+    nr_html = "".join(
+        f'<div class="nr{" nrp" if i == 0 else ""}"><div class="nrl">{lbl}</div>'
+        f'<div class="nrt">{t}</div></div>'
+        for i, (lbl, t) in enumerate(next_scheduled_runs_ist())
+    )
+    foot = (
         f"<div class='foot'>"
         f"<div class='ft'>🗓️ All 8 Scheduled Runs Today (IST)</div>"
         f"<div class='nr-grid'>{nr_html}</div>"
@@ -2016,49 +4371,480 @@ def build_email(results, run_label, run_index, job_start, meta):
         f"</div>"
         f"</div></body></html>"
     )
+
+    # Size budget: full render first, collapse smart-skipped rows only if needed
+    models  = [_row_model(r) for r in results]
+    head_s  = "".join(head)
+    html    = _minify_html(head_s + _player_sections(models, n, False) + foot)
+    if len(html.encode("utf-8")) > EMAIL_BYTE_BUDGET and skip_ct:
+        log(f"✂️ Email over {EMAIL_BYTE_BUDGET // 1024} KB — collapsing {skip_ct} smart-skipped rows")
+        html = _minify_html(head_s + _player_sections(models, n, True) + foot)
     return html
 
 
+def build_email_text(results, run_label, job_start, meta, roster=None):
+    """Plain-text alternative part — same numbers, one line per player."""
+    sm  = _email_summary(results, job_start, meta, roster)
+    s   = meta.get("streak", {})
+    out = [
+        f"CS Hub Rewards — {run_label} — {sm['ist_now'].strftime('%d %b %Y, %I:%M %p IST')}",
+        f"Total claimed: {sm['tall']} | Efficiency: {sm['eff']:.1f}% | "
+        f"Streak: {s.get('current', 0)} (best {s.get('best', 0)}) | Time: {sm['dur_str']}",
+        f"Daily {sm['td']}/{sm['n']}  Store {sm['ts']}/{sm['n']*3}  "
+        f"Progression {sm['tp']}  Loyalty {sm['tl']}/{sm['l_enrl']}",
+        f"{sm['done_ct']} of {sm['total_ct']} IDs complete today",
+        *[f"Chrome [{w}]: peak {m['peak_mb']} MB, avg {m['avg_mb']} MB, {m['cpu_s']}s CPU"
+          for w, m in sm["memory"].items()],
+        "",
+        "Player                    Status                  D  G  C  L  Prog Loyal Time",
+    ]
+    for r in results:
+        m = _row_model(r)
+        icons = "  ".join(c[0] for c in [m["daily"]] + m["store"])
+        out.append(f"{(m['label'] + m['new'])[:25]:<25} {m['status'][:22]:<23} "
+                   f"{icons}  {m['prog'][0]}    {m['loyal'][0]}    {m['dur_str']}")
+        if m["detail"] and r.get("fail_reason"):
+            out.append(f"    ⚠️ {r['fail_reason']}")
+    out.append("")
+    out.append(f"CS Rewards Bot {VERSION}")
+    return "\n".join(out) + "\n"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SECTION 10A — METRICS EXPORT (OpenMetrics textfile)
+# ═══════════════════════════════════════════════════════════════════════════════
+# Written atomically at the end of every run for node-exporter's textfile
+# collector. All values describe the last run, so they are gauges/histograms,
+# not monotonic counters.
+
+METRICS_FILE          = os.getenv("METRICS_FILE", "cs_rewards_bot.prom")
+PHASE_BUCKETS_S       = (1, 2, 5, 10, 20, 30, 60, 120, 300)
+_METRIC_PREFIX        = "cs_rewards"
+
+
+def _mlabels(**kw):
+    if not kw:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in kw.items()) + "}"
+
+
+class _MetricWriter:
+    def __init__(self):
+        self.lines = []
+
+    def gauge(self, name, help_, samples):
+        """samples: [(labels dict, value)]"""
+        full = f"{_METRIC_PREFIX}_{name}"
+        self.lines += [f"# HELP {full} {help_}", f"# TYPE {full} gauge"]
+        self.lines += [f"{full}{_mlabels(**lb)} {v}" for lb, v in samples]
+
+    def histogram(self, name, help_, series, buckets):
+        """series: [(labels dict, [observations])]"""
+        full = f"{_METRIC_PREFIX}_{name}"
+        self.lines += [f"# HELP {full} {help_}", f"# TYPE {full} histogram"]
+        for lb, obs in series:
+            for le in buckets:
+                n = sum(1 for o in obs if o <= le)
+                self.lines.append(f"{full}_bucket{_mlabels(**lb, le=le)} {n}")
+            self.lines.append(f"{full}_bucket{_mlabels(**lb, le='+Inf')} {len(obs)}")
+            self.lines.append(f"{full}_sum{_mlabels(**lb)} {round(sum(obs), 3)}")
+            self.lines.append(f"{full}_count{_mlabels(**lb)} {len(obs)}")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n# EOF\n"
+
+
+def build_metrics(results, run_label, run_index, dur_s, eff, profile_rec=None):
+    slot = {"slot": run_label, "slot_index": run_index}
+    m = _MetricWriter()
+    m.gauge("run_info", "Last run identity.", [({"version": VERSION, **slot}, 1)])
+    m.gauge("run_timestamp_seconds", "Unix time the last run finished.",
+            [({}, int(time.time()))])
+    m.gauge("run_duration_seconds", "Wall time of the last run.", [(slot, dur_s)])
+    m.gauge("run_efficiency_ratio", "Claimed / claimable rewards (daily, store, loyalty).",
+            [(slot, round(eff / 100, 4))])
+    m.gauge("claims", "Rewards claimed in the last run.",
+            [({"type": t}, sum(r.get(t, 0) for r in results)) for t in _REWARD_TYPES])
+    statuses = {}
+    for r in results:
+        statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+    m.gauge("players", "Players by final status in the last run.",
+            [({"status": st}, n) for st, n in sorted(statuses.items())])
+    m.gauge("smart_skips", "Players skipped without a browser.",
+            [({}, sum(1 for r in results if r.get("skipped_all")))])
+    m.gauge("driver_launches", "Chrome launch attempts.", [({}, RUN_STATS["driver_launches"])])
+    m.gauge("driver_launch_failures", "Chrome launch attempts that failed.",
+            [({}, RUN_STATS["driver_launch_failures"])])
+    m.gauge("cloudflare", "Cloudflare challenges by outcome.",
+            [({"outcome": k[11:]}, RUN_STATS[k])
+             for k in ("cloudflare_seen", "cloudflare_solved", "cloudflare_avoided")])
+    mem = worker_memory(results)
+    m.gauge("chrome_rss_peak_bytes", "Peak Chrome process-tree RSS per worker.",
+            [({"worker": w}, v["peak_mb"] * 1048576) for w, v in mem.items()])
+    m.gauge("chrome_rss_avg_bytes", "Average Chrome process-tree RSS per worker.",
+            [({"worker": w}, v["avg_mb"] * 1048576) for w, v in mem.items()])
+    m.gauge("chrome_cpu_seconds", "Chrome CPU time per worker.",
+            [({"worker": w}, v["cpu_s"]) for w, v in mem.items()])
+    m.gauge("driver_recycles", "Drivers recycled over the RSS limit.",
+            [({}, RUN_STATS["driver_recycles"])])
+    if profile_rec:
+        plb = {"profile": profile_rec["name"], "workers": profile_rec["workers"],
+               "page_policy": profile_rec["page_policy"]}
+        m.gauge("profile_claims_per_minute", "Throughput of the execution profile used.",
+                [(plb, profile_rec["claims_per_min"])])
+        m.gauge("profile_ids_per_minute", "IDs processed per minute by the profile used.",
+                [(plb, profile_rec["ids_per_min"])])
+    m.gauge("limiter_wait_seconds", "Time spent waiting on the hub rate limiter.",
+            [({}, round(RUN_STATS["limiter_wait_s"], 2))])
+
+    phases = {}
+    for r in results:
+        for ph, sec in (r.get("phase_s") or {}).items():
+            phases.setdefault(ph, []).append(sec)
+    m.histogram("phase_duration_seconds", "Per-player time spent in each phase.",
+                [({"phase": ph}, obs) for ph, obs in sorted(phases.items())], PHASE_BUCKETS_S)
+    return m.text()
+
+
+def write_metrics(results, run_label, run_index, dur_s, eff, profile_rec=None):
+    if not METRICS_FILE:
+        return
+    try:
+        d = os.path.dirname(METRICS_FILE)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        write_if_changed(METRICS_FILE, build_metrics(results, run_label, run_index,
+                                                     dur_s, eff, profile_rec))
+        log(f"📈 Metrics written to {METRICS_FILE}")
+    except Exception as e:
+        log(f"⚠️ Metrics export failed: {str(e)[:80]}")
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # SECTION 11 — MAIN
 # ═══════════════════════════════════════════════════════════════════════════════
 
-def main():
+# ── Circuit breaker ────────────────────────────────────────────────────────────
+# Hub-side failures (login, Cloudflare never cleared, page load timeout, Chrome
+# launch) are counted back to back; any player that gets past them resets the
+# count. Once open, no more browsers are launched this run and the remaining
+# IDs are deferred to the next slot.
+
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "3"))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.reasons   = []
+        self.open      = False
+        self.opened_at = None
+        self._lock     = threading.Lock()   # fed by every worker
+
+    def record(self, result):
+        """Feeds one player result. Returns True on the call that opens the breaker."""
+        with self._lock:
+            if result.get("skipped_all") or self.open:
+                return False
+            reason = result.get("infra_failure")
+            if not reason:
+                self.reasons = []
+                return False
+            self.reasons.append(reason)
+            if len(self.reasons) >= self.threshold:
+                self.open      = True
+                self.opened_at = get_ist_time()
+                return True
+            return False
+
+    def summary(self):
+        return {"opened_at": self.opened_at.isoformat() if self.opened_at else None,
+                "reasons":   list(self.reasons)}
+
+
+def build_outage_email(results, breaker, run_label, job_start):
+    """Short report sent instead of the dashboard when the breaker opened. Returns (html, text, subject)."""
+    deferred = [r for r in results if r.get("deferred")]
+    done     = [r for r in results if not r.get("deferred")]
+    claimed  = sum(r["daily"] + r["store"] + r["progression"] + r.get("loyalty", 0) for r in done)
+    when     = breaker.opened_at.strftime("%I:%M %p IST")
+    reasons  = ", ".join(dict.fromkeys(breaker.reasons))
+    ist_now  = get_ist_time()
+    now_m    = ist_now.hour * 60 + ist_now.minute
+    until    = [((h * 60 + m) - now_m) % 1440 or 1440 for h, m in _RUN_SLOTS]
+    nxt      = next_scheduled_runs_ist()[until.index(min(until))]
+    lines = [
+        f"CS Hub Rewards — {run_label} — hub unavailable",
+        f"Circuit breaker opened at {when} after {breaker.threshold} consecutive failures: {reasons}.",
+        f"{len(done)} IDs processed ({claimed} rewards claimed) before the outage.",
+        f"{len(deferred)} IDs deferred — they will be retried at the next slot ({nxt[0]}, {nxt[1]}).",
+    ]
+    text = "\n".join(lines) + f"\n\nCS Rewards Bot {VERSION}\n"
+    html = (
+        f"<!DOCTYPE html><html><head><meta charset='UTF-8'></head>"
+        f"<body style='font-family:Arial,sans-serif;background:#0f172a;color:#e2e8f0;padding:20px'>"
+        f"<h2 style='color:#fbbf24;margin:0 0 12px'>🚧 {lines[0]}</h2>"
+        + "".join(f"<p style='margin:6px 0'>{ln}</p>" for ln in lines[1:])
+        + f"<p style='color:#64748b;font-size:12px'>CS Rewards Bot {VERSION}</p></body></html>"
+    )
+    subject = (f"🚧 CS Hub | {job_start.strftime('%d-%b %I:%M %p')} IST | Hub unavailable — "
+               f"{len(deferred)} IDs deferred")
+    return html, text, subject
+
+
+def _run_lane(lane, new_ids, profile, run_label, breaker, deadline, results, prefetch_on=False):
+    """One worker: processes its share of the roster in order, optionally with a prefetcher."""
+    prefetch = DriverPrefetcher() if prefetch_on else None
+
+    # Which IDs will open a browser (smart-skips need none) — decided once per lane:
+    # an ID's history only changes when this lane processes it
+    needs = ([not all_claimable_on_cooldown(q.pid, q.has_loyalty, verbose=False) for q in lane]
+             if prefetch else [])
+
+    def _next_browser_pid(i):
+        return next((lane[j].pid for j in range(i + 1, len(lane)) if needs[j]), None)
+
+    try:
+        for i, p in enumerate(lane):
+            try:
+                _run_lane_player(i, p, new_ids, profile, run_label, breaker, deadline,
+                                 results, prefetch, _next_browser_pid)
+            except Exception as e:
+                # Never lose the rest of the lane — record this ID and move on
+                log(f"❌ Worker error on {mask_pid(p.pid)}: {type(e).__name__}: {e}")
+                r = new_player_stats(p.pid, p.has_loyalty, new_ids.get(p.pid, False))
+                r.update(status="Error", fail_reason=f"worker error: {str(e)[:100]}")
+                results[p.pid] = r
+    finally:
+        if prefetch:
+            prefetch.discard()
+
+
+def _run_lane_player(i, p, new_ids, profile, run_label, breaker, deadline, results, prefetch,
+                     next_browser_pid):
+    if breaker.open:
+        results[p.pid] = deferred_player_stats(p.pid, p.has_loyalty, new_ids[p.pid])
+        return
+    if deadline and time.monotonic() > deadline:
+        results[p.pid] = deferred_player_stats(
+            p.pid, p.has_loyalty, new_ids[p.pid], DEFERRED_BUDGET_STATUS,
+            f"Run budget ({profile.budget_s // 60}m) used up — retried next slot")
+        return
+    if RUN_PROFILER:
+        RUN_PROFILER.set_player(p.pid)
+    with log_context(player=mask_pid(p.pid), phase="start"):
+        r = process_player(p.pid, p.has_loyalty, new_ids[p.pid], run_label,
+                           prefetch=prefetch, profile=profile,
+                           next_pid=next_browser_pid(i) if prefetch else None)
+    results[p.pid] = r
+    if breaker.record(r):
+        log(f"🚧 Circuit breaker open after {breaker.threshold} consecutive hub failures "
+            f"({', '.join(breaker.reasons)}) — deferring remaining IDs")
+        if prefetch:
+            prefetch.discard()
+    time.sleep(0.5)
+
+
+def lane_plan(profile, n_players):
+    """
+    (workers, prefetch) that fit in memory: every Chrome may grow to
+    DRIVER_RSS_LIMIT_MB before it is recycled. Prefetch keeps a second warm
+    Chrome per lane, so it is only used with a single worker.
+    """
+    workers = min(profile.workers, max(1, n_players))
+    avail   = available_memory_mb()
+    if avail is not None:
+        fit = max(1, avail // DRIVER_RSS_LIMIT_MB)
+        if fit < workers:
+            log(f"🧠 {avail} MB available — {fit} worker(s) instead of {workers}")
+            workers = fit
+    prefetch = PREFETCH_DRIVERS and workers == 1 and (
+        avail is None or avail >= 2 * DRIVER_RSS_LIMIT_MB)
+    return workers, prefetch
+
+
+def run_players(players, new_ids, profile, run_label, breaker):
+    """
+    Runs the roster with profile.workers parallel lanes (round-robin split, so
+    priority order is kept within each lane). Results come back in roster order.
+    """
+    deadline = time.monotonic() + profile.budget_s if profile.budget_s else None
+    results  = {}
+    workers, prefetch_on = lane_plan(profile, len(players))
+    lanes    = [players[i::workers] for i in range(workers)]
+    if workers == 1:
+        _run_lane(lanes[0], new_ids, profile, run_label, breaker, deadline, results,
+                  prefetch_on)
+    else:
+        threads = [threading.Thread(target=_run_lane, name=f"worker-{n + 1}",
+                                    args=(lane, new_ids, profile, run_label, breaker,
+                                          deadline, results, prefetch_on))
+                   for n, lane in enumerate(lanes)]
+        for t in threads:
+            t.start()
+            time.sleep(1)   # stagger Chrome launches
+        for t in threads:
+            t.join()
+    return [results[p.pid] for p in players if p.pid in results]
+
+
+# ── Targeted re-run ────────────────────────────────────────────────────────────
+# `--ids` / `--status` process only a subset of the roster (optionally only
+# some reward types via `--rewards`) and merge the outcome into the newest
+# archived run, so the report that goes out is the previous run's, updated.
+
+def _status_matches(status, filters):
+    """Exact status name (any case) or its one-letter archive code."""
+    code = _STATUS_CODES.get(status)
+    return any(f.lower() == status.lower() or f.upper() == code for f in filters)
+
+
+def select_rerun_players(roster, targets):
+    """Roster entries picked by explicit IDs and/or last-run status filters."""
+    wanted = set(targets.get("ids") or [])
+    if targets.get("statuses"):
+        runs = load_run_archive()["runs"]
+        if not runs:
+            log("⚠️ No archived run to filter by status")
+        for rec in (runs[-1]["p"] if runs else []):
+            if _status_matches(_STATUS_NAMES.get(rec[1], ""), targets["statuses"]):
+                wanted.add(rec[0])
+    unknown = [pid for pid in wanted if pid not in roster]
+    if unknown:
+        log(f"⚠️ {len(unknown)} requested ID(s) not in the active roster — ignored")
+    return [p for p in roster.active() if p.pid in wanted]
+
+
+def _archived_row(rec, roster):
+    """Rebuilds a report row for an ID that was not re-run from its archive entry."""
+    pid, code, dur, claims = rec[0], rec[1], rec[2], rec[3]
+    p     = roster.get(pid)
+    stats = new_player_stats(pid, bool(p and p.has_loyalty), False)
+    snap  = get_reward_status(pid)
+    stats.update(dict(zip(_REWARD_TYPES, claims)))
+    stats.update({
+        "status":       _STATUS_NAMES.get(code, "Failed"),
+        "duration_s":   dur,
+        "possible":     rec[4] if len(rec) > 4 else claims[0] + claims[1] + claims[3],
+        "skipped_all":  code == "K",
+        "deferred":     code in ("D", "B"),
+        "daily_skipped": not claims[0] and not snap["daily_available"],
+        "loyalty_skipped": not claims[3] and not snap["loyalty_available"],
+        "store_next":   snap["store_next"],
+        "daily_next":   snap["daily_next"],
+        "loyalty_next": snap.get("loyalty_next"),
+    })
+    # Cards claimed in that run are on cooldown now — keep that many unskipped
+    keep, sk = claims[1], []
+    for avail in snap["store_available"]:
+        if not avail and keep:
+            keep -= 1
+            sk.append(False)
+        else:
+            sk.append(not avail)
+    stats["store_skipped"] = sk
+    return stats
+
+
+def merge_rerun_results(roster, results, started):
+    """
+    Previous run's rows with the re-run IDs replaced by merged rows (claims
+    added up). Only a run from the same IST day is merged; otherwise the
+    re-run's own rows are returned.
+    """
+    base = rerun_base(load_run_archive()["runs"], started)
+    prev = {rec[0]: rec for rec in (base["p"] if base else [])}
+    fresh = {r["pid"]: r for r in results}
+    merged = []
+    for pid in list(prev) + [pid for pid in fresh if pid not in prev]:
+        if pid not in fresh:
+            merged.append(_archived_row(prev[pid], roster))
+            continue
+        r = dict(fresh[pid], rerun=True)
+        if pid in prev:
+            d0, s0, p0, l0 = prev[pid][3]
+            r["daily"]       = min(1, r["daily"] + d0)
+            r["store"]       = min(3, r["store"] + s0)
+            r["progression"] = r["progression"] + p0
+            r["loyalty"]     = min(1, r.get("loyalty", 0) + l0)
+            before = d0 + s0 + l0
+            r["possible"] = max(r["possible"] + before,
+                                prev[pid][4] if len(prev[pid]) > 4 else 0)
+            got = r["daily"] + r["store"] + r["loyalty"]
+            if got and got >= r["possible"]:
+                r["status"] = "Success"
+            elif got:
+                r["status"] = "Partial"
+        merged.append(r)
+    return merged
+
+
+def main(targets=None):
+    """targets: {"ids", "statuses", "rewards"} for a targeted re-run, else a full run."""
     job_start = get_ist_time()
     log("=" * 60)
     log(f"CS HUB AUTO-CLAIMER {VERSION}")
     log("=" * 60)
 
     run_label, run_index = determine_run_context()
+    if targets:
+        run_label, run_index = "Targeted Re-run", -1
     ist_now = get_ist_time()
     log(f"📋 Run Context: {run_label}  |  {ist_now.strftime('%d-%b %H:%M IST')}")
 
+    DIAG.discard_stale()
+    # Deliver any reports left over from earlier runs while players are processed
+    outbox_prev = start_outbox_flush()
+
     meta = load_bot_meta()
+    if USE_PROFILE_TEMPLATE:
+        load_consent_from_template()
 
-    players = []
     try:
-        with open(PLAYER_ID_FILE, 'r') as f:
-            for row in csv.DictReader(f):
-                pid = row.get("player_id", "").strip()
-                if pid:
-                    hl = row.get("has_loyalty", "").strip().lower() in ("true", "yes", "1")
-                    players.append((pid, hl))
+        roster = Roster.load(PLAYER_ID_FILE, meta)
     except Exception as e:
         log(f"❌ Failed to read {PLAYER_ID_FILE}: {e}")
         return
 
-    log(f"👥 Loaded {len(players)} players "
-        f"({sum(1 for _, h in players if h)} with loyalty)")
-
-    results = []
-    for pid, has_loyalty in players:
-        new_id = is_new_id(pid, meta)
-        mark_id_seen(pid, meta)
-        r = process_player(pid, has_loyalty, new_id, run_label)
-        results.append(r)
-        time.sleep(0.5)
+    log(f"👥 Loaded {len(roster)} players "
+        f"({roster.loyalty_count()} with loyalty"
+        + (f", {roster.disabled_count()} disabled" if roster.disabled_count() else "") + ")")
+
+    bind_day_progress(meta, roster)
+    bind_selector_stats(meta)
+
+    today   = ist_now.strftime("%Y-%m-%d")
+    players = roster.active()
+    profile = exec_profile_for(run_index)
+    if targets:
+        players = select_rerun_players(roster, targets)
+        if not players:
+            log("ℹ️  Nothing to re-run — no IDs matched")
+            outbox_prev.join(timeout=OUTBOX_JOIN_TIMEOUT_S)
+            if outbox_prev.is_alive():
+                stop_outbox_flush()
+            return
+        profile = ExecProfile("rerun", workers=profile.workers, budget_s=profile.budget_s,
+                              rewards=targets.get("rewards") or _REWARD_TYPES)
+        log(f"🎯 Re-running {len(players)} ID(s)")
+    new_ids = {p.pid: roster.is_new(p.pid) for p in players}
+    breaker = CircuitBreaker(BREAKER_THRESHOLD)
+    log(f"⚙️ Execution profile: {profile}")
+
+    results = run_players(players, new_ids, profile, run_label, breaker)
+    # Deferred IDs never opened a browser — they stay 🆕 until a run processes them
+    for r in results:
+        if not r.get("deferred"):
+            roster.mark_seen(r["pid"], today)
+    roster.save_to_meta(meta)
+    if targets:
+        profile_rec = record_profile_throughput(
+            meta, profile, results, run_index,
+            int((get_ist_time() - job_start).total_seconds()))
+        results = merge_rerun_results(roster, results, job_start)
+    if RUN_PROFILER:
+        RUN_PROFILER.set_player("(report)")
 
     # Metrics
     job_end = get_ist_time()
@@ -2071,17 +4857,35 @@ def main():
     tp_all  = sum(r.get("possible", 0) for r in results)
     eff     = 100.0 if tp_all == 0 else round((td + ts + tl) / tp_all * 100, 1)
 
-    timed   = [(r["pid"], r.get("duration_s", 0)) for r in results if not r.get("skipped_all")]
+    timed   = [(r["pid"], r.get("duration_s", 0)) for r in results
+               if not r.get("skipped_all") and not r.get("deferred")]
     avg_t   = round(sum(t for _, t in timed) / len(timed), 1) if timed else 0
     slowest = max(timed, key=lambda x: x[1]) if timed else None
 
     log(f"\n{'='*60}")
     log(f"Run complete: {tall} claimed | {eff:.1f}% efficiency | {dur_s}s total")
     log(f"  Daily:{td}  Store:{ts}  Prog:{tp}  Loyalty:{tl}")
+    log(f"  Cloudflare: {RUN_STATS['cloudflare_seen']} challenges seen, "
+        f"{RUN_STATS['cloudflare_solved']} solved, "
+        f"{RUN_STATS['cloudflare_avoided']} avoided via shared clearance")
+    log(f"  Rate limiter: {RUN_STATS['limiter_acquires']} requests, "
+        f"{RUN_STATS['limiter_waits']} waited ({RUN_STATS['limiter_wait_s']:.1f}s), "
+        f"{RUN_STATS['limiter_backoffs']} backoffs, final rate {HUB_LIMITER.rate:.2f}/s")
+    if not targets:
+        profile_rec = record_profile_throughput(meta, profile, results, run_index, dur_s)
+    memory = worker_memory(results)
+    for w, m in memory.items():
+        log(f"  Chrome [{w}]: peak {m['peak_mb']} MB, avg {m['avg_mb']} MB, "
+            f"{m['cpu_s']}s CPU over {m['players']} IDs")
+    if RUN_STATS["driver_recycles"]:
+        log(f"  ♻️ {RUN_STATS['driver_recycles']} driver(s) recycled over {DRIVER_RSS_LIMIT_MB} MB")
+    diagnostics = DIAG.close()
     log(f"{'='*60}")
 
     # Streak: only requires daily + store, NOT loyalty (LP-locked players would break it)
-    all_ok = compute_all_ok_today(players)
+    done_ct, total_ct = day_progress_counts(meta, roster)
+    all_ok = done_ct >= total_ct
+    log(f"📋 {done_ct}/{total_ct} IDs complete today (daily + store)")
     if all_ok:
         log("✅ All daily+store claimed today — streak eligible")
     update_streak_day_level(meta, all_ok)
@@ -2096,25 +4900,60 @@ def main():
         "per_type":            {"daily": td, "store": ts, "progression": tp, "loyalty": tl},
         "slowest_player":      slowest[0] if slowest else None,
         "avg_time_per_player": avg_t,
+        "cloudflare":          {k[11:]: RUN_STATS[k] for k in
+                                ("cloudflare_seen", "cloudflare_solved", "cloudflare_avoided")},
+        "limiter":             {k[8:]: round(RUN_STATS[k], 1) for k in
+                                ("limiter_acquires", "limiter_waits", "limiter_wait_s",
+                                 "limiter_backoffs")},
+        "breaker":             breaker.summary() if breaker.open else None,
+        "memory":              memory,
+        "diagnostics":         diagnostics,
+        "profile":             dict(profile_rec, name=profile.name),
     }
     meta_for_email = dict(meta)
     meta_for_email["last_run"] = prev_run   # email delta uses previous run
 
-    save_bot_meta(meta)
-
-    html_body = build_email(results, run_label, run_index, job_start, meta_for_email)
+    if targets:
+        trend = merge_rerun_into_archive(results, job_start, job_end, dur_s, eff,
+                                         cloudflare_hits=RUN_STATS["cloudflare_seen"])
+    else:
+        trend = update_run_archive(results, run_label, run_index, job_end, dur_s, eff,
+                                   cloudflare_hits=RUN_STATS["cloudflare_seen"])
+        write_metrics(results, run_label, run_index, dur_s, eff, meta["last_run"]["profile"])
 
-    n_players = len(players)
+    if breaker.open:
+        html_body, text_body, subject = build_outage_email(results, breaker, run_label, job_start)
+    else:
+        html_body = build_email(results, run_label, run_index, job_start, meta_for_email, trend,
+                                roster=roster)
+        text_body = build_email_text(results, run_label, job_start, meta_for_email, roster)
+    log(f"📏 Email size: {len(html_body.encode('utf-8')) / 1024:.1f} KB html"
+        f" + {len(text_body.encode('utf-8')) / 1024:.1f} KB text"
+        f" (budget {EMAIL_BYTE_BUDGET // 1024} KB)")
+
+    n_players = len(roster)
     ok_count  = sum(1 for r in results if r["status"] == "Success")
     ist_label = job_start.strftime('%d-%b %I:%M %p')
     streak_d  = meta["streak"].get("current", 0)
-    subject = (
-        f"🎮 CS Hub | {ist_label} IST | {ok_count}/{n_players} IDs ✅ "
-        f"| {eff:.1f}% Efficiency | Day {streak_d} 🔥"
-    )
+    if not breaker.open:
+        subject = (
+            f"{'🔁 Re-run' if targets else '🎮 CS Hub'} | {ist_label} IST | "
+            f"{ok_count}/{n_players} IDs ✅ "
+            f"| {eff:.1f}% Efficiency | Day {streak_d} 🔥"
+        )
+
+    log(f"📧 Queueing email: {subject}")
+    write_debug_email(html_body)
+    spool_email(html_body, subject, text_body)
+    outbox_prev.join()
+    outbox_now = start_outbox_flush()   # SMTP runs while state is written
 
-    log(f"📧 Sending email: {subject}")
-    send_email(html_body, subject)
+    save_bot_meta(meta)
+
+    outbox_now.join(timeout=OUTBOX_JOIN_TIMEOUT_S)
+    if outbox_now.is_alive():
+        stop_outbox_flush()
+        log("⚠️ Email delivery still running at exit — unsent reports stay in outbox")
 
     # ── Replace everything from line 2139 to end of file ──────────────────────────
 # These two functions must live at MODULE level (no indent), not inside main().
@@ -2160,40 +4999,418 @@ def _resolve_email_config():
     return server, port, sender, password, receiver
 
 
-def send_email(html_body, subject):
-    # 1. THE FAILSAFE: Save a local copy of the email. 
-    # Your schedule.yml will automatically upload this to GitHub Artifacts!
+# ── Outbox ─────────────────────────────────────────────────────────────────────
+# Rendered reports are spooled to OUTBOX_DIR as .eml files and delivered by a
+# background thread. Failures stay in the outbox (carried between runs by the
+# Actions cache, never committed — messages hold the recipient addresses) and
+# are retried at the start of the next run; all pending reports go over a
+# single SMTP connection. A message being sent is renamed to .eml.sending, so
+# one left behind by a killed run is known to be a possible duplicate.
+
+OUTBOX_DIR          = "outbox"
+OUTBOX_MAX_ATTEMPTS = 8            # failed runs, not flushes ≈ one day of scheduled runs
+OUTBOX_JOIN_TIMEOUT_S = 180
+SMTP_RETRY_DELAYS   = (5, 15, 45)  # in-run backoff between connection attempts
+
+_outbox_lock = threading.Lock()
+_outbox_send = threading.Lock()    # held for exactly one sendmail()
+_outbox_stop = threading.Event()   # set at exit: finish the current message, start no more
+# main() flushes twice per run; a message is charged at most one attempt per run
+_OUTBOX_RUN  = os.getenv("GITHUB_RUN_ID") or f"{os.getpid()}-{int(time.time())}"
+
+
+def write_debug_email(html_body):
+    # THE FAILSAFE: local copy of the email, uploaded as a workflow artifact
     try:
         with open("debug_email.html", "w", encoding="utf-8") as f:
             f.write(html_body)
-    except Exception as e:
+    except Exception:
         pass
 
-    if not (SMTP_SERVER and SMTP_USERNAME and SMTP_PASSWORD and SMTP_FROM and SMTP_TO):
-        log("⚠️ Email env vars missing — skipping email")
+
+def spool_email(html_body, subject, text_body=None):
+    """Writes a ready-to-send message to the outbox. Returns its path."""
+    msg = MIMEMultipart("alternative")
+    msg["Subject"]    = subject
+    msg["From"]       = SMTP_FROM
+    msg["To"]         = SMTP_TO
+    msg["Date"]       = formatdate(localtime=False)
+    msg["Message-ID"] = make_msgid(domain="cs-rewards-bot")
+    # Explicit UTF-8 for the emojis; plain part first — clients render the last one they can
+    if text_body:
+        msg.attach(MIMEText(text_body, "plain", "utf-8"))
+    msg.attach(MIMEText(html_body, "html", "utf-8"))
+
+    os.makedirs(OUTBOX_DIR, exist_ok=True)
+    path = os.path.join(OUTBOX_DIR, f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}.eml")
+    with open(path, "wb") as f:
+        f.write(msg.as_bytes())
+    return path
+
+
+def _pending_outbox():
+    if not os.path.isdir(OUTBOX_DIR):
+        return []
+    for n in os.listdir(OUTBOX_DIR):
+        if n.endswith(".eml.sending"):
+            # Killed mid-send: it may have been delivered. Same Message-ID on resend,
+            # so the mail server can dedupe it.
+            log(f"⚠️ {n[:-8]} was interrupted while sending — resending, may arrive twice")
+            src = os.path.join(OUTBOX_DIR, n)
+            os.replace(src, src[:-8])
+    return sorted(os.path.join(OUTBOX_DIR, n) for n in os.listdir(OUTBOX_DIR)
+                  if n.endswith(".eml"))
+
+
+def _outbox_drop(path):
+    for p in (path, path[:-4] + ".json"):
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+
+def _outbox_fail(path, err):
+    side = path[:-4] + ".json"
+    info = {"attempts": 0}
+    try:
+        with open(side, "r") as f:
+            info = json.load(f)
+    except Exception:
+        pass
+    if info.get("run") != _OUTBOX_RUN:
+        info["attempts"] = info.get("attempts", 0) + 1
+        info["run"]      = _OUTBOX_RUN
+    info["last_error"] = str(err)[:200]
+    if info["attempts"] >= OUTBOX_MAX_ATTEMPTS:
+        log(f"🗑️ Dropping {os.path.basename(path)} after {info['attempts']} failed runs")
+        _outbox_drop(path)
         return
+    with open(side, "w") as f:
+        json.dump(info, f)
 
+
+def flush_outbox():
+    """
+    Sends every pending report over one SMTP_SSL connection, retrying the
+    connection with backoff. Returns the number of messages delivered.
+    """
+    with _outbox_lock:
+        pending = _pending_outbox()
+        if not pending:
+            return 0
+        if not (SMTP_SERVER and SMTP_USERNAME and SMTP_PASSWORD and SMTP_FROM and SMTP_TO):
+            log(f"⚠️ Email env vars missing — {len(pending)} report(s) left in outbox")
+            return 0
+
+        sent, err = 0, None
+        for delay in (0,) + SMTP_RETRY_DELAYS:
+            if delay:
+                log(f"🔁 Email retry in {delay}s ({len(pending)} pending)")
+                if _outbox_stop.wait(delay):
+                    break
+            try:
+                with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
+                    server.login(SMTP_USERNAME, SMTP_PASSWORD)
+                    for path in list(pending):
+                        if _outbox_stop.is_set():
+                            break
+                        with _outbox_send:
+                            _send_spooled(server, path)
+                        pending.remove(path)
+                        sent += 1
+                err = None
+                break
+            except smtplib.SMTPAuthenticationError as e:
+                err = e
+                log(f"⚠️ Email auth failed: {e.smtp_code} {e.smtp_error}")
+                break   # retrying will not fix credentials
+            except Exception as e:
+                err = e
+                log(f"⚠️ Email failed: {type(e).__name__}: {e}")
+
+        if sent:
+            log(f"📧 Email sent successfully ({sent} report{'s' if sent > 1 else ''})")
+        if err is not None:   # left unsent by a stop, not a failure — no attempt charged
+            for path in pending:
+                _outbox_fail(path, err)
+        return sent
+
+
+def _send_spooled(server, path):
+    inflight = path + ".sending"
+    os.replace(path, inflight)
     try:
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = subject
-        msg["From"]    = SMTP_FROM
-        msg["To"]      = SMTP_TO
-        
-        # 2. THE CRITICAL FIX: Explicitly forcing UTF-8 encoding for the emojis
-        msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-        with smtplib.SMTP_SSL(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(SMTP_FROM, [SMTP_TO], msg.as_string())
-            
-        log("📧 Email sent successfully")
-    except smtplib.SMTPAuthenticationError as e:
-        log(f"⚠️ Email auth failed: {e.smtp_code} {e.smtp_error}")
-    except Exception as e:
-        log(f"⚠️ Email failed: {type(e).__name__}: {e}")
+        with open(inflight, "rb") as f:
+            server.sendmail(SMTP_FROM, [SMTP_TO], f.read())
+    except BaseException:
+        os.replace(inflight, path)
+        raise
+    _outbox_drop(path)       # the sidecar; the message itself is now `inflight`
+    os.remove(inflight)
+
+
+def stop_outbox_flush():
+    """Lets a message that is mid-send finish (bounded by the SMTP timeout); sends no more."""
+    _outbox_stop.set()
+    with _outbox_send:
+        pass
 
-    return False
+
+def start_outbox_flush():
+    t = threading.Thread(target=flush_outbox, name="outbox", daemon=True)
+    t.start()
+    return t
+
+
+def send_email(html_body, subject, text_body=None):
+    """Synchronous spool + flush. Returns True if the report was delivered."""
+    write_debug_email(html_body)
+    path = spool_email(html_body, subject, text_body)
+    flush_outbox()
+    return not os.path.exists(path)
+
+
+# ── Run profiler ──────────────────────────────────────────────────────────────
+# `python master_claimer.py --profile` (or PROFILE_RUN=1) samples every thread's
+# stack and times each WebDriver HTTP round-trip. Writes a flame graph, the
+# folded stacks and a top-N summary next to debug_email.html. When disabled
+# nothing is installed; the only cost is one `if RUN_PROFILER` per player.
+
+PROFILE_INTERVAL_S = 0.01
+PROFILE_TOP_N      = 30
+PROFILE_FILES      = ("profile_flame.svg", "profile.folded", "profile_top.txt")
+
+RUN_PROFILER = None
+
+
+class RunProfiler:
+    def __init__(self, interval=PROFILE_INTERVAL_S):
+        self.interval = interval
+        self._player  = {}            # thread id → player ID, see set_player()
+        self.stacks   = {}            # folded stack → samples
+        self.kinds    = {"python": 0, "webdriver": 0, "sleep": 0}
+        self.players  = {}            # pid → {"wall", "http_s", "http_calls", samples by kind}
+        self._stop    = threading.Event()
+        self._lock    = threading.Lock()
+        self._orig_request = None
+        self._started = None
+
+    # WebDriver HTTP: wrap the one method every command goes through
+    def _patch_webdriver(self):
+        from selenium.webdriver.remote.remote_connection import RemoteConnection
+        orig, prof = RemoteConnection._request, self
+
+        def _timed_request(conn, *a, **kw):
+            t0 = time.perf_counter()
+            try:
+                return orig(conn, *a, **kw)
+            finally:
+                dt = time.perf_counter() - t0
+                with prof._lock:
+                    b = prof._bucket(prof._player.get(threading.get_ident(),
+                                                      "(background threads)"))
+                    b["http_calls"] += 1
+                    b["http_s"]     += dt
+
+        RemoteConnection._request = _timed_request
+        self._orig_request = orig
+
+    def set_player(self, pid):
+        """Attributes this thread's samples and WebDriver calls to pid from now on."""
+        with self._lock:
+            self._player[threading.get_ident()] = pid
+
+    def _bucket(self, pid):
+        b = self.players.get(pid)
+        if b is None:
+            b = self.players[pid] = {"first": time.perf_counter(), "last": 0.0,
+                                     "http_s": 0.0, "http_calls": 0,
+                                     "python": 0, "webdriver": 0, "sleep": 0}
+        return b
+
+    @staticmethod
+    def _classify(frames):
+        for f in frames:
+            if "remote_connection" in f.f_code.co_filename:
+                return "webdriver"
+        top = frames[0]
+        line = linecache.getline(top.f_code.co_filename, top.f_lineno)
+        return "sleep" if "sleep(" in line else "python"
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for tid, frame in sys._current_frames().items():
+            if tid == me:
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            if not frames:
+                continue
+            kind = self._classify(frames)
+            key = ";".join([names.get(tid, "thread")] + [
+                f"{f.f_code.co_name} ({os.path.basename(f.f_code.co_filename)}:{f.f_code.co_firstlineno})"
+                for f in reversed(frames)])
+            with self._lock:
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.kinds[kind] += 1
+                pid = self._player.get(tid)
+                if pid:
+                    b = self._bucket(pid)
+                    b[kind] += 1
+                    b["last"] = time.perf_counter()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except Exception:
+                pass
+
+    def start(self):
+        try:
+            self._patch_webdriver()
+        except Exception as e:
+            log(f"⚠️ WebDriver HTTP timing unavailable: {str(e)[:80]}")
+        self._started = time.perf_counter()
+        self._thread  = threading.Thread(target=self._loop, name="profiler", daemon=True)
+        self._thread.start()
+        log(f"🔬 Profiler on — sampling every {self.interval * 1000:.0f} ms")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+        if self._orig_request:
+            from selenium.webdriver.remote.remote_connection import RemoteConnection
+            RemoteConnection._request = self._orig_request
+        wall = time.perf_counter() - self._started
+        self.write(wall)
+
+    # ── reports ──────────────────────────────────────────────────────────────
+    def top_text(self, wall):
+        total = sum(self.kinds.values()) or 1
+        self_t, incl = {}, {}
+        for key, n in self.stacks.items():
+            frames = key.split(";")[1:]
+            if frames:
+                self_t[frames[-1]] = self_t.get(frames[-1], 0) + n
+            for fr in set(frames):
+                incl[fr] = incl.get(fr, 0) + n
+        out = [f"Run profile — {wall:.1f}s wall, {total} samples @ {self.interval * 1000:.0f} ms",
+               "Time by kind (all threads): " + ", ".join(
+                   f"{k} {v / total * 100:.1f}%" for k, v in self.kinds.items()),
+               "", f"Top {PROFILE_TOP_N} by self samples:"]
+        for fr, n in sorted(self_t.items(), key=lambda x: -x[1])[:PROFILE_TOP_N]:
+            out.append(f"  {n:>6} {n / total * 100:5.1f}%  {fr}")
+        out += ["", f"Top {PROFILE_TOP_N} by inclusive samples:"]
+        for fr, n in sorted(incl.items(), key=lambda x: -x[1])[:PROFILE_TOP_N]:
+            out.append(f"  {n:>6} {n / total * 100:5.1f}%  {fr}")
+        out += ["", "Per player (worker threads):",
+                f"  {'player':<22} {'wall s':>7} {'http s':>7} {'calls':>6} "
+                f"{'python%':>8} {'http%':>6} {'sleep%':>7}"]
+        for pid, b in self.players.items():
+            n = (b["python"] + b["webdriver"] + b["sleep"]) or 1
+            w = max(0.0, b["last"] - b["first"])
+            out.append(f"  {pid[:22]:<22} {w:7.1f} {b['http_s']:7.1f} {b['http_calls']:6d} "
+                       f"{b['python'] / n * 100:8.1f} {b['webdriver'] / n * 100:6.1f} "
+                       f"{b['sleep'] / n * 100:7.1f}")
+        return "\n".join(out) + "\n"
+
+    def flame_svg(self, width=1200, row=16):
+        tree = {"n": 0, "c": {}}
+        for key, n in self.stacks.items():
+            node = tree
+            node["n"] += n
+            for fr in key.split(";"):
+                node = node["c"].setdefault(fr, {"n": 0, "c": {}})
+                node["n"] += n
+        total = tree["n"] or 1
+        rects, depth_max = [], [0]
+
+        def walk(node, x, depth):
+            for name, ch in sorted(node["c"].items()):
+                w = ch["n"] / total * width
+                if w >= 0.5:
+                    depth_max[0] = max(depth_max[0], depth)
+                    rects.append((x, depth, w, name, ch["n"]))
+                    walk(ch, x, depth + 1)
+                x += w
+
+        walk(tree, 0.0, 0)
+        h = (depth_max[0] + 1) * row
+        parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{h}" '
+                 f'font-family="monospace" font-size="11">']
+        for x, d, w, name, n in rects:
+            y = h - (d + 1) * row
+            hue = 200 if "remote_connection" in name or "urllib3" in name else 20 + (hash(name) % 40)
+            label = html_escape(name)
+            parts.append(
+                f'<g><title>{label} — {n} samples ({n / total * 100:.1f}%)</title>'
+                f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" '
+                f'fill="hsl({hue},70%,60%)"/>'
+                + (f'<text x="{x + 2:.1f}" y="{y + row - 4}">{label[:int(w / 7)]}</text>'
+                   if w > 30 else "") + "</g>")
+        parts.append("</svg>")
+        return "\n".join(parts)
+
+    def write(self, wall):
+        folded = "\n".join(f"{k} {n}" for k, n in sorted(self.stacks.items())) + "\n"
+        for path, body in zip(PROFILE_FILES, (self.flame_svg(), folded, self.top_text(wall))):
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(body)
+            except Exception as e:
+                log(f"⚠️ Could not write {path}: {e}")
+        log(f"🔬 Profile written: {', '.join(PROFILE_FILES)}")
+
+
+def run_profiled(fn):
+    global RUN_PROFILER
+    RUN_PROFILER = RunProfiler()
+    RUN_PROFILER.set_player("(setup)")
+    RUN_PROFILER.start()
+    try:
+        return fn()
+    finally:
+        RUN_PROFILER.stop()
+
+
+def parse_cli(argv):
+    ap = argparse.ArgumentParser(description="CS Hub rewards claimer")
+    ap.add_argument("--profile", action="store_true",
+                    help="sample the run and write a flame graph (or PROFILE_RUN=1)")
+    ap.add_argument("--bench-startup", action="store_true",
+                    help="compare cold vs templated Chrome launch times")
+    ap.add_argument("--record", action="store_true",
+                    help="save timer-page snapshots for replay_timers.py (or RECORD_PAGES=1)")
+    ap.add_argument("--ids", nargs="+", metavar="ID", help="re-run only these player IDs")
+    ap.add_argument("--status", action="append", metavar="STATUS",
+                    help='re-run IDs whose last-run status matches, e.g. "Login Failed", Partial')
+    ap.add_argument("--rewards", metavar="TYPES",
+                    help="re-run only these reward types, e.g. store or daily,store")
+    args = ap.parse_args(argv)
+    targets = None
+    if args.ids or args.status:
+        rewards = [t.strip() for t in args.rewards.split(",")] if args.rewards else None
+        bad = [t for t in rewards or [] if t not in _REWARD_TYPES]
+        if bad:
+            ap.error(f"unknown reward type(s): {', '.join(bad)}")
+        targets = {"ids": args.ids, "statuses": args.status, "rewards": rewards}
+    elif args.rewards:
+        ap.error("--rewards needs --ids or --status")
+    return args, targets
 
 
 if __name__ == "__main__":
-    main()
+    args, targets = parse_cli(sys.argv[1:])
+    if args.record:
+        RECORD_PAGES = True
+    if args.bench_startup:
+        bench_startup()
+    elif args.profile or os.getenv("PROFILE_RUN", "0") == "1":
+        run_profiled(lambda: main(targets))
+    else:
+        main(targets)
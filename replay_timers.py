@@ -0,0 +1,157 @@
+# replay_timers.py — offline regression harness for the JS timer detectors
+"""
+Replays the snapshot corpus recorded by master_claimer (RECORD_PAGES=1 or
+--record) against the timer detectors, without logging in or touching the hub.
+
+Each snapshot in replay_corpus/<page>/<hash>.html is loaded via file:// in
+headless Chrome. The page's detector (master_claimer.TIMER_DETECTORS) runs on
+it, and its output is compared with "expected" in the matching .json, which
+is the detector's result on the live page at record time. A case fails when
+the output differs or the median run time exceeds --max-ms.
+
+--candidate page=file.js runs a rewritten detector on the same snapshots and
+reports it next to the current one, so a faster rewrite can be checked
+against the whole corpus before it replaces the string in master_claimer.
+
+CLI (needs selenium + Chrome, no hub credentials):
+    python replay_timers.py                                # whole corpus
+    python replay_timers.py --page store --repeat 20
+    python replay_timers.py --candidate store=store_fast.js
+    python replay_timers.py --update                       # re-bless after review
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from selenium import webdriver
+
+import master_claimer as mc
+
+
+def make_driver():
+    opts = webdriver.ChromeOptions()
+    opts.add_argument("--headless=new")
+    opts.add_argument("--window-size=1920,1080")   # same layout as the live runs
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-gpu")
+    opts.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=opts)
+
+
+def load_corpus(root, pages):
+    """Yields (page, case_name, html_path, json_path, meta) in a stable order."""
+    for page in sorted(pages):
+        folder = os.path.join(root, page)
+        if not os.path.isdir(folder):
+            continue
+        for fn in sorted(os.listdir(folder)):
+            if not fn.endswith(".html"):
+                continue
+            name = fn[:-5]
+            jpath = os.path.join(folder, name + ".json")
+            try:
+                with open(jpath, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            yield page, name, os.path.join(folder, fn), jpath, meta
+
+
+def time_detector(driver, js, repeat):
+    """Runs js on the loaded page repeat times. Returns (last_output, median_ms)."""
+    out, times = None, []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = driver.execute_script(js)
+        times.append((time.perf_counter() - t0) * 1000)
+    return out, statistics.median(times)
+
+
+def _norm(v):
+    # Store results come back with int or str keys depending on the path — compare as JSON
+    return json.loads(json.dumps(v, sort_keys=True))
+
+
+def _parse_candidates(specs):
+    out = {}
+    for spec in specs or []:
+        page, _, path = spec.partition("=")
+        if page not in mc.TIMER_DETECTORS or not path:
+            raise SystemExit(f"bad --candidate {spec!r}: want daily|store|loyalty=FILE.js")
+        with open(path, "r", encoding="utf-8") as f:
+            out[page] = f.read()
+    return out
+
+
+def _main(argv):
+    ap = argparse.ArgumentParser(description="Replay recorded hub pages against the timer detectors.")
+    ap.add_argument("--corpus", default=mc.RECORD_DIR)
+    ap.add_argument("--page", action="append", choices=sorted(mc.TIMER_DETECTORS),
+                    help="limit to one page type (repeatable); default: all")
+    ap.add_argument("--repeat", type=int, default=5, help="runs per case; the median is reported")
+    ap.add_argument("--max-ms", type=float, default=250.0,
+                    help="fail a case whose median detector time exceeds this")
+    ap.add_argument("--candidate", action="append", metavar="PAGE=FILE.js",
+                    help="also run a rewritten detector for PAGE and compare")
+    ap.add_argument("--update", action="store_true",
+                    help="write the current detector output as the new expected value")
+    args = ap.parse_args(argv[1:])
+
+    candidates = _parse_candidates(args.candidate)
+    cases = list(load_corpus(args.corpus, args.page or mc.TIMER_DETECTORS))
+    if not cases:
+        print(f"no snapshots under {args.corpus}/ — record some with RECORD_PAGES=1")
+        return 2
+
+    failed, per_page = 0, {}
+    driver = make_driver()
+    try:
+        for page, name, hpath, jpath, meta in cases:
+            driver.get(Path(hpath).resolve().as_uri())
+            got, ms = time_detector(driver, mc.TIMER_DETECTORS[page], args.repeat)
+            per_page.setdefault(page, []).append(ms)
+
+            if args.update:
+                meta.update(page=page, expected=got)
+                with open(jpath, "w", encoding="utf-8") as f:
+                    json.dump(meta, f, indent=2)
+                    f.write("\n")
+
+            problems = []
+            if "expected" not in meta and not args.update:
+                problems.append("no expected value recorded")
+            elif _norm(got) != _norm(meta.get("expected", got)):
+                problems.append(f"expected {meta['expected']!r}, got {got!r}")
+            if ms > args.max_ms:
+                problems.append(f"{ms:.1f} ms over the {args.max_ms:.0f} ms budget")
+
+            line = f"{'❌' if problems else '✅'} {page}/{name}  {ms:6.1f} ms"
+            if meta.get("live_ms") is not None:
+                line += f"  (live {meta['live_ms']} ms)"
+            if page in candidates:
+                c_got, c_ms = time_detector(driver, candidates[page], args.repeat)
+                same = _norm(c_got) == _norm(got)
+                line += f"  | candidate {c_ms:6.1f} ms {'same' if same else 'DIFFERS: ' + repr(c_got)}"
+                if not same:
+                    problems.append("candidate output differs")
+            print(line)
+            for p in problems:
+                print(f"     {p}")
+            failed += bool(problems)
+    finally:
+        driver.quit()
+
+    for page, times in per_page.items():
+        print(f"── {page}: {len(times)} cases, median {statistics.median(times):.1f} ms, "
+              f"max {max(times):.1f} ms")
+    print(f"{len(cases) - failed}/{len(cases)} passed" + (" (expected values updated)"
+                                                         if args.update else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv))
@@ -0,0 +1,16 @@
+# schedule_config.py — run schedule and reward cooldowns shared by the bot and the simulator
+"""
+Single source for the values master_claimer.py acts on and schedule_sim.py
+models, so the simulator cannot drift from the bot. Stdlib only — importing
+it pulls in neither selenium nor the bot.
+
+RUN_SLOTS must match the cron in .github/workflows/schedule.yml (IST).
+"""
+
+DAILY_RESET_HOUR_IST   = 5
+DAILY_RESET_MINUTE_IST = 30
+LOYALTY_COOLDOWN_HOURS = 24
+PROGRESSION_CHECK_WINDOW_HOURS = 4   # smart-skip only if progression was visited this recently
+
+# (hour, minute) IST; index 0 is the Primary run, the rest are backups in order
+RUN_SLOTS = [(5, 35), (8, 35), (11, 35), (14, 35), (17, 35), (20, 35), (23, 35), (2, 35)]
@@ -0,0 +1,296 @@
+# schedule_sim.py — discrete-event simulator for the CS Rewards Bot run schedule
+"""
+Replays weeks or months of scheduled runs against a mock reward model in
+seconds, so changes to the slot list, the progression check window or the
+loyalty cooldown can be judged without waiting for real runs.
+
+Reward model (IST, naive datetimes like master_claimer.get_ist_time()):
+    daily + 3 store  one claim each per day, reset at 05:30 IST
+    loyalty          rolling 24 h from the previous claim (enrolled IDs only)
+    progression      milestones unlock at random times through the month and
+                     are lost if still unclaimed when the month rolls over
+
+The bot policy mirrors master_claimer: an ID is smart-skipped (no browser)
+when daily and store are claimed since the last reset, progression was
+visited within the check window and loyalty was claimed within 24 h.
+Otherwise a browser is opened and everything available is claimed. IDs
+are processed one after another, so later IDs claim later in the run.
+
+Reported per slot configuration: browser-minutes, rewards missed, latency
+from availability to claim (p50/p95 minutes), plus browser-minutes and
+claims per slot.
+
+CLI (no selenium needed):
+    python schedule_sim.py                              # compare built-in presets
+    python schedule_sim.py --days 90 --players 35 --slots 5:35,11:35,17:35,23:35
+    python schedule_sim.py --slots current --slots 5:35,9:35,13:35,17:35,21:35,1:35
+
+SimClock is also a drop-in for master_claimer.set_clock() when driving the
+real time helpers from a test or a dry run.
+"""
+import argparse
+import heapq
+import random
+import sys
+from datetime import datetime, timedelta
+
+from schedule_config import (
+    DAILY_RESET_HOUR_IST as RESET_H, DAILY_RESET_MINUTE_IST as RESET_M,
+    LOYALTY_COOLDOWN_HOURS as LOYALTY_HOURS, PROGRESSION_CHECK_WINDOW_HOURS as PROG_WINDOW_H,
+    RUN_SLOTS,
+)
+
+PRESETS = {
+    "current": list(RUN_SLOTS),
+    "6-slot":  [(5, 35), (9, 35), (13, 35), (17, 35), (21, 35), (1, 35)],
+    "4-slot":  [(5, 35), (11, 35), (17, 35), (23, 35)],
+    "2-slot":  [(5, 35), (17, 35)],
+}
+
+# Browser cost model, minutes (roughly what run_archive.json shows per ID)
+LAUNCH_MIN   = 0.6    # Chrome start + login
+PAGE_MIN     = 0.15   # one reward page visit
+SKIP_MIN     = 0.0    # smart-skip costs no browser time
+
+
+class SimClock:
+    """Callable returning the simulated IST time; advance() or set() moves it."""
+
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def set(self, t):
+        self.now = t
+
+    def advance(self, minutes):
+        self.now += timedelta(minutes=minutes)
+        return self.now
+
+
+def last_reset(t):
+    r = t.replace(hour=RESET_H, minute=RESET_M, second=0, microsecond=0)
+    return r if t >= r else r - timedelta(days=1)
+
+
+def _pct(values, p):
+    if not values:
+        return 0.0
+    v = sorted(values)
+    return v[min(len(v) - 1, int(round(p / 100 * (len(v) - 1))))]
+
+
+class _Player:
+    __slots__ = ("pid", "has_loyalty", "day_claimed", "loyalty_next", "loyalty_last",
+                 "prog_pending", "prog_visit")
+
+    def __init__(self, pid, has_loyalty, start):
+        self.pid          = pid
+        self.has_loyalty  = has_loyalty
+        self.day_claimed  = {}        # reset datetime → claimed (daily + 3 store together)
+        self.loyalty_next = start     # first loyalty available immediately
+        self.loyalty_last = None
+        self.prog_pending = []        # unlock times not yet claimed
+        self.prog_visit   = None
+
+
+class ScheduleSimulator:
+    def __init__(self, slots, days=30, players=35, loyalty_share=0.6,
+                 prog_per_month=10, prog_window_h=PROG_WINDOW_H,
+                 cron_delay_max=15, fail_rate=0.02, seed=1,
+                 start=datetime(2026, 1, 1, 5, 0)):
+        # Ordered from the daily reset so the per-slot report reads like a day
+        self.slots          = sorted(slots, key=lambda hm: (hm[0] * 60 + hm[1]
+                                                            - RESET_H * 60 - RESET_M) % 1440)
+        self.days           = days
+        self.prog_per_month = prog_per_month
+        self.prog_window    = timedelta(hours=prog_window_h)
+        self.cron_delay_max = cron_delay_max
+        self.fail_rate      = fail_rate
+        self.rng            = random.Random(seed)
+        self.clock          = SimClock(start)
+        self.start, self.end = start, start + timedelta(days=days)
+        self.players = [_Player(f"P{i:03d}", self.rng.random() < loyalty_share, start)
+                        for i in range(players)]
+        self.stats = {
+            "runs": 0, "browsers": 0, "browser_min": 0.0,
+            "claimed": {"daily": 0, "store": 0, "loyalty": 0, "progression": 0},
+            "missed":  {"daily": 0, "store": 0, "loyalty": 0, "progression": 0},
+            "latency": {"daily": [], "store": [], "loyalty": [], "progression": []},
+            "per_slot": {f"{h:02d}:{m:02d}": {"browser_min": 0.0, "claims": 0}
+                         for h, m in self.slots},
+        }
+
+    # ── events ────────────────────────────────────────────────────────────────
+    def _events(self):
+        ev, seq = [], 0   # seq breaks ties so payloads are never compared
+        day = self.start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < self.end:
+            for h, m in self.slots:
+                t = day.replace(hour=h, minute=m) + timedelta(
+                    minutes=self.rng.uniform(0, self.cron_delay_max))
+                if self.start <= t < self.end:
+                    seq += 1
+                    ev.append((t, seq, "run", f"{h:02d}:{m:02d}"))
+            if day.day == 1:
+                seq += 1
+                ev.append((day, seq, "month", None))
+            day += timedelta(days=1)
+        for pl in self.players:
+            m = self.start.replace(day=1, hour=0, minute=0)
+            while m < self.end:
+                nxt = (m + timedelta(days=32)).replace(day=1)
+                span = (nxt - m).total_seconds()
+                for _ in range(self.prog_per_month):
+                    t = m + timedelta(seconds=self.rng.uniform(0, span))
+                    if self.start <= t < self.end:
+                        seq += 1
+                        ev.append((t, seq, "unlock", pl))
+                m = nxt
+        heapq.heapify(ev)
+        return ev
+
+    # ── bot policy ────────────────────────────────────────────────────────────
+    def _smart_skip(self, pl, now):
+        if not pl.day_claimed.get(last_reset(now)):
+            return False
+        if pl.prog_visit is None or now - pl.prog_visit >= self.prog_window:
+            return False
+        if pl.has_loyalty and (pl.loyalty_last is None
+                               or now - pl.loyalty_last >= timedelta(hours=LOYALTY_HOURS)):
+            return False
+        return True
+
+    def _run(self, slot):
+        st, now = self.stats, self.clock()
+        st["runs"] += 1
+        for pl in self.players:
+            if self._smart_skip(pl, now):
+                now = self.clock.advance(SKIP_MIN)
+                continue
+            pages = 3 + (1 if pl.has_loyalty else 0)
+            cost  = LAUNCH_MIN + pages * PAGE_MIN
+            st["browsers"] += 1
+            st["browser_min"] += cost
+            st["per_slot"][slot]["browser_min"] += cost
+            now = self.clock.advance(cost)
+            if self.rng.random() < self.fail_rate:
+                continue
+            claims = 0
+            reset = last_reset(now)
+            if not pl.day_claimed.get(reset):
+                pl.day_claimed[reset] = True
+                lat = (now - reset).total_seconds() / 60
+                st["claimed"]["daily"] += 1
+                st["claimed"]["store"] += 3
+                st["latency"]["daily"].append(lat)
+                st["latency"]["store"].append(lat)
+                claims += 4
+            if pl.has_loyalty and now >= pl.loyalty_next:
+                st["claimed"]["loyalty"] += 1
+                st["latency"]["loyalty"].append((now - pl.loyalty_next).total_seconds() / 60)
+                pl.loyalty_last = now
+                pl.loyalty_next = now + timedelta(hours=LOYALTY_HOURS)
+                claims += 1
+            ready = [u for u in pl.prog_pending if u <= now]
+            for u in ready:
+                st["latency"]["progression"].append((now - u).total_seconds() / 60)
+            pl.prog_pending = [u for u in pl.prog_pending if u > now]
+            st["claimed"]["progression"] += len(ready)
+            pl.prog_visit = now
+            claims += len(ready)
+            st["per_slot"][slot]["claims"] += claims
+
+    def _month_rollover(self):
+        for pl in self.players:
+            self.stats["missed"]["progression"] += len(pl.prog_pending)
+            pl.prog_pending = []
+
+    def run(self):
+        ev = self._events()
+        while ev:
+            t, _, kind, arg = heapq.heappop(ev)
+            if t > self.clock():
+                self.clock.set(t)
+            if kind == "run":
+                self._run(arg)
+            elif kind == "unlock":
+                arg.prog_pending.append(t)
+            elif kind == "month":
+                self._month_rollover()
+        self._finish()
+        return self.stats
+
+    def _finish(self):
+        st = self.stats
+        # Each complete reset day inside the window is one daily + 3 store per ID
+        resets, r = [], last_reset(self.start) + timedelta(days=1)
+        while r + timedelta(days=1) <= self.end:
+            resets.append(r)
+            r += timedelta(days=1)
+        for pl in self.players:
+            unclaimed = sum(1 for r in resets if not pl.day_claimed.get(r))
+            st["missed"]["daily"] += unclaimed
+            st["missed"]["store"] += unclaimed * 3
+        # Loyalty: every hour of latency pushes the rolling cooldown back
+        lost_h = sum(st["latency"]["loyalty"]) / 60
+        st["missed"]["loyalty"] = int(lost_h // LOYALTY_HOURS)
+
+
+def parse_slots(spec):
+    if spec in PRESETS:
+        return PRESETS[spec]
+    out = []
+    for tok in spec.split(","):
+        h, m = tok.strip().split(":")
+        out.append((int(h), int(m)))
+    return out
+
+
+def format_report(name, st, days):
+    lat = st["latency"]
+    lines = [
+        f"── {name} ── {st['runs']} runs, {st['browsers']} browser launches",
+        f"   browser-minutes: {st['browser_min']:.0f} total, {st['browser_min'] / days:.1f}/day",
+        "   claimed: " + "  ".join(f"{k} {v}" for k, v in st["claimed"].items()),
+        "   missed:  " + "  ".join(f"{k} {v}" for k, v in st["missed"].items()),
+        "   latency p50/p95 (min): " + "  ".join(
+            f"{k} {_pct(v, 50):.0f}/{_pct(v, 95):.0f}" for k, v in lat.items()),
+        "   per slot: " + "  ".join(
+            f"{s} {v['browser_min']:.0f}m/{v['claims']}c" for s, v in st["per_slot"].items()),
+    ]
+    return "\n".join(lines)
+
+
+def _main(argv):
+    ap = argparse.ArgumentParser(description="Replay the run schedule against a mock reward model.")
+    ap.add_argument("--slots", action="append",
+                    help="preset name or comma list of HH:MM (repeatable); default: all presets")
+    ap.add_argument("--days", type=int, default=60)
+    ap.add_argument("--players", type=int, default=35)
+    ap.add_argument("--loyalty-share", type=float, default=0.6)
+    ap.add_argument("--prog-per-month", type=int, default=10)
+    ap.add_argument("--prog-window", type=float, default=PROG_WINDOW_H,
+                    help="hours a progression visit keeps an ID smart-skippable")
+    ap.add_argument("--cron-delay", type=float, default=15,
+                    help="max minutes GitHub Actions starts a scheduled job late")
+    ap.add_argument("--fail-rate", type=float, default=0.02)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args(argv[1:])
+
+    configs = args.slots or list(PRESETS)
+    for spec in configs:
+        sim = ScheduleSimulator(parse_slots(spec), days=args.days, players=args.players,
+                                loyalty_share=args.loyalty_share,
+                                prog_per_month=args.prog_per_month,
+                                prog_window_h=args.prog_window,
+                                cron_delay_max=args.cron_delay,
+                                fail_rate=args.fail_rate, seed=args.seed)
+        print(format_report(spec, sim.run(), args.days))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv))
@@ -0,0 +1,110 @@
+"""Outbox delivery against an in-process SMTP stand-in (no network)."""
+import json
+import os
+import smtplib
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import master_claimer as mc  # noqa: E402
+
+
+class StubSMTP:
+    """Stands in for smtplib.SMTP_SSL; fail=True refuses every connection."""
+    fail = False
+    sent = []
+
+    def __init__(self, host, port, timeout=None):
+        if StubSMTP.fail:
+            raise smtplib.SMTPConnectError(421, b"stub: service not available")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def login(self, user, password):
+        pass
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        StubSMTP.sent.append((from_addr, to_addrs, msg))
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(mc.smtplib, "SMTP_SSL", StubSMTP)
+    monkeypatch.setattr(mc, "SMTP_RETRY_DELAYS", ())
+    for name, val in (("SMTP_SERVER", "smtp.test"), ("SMTP_USERNAME", "bot@test"),
+                      ("SMTP_PASSWORD", "pw"), ("SMTP_FROM", "bot@test"),
+                      ("SMTP_TO", "me@test")):
+        monkeypatch.setattr(mc, name, val)
+    StubSMTP.fail, StubSMTP.sent = False, []
+    mc._outbox_stop.clear()
+    return tmp_path / mc.OUTBOX_DIR
+
+
+def _attempts(path):
+    with open(path[:-4] + ".json") as f:
+        return json.load(f)["attempts"]
+
+
+def test_spool_then_flush_delivers_and_empties_outbox(outbox):
+    path = mc.spool_email("<p>report</p>", "subject", "report")
+    assert os.path.exists(path)
+
+    assert mc.flush_outbox() == 1
+    assert not os.path.exists(path)
+    (frm, to, raw), = StubSMTP.sent
+    assert (frm, to) == ("bot@test", ["me@test"])
+    assert b"subject" in raw
+
+
+def test_failed_flushes_count_once_per_run(outbox, monkeypatch):
+    StubSMTP.fail = True
+    path = mc.spool_email("<p>report</p>", "subject")
+
+    mc.flush_outbox()
+    mc.flush_outbox()          # main() flushes twice in one run
+    assert _attempts(path) == 1
+
+    monkeypatch.setattr(mc, "_OUTBOX_RUN", "next-run")
+    mc.flush_outbox()
+    assert _attempts(path) == 2
+
+
+def test_message_dropped_after_attempt_limit(outbox, monkeypatch):
+    StubSMTP.fail = True
+    path = mc.spool_email("<p>report</p>", "subject")
+
+    for run in range(mc.OUTBOX_MAX_ATTEMPTS - 1):
+        monkeypatch.setattr(mc, "_OUTBOX_RUN", f"run-{run}")
+        mc.flush_outbox()
+    assert os.path.exists(path)
+
+    monkeypatch.setattr(mc, "_OUTBOX_RUN", "last-run")
+    mc.flush_outbox()
+    assert not os.path.exists(path)
+    assert not os.path.exists(path[:-4] + ".json")
+    assert mc._pending_outbox() == []
+
+
+def test_interrupted_send_is_resent_next_run(outbox):
+    path = mc.spool_email("<p>report</p>", "subject")
+    os.replace(path, path + ".sending")      # run killed inside sendmail()
+
+    assert mc.flush_outbox() == 1
+    assert not os.listdir(outbox)
+    assert len(StubSMTP.sent) == 1
+
+
+def test_stop_sends_no_further_messages(outbox):
+    mc.spool_email("<p>one</p>", "first")
+    mc.spool_email("<p>two</p>", "second")
+    mc.stop_outbox_flush()
+
+    assert mc.flush_outbox() == 0
+    assert len(mc._pending_outbox()) == 2
+    assert not [n for n in os.listdir(outbox) if n.endswith(".json")]   # no attempt charged